@@ -0,0 +1,289 @@
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from pcm import decode_all
+
+ANALYSIS_RATE = 22050
+ONSET_FRAME = 2048
+ONSET_HOP = 512
+CHROMA_FRAME = 8192  # 저음역 반음 구분에 필요한 주파수 해상도 (약 2.7 Hz)
+CHROMA_HOP = 4096
+MIN_BPM, MAX_BPM = 60, 200
+WINDOW_SECONDS = 120  # 곡 가운데 구간만 분석 (전주/후주 영향 감소, 시간 절약)
+ANALYSIS_VERSION = 2  # 분석 항목이 늘면 올려서 이전 결과를 다시 분석 (2: 앞뒤 무음 구간)
+SILENCE_BLOCK = 0.05  # RMS 블록 길이(초)
+SILENCE_RANGE_DB = 35  # 곡의 큰 소리보다 이만큼 작으면 무음/잡음으로 봄
+SILENCE_FLOOR_DB = -60
+MIN_TRIM = 0.5  # 이보다 짧은 무음은 자르지 않음
+
+PITCH_NAMES = ("C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B")
+# Krumhansl-Kessler 조성 프로파일
+_MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+_MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+
+def _key_templates():
+    """24개 조(장조 12 + 단조 12)의 정규화된 프로파일 (24, 12)"""
+    rows = [np.roll(profile, tonic) for profile in (_MAJOR_PROFILE, _MINOR_PROFILE) for tonic in range(12)]
+    templates = np.array(rows)
+    templates -= templates.mean(axis=1, keepdims=True)
+    return templates / np.linalg.norm(templates, axis=1, keepdims=True)
+
+
+_KEY_TEMPLATES = _key_templates()
+KEY_NAMES = tuple(PITCH_NAMES[i] for i in range(12)) + tuple(PITCH_NAMES[i] + "m" for i in range(12))
+
+
+def camelot(key):
+    """DJ 믹싱용 Camelot 표기 (C -> 8B, Am -> 8A). 정렬/호환 키 찾기에 사용"""
+    if key not in KEY_NAMES:
+        return None
+    index = KEY_NAMES.index(key)
+    minor = index >= 12
+    tonic = index % 12 + (3 if minor else 0)  # 단조는 나란한 장조와 같은 번호
+    return f"{(7 * tonic + 7) % 12 + 1}{'A' if minor else 'B'}"
+
+
+def _frames(signal, size, hop):
+    window = np.hanning(size).astype(np.float32)
+    return sliding_window_view(signal, size)[::hop] * window
+
+
+def onset_envelope(signal, sample_rate=ANALYSIS_RATE):
+    """로그 스펙트럼 플럭스 (프레임마다 에너지가 새로 늘어난 양)"""
+    magnitude = np.abs(np.fft.rfft(_frames(signal, ONSET_FRAME, ONSET_HOP), axis=1))
+    log_magnitude = np.log1p(100 * magnitude)
+    flux = np.maximum(0.0, np.diff(log_magnitude, axis=0)).sum(axis=1)
+    # 느린 음량 변화는 빼서 타격 위치만 남김
+    flux -= np.convolve(flux, np.ones(16) / 16, mode="same")
+    return np.maximum(0.0, flux)
+
+
+def estimate_bpm(envelope, frame_rate=ANALYSIS_RATE / ONSET_HOP):
+    """온셋 포락선 자기상관에서 템포 추정. 120 BPM 근처를 선호하는 가중치로 배/반 템포 혼동을 줄임"""
+    if len(envelope) < 4 * frame_rate:
+        return 0.0
+    env = envelope - envelope.mean()
+    n = len(env)
+    size = 1 << (2 * n - 1).bit_length()
+    spectrum = np.fft.rfft(env, size)
+    ac = np.fft.irfft(spectrum * np.conj(spectrum), size)[:n]
+    min_lag = int(frame_rate * 60 / MAX_BPM)
+    max_lag = min(n // 2 - 1, int(np.ceil(frame_rate * 60 / MIN_BPM)))
+    lags = np.arange(min_lag, max_lag + 1)
+    # 박의 두 배 간격에서도 상관이 크면 진짜 박일 가능성이 높음
+    score = ac[lags] + 0.5 * ac[np.minimum(2 * lags, n - 1)]
+    bpm = 60 * frame_rate / lags
+    score *= np.exp(-0.5 * np.log2(bpm / 120) ** 2)
+    best = int(np.argmax(score))
+    lag = float(lags[best])
+    if 0 < best < len(lags) - 1:
+        # 포물선 보간으로 프레임 단위보다 정밀한 주기
+        left, center, right = ac[lags[best] - 1], ac[lags[best]], ac[lags[best] + 1]
+        denominator = left - 2 * center + right
+        if denominator < 0:
+            lag += 0.5 * (left - right) / denominator
+    return round(float(60 * frame_rate / lag), 1)
+
+
+def chroma(signal, sample_rate=ANALYSIS_RATE):
+    """12음 크로마 합계. 프레임마다 최댓값으로 나눠 큰 소리 구간이 결과를 좌우하지 않게 함"""
+    magnitude = np.abs(np.fft.rfft(_frames(signal, CHROMA_FRAME, CHROMA_HOP), axis=1))
+    frequencies = np.fft.rfftfreq(CHROMA_FRAME, 1 / sample_rate)
+    band = (frequencies >= 65) & (frequencies <= 2100)
+    pitch_class = np.round(69 + 12 * np.log2(frequencies[band] / 440)).astype(int) % 12
+    mapping = np.zeros((band.sum(), 12), dtype=np.float32)
+    mapping[np.arange(len(pitch_class)), pitch_class] = 1
+    frames = magnitude[:, band] ** 2 @ mapping
+    frames /= frames.max(axis=1, keepdims=True) + 1e-9
+    return frames.sum(axis=0)
+
+
+def estimate_key(chroma_vector):
+    if not chroma_vector.any():
+        return None
+    vector = chroma_vector - chroma_vector.mean()
+    vector /= np.linalg.norm(vector) + 1e-9
+    return KEY_NAMES[int(np.argmax(_KEY_TEMPLATES @ vector))]
+
+
+def find_trim(samples, sample_rate=ANALYSIS_RATE):
+    """앞뒤 무음/잡음을 뺀 구간 (시작 초, 끝 초). 자를 필요가 없으면 0 (끝은 0 이면 곡 끝까지)"""
+    block = int(sample_rate * SILENCE_BLOCK)
+    count = len(samples) // block
+    if count < 2:
+        return 0.0, 0.0
+    rms = np.sqrt(np.mean(samples[:count * block].reshape(count, block).astype(np.float64) ** 2, axis=1))
+    level = 20 * np.log10(rms + 1e-10)
+    threshold = max(SILENCE_FLOOR_DB, np.percentile(level, 90) - SILENCE_RANGE_DB)
+    active = np.flatnonzero(level > threshold)
+    if not len(active):
+        return 0.0, 0.0
+    total = len(samples) / sample_rate
+    # 소리가 시작/끝나는 순간이 잘리지 않도록 약간 여유를 둠
+    start = max(0.0, active[0] * SILENCE_BLOCK - 0.1)
+    end = min(total, (active[-1] + 1) * SILENCE_BLOCK + 0.3)
+    return (round(float(start), 2) if start >= MIN_TRIM else 0.0,
+            round(float(end), 2) if total - end >= MIN_TRIM else 0.0)
+
+
+def analyze_samples(samples, sample_rate=ANALYSIS_RATE):
+    """모노 float32 신호 -> {"bpm", "key", "trim_start", "trim_end"}"""
+    trim_start, trim_end = find_trim(samples, sample_rate)
+    result = {"bpm": 0.0, "key": None, "trim_start": trim_start, "trim_end": trim_end}
+    window = WINDOW_SECONDS * sample_rate
+    if len(samples) > window:
+        start = (len(samples) - window) // 2
+        samples = samples[start:start + window]
+    if len(samples) >= CHROMA_FRAME:
+        result["bpm"] = estimate_bpm(onset_envelope(samples, sample_rate), sample_rate / ONSET_HOP)
+        result["key"] = estimate_key(chroma(samples, sample_rate))
+    return result
+
+
+def analyze_file(path, ffmpeg_dir):
+    """작업 프로세스에서 실행: 파일을 모노로 디코딩해 분석"""
+    samples = decode_all(path, ffmpeg_dir, sample_rate=ANALYSIS_RATE, channels=1)[:, 0]
+    return analyze_samples(samples.astype(np.float32) / 32768)
+
+
+def _lower_priority():
+    # 재생/GUI 보다 낮은 우선순위로 실행 (POSIX 만)
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+
+class LibraryAnalyzer:
+    """라이브러리 곡의 BPM/키/앞뒤 무음 구간을 프로세스 풀에서 분석하는 백그라운드 작업
+
+    start(tracks) 의 tracks 는 (경로, 이전에 분석한 파일 수정 시각) 목록이며, 수정 시각이 같은 곡은
+    건너뛰므로 새로 추가했거나 바뀐 파일만 분석한다. pause()/resume() 으로 새 작업 투입을 멈출 수 있고
+    on_result(path, result, mtime) 은 곡 하나가 끝날 때마다 작업 스레드에서 호출된다 (실패 시 result 는 None).
+    """
+
+    def __init__(self, ffmpeg_path, max_workers=None, on_result=None, on_finished=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.on_result = on_result
+        self.on_finished = on_finished
+        self.running = threading.Event()
+        self.running.set()
+        self.cancelled = threading.Event()
+        self.slots = threading.BoundedSemaphore(self.max_workers * 2)
+        self.lock = threading.Lock()
+        self.counts = {"analyzed": 0, "failed": 0, "queued": 0}
+        self.started_at = None
+        self.paused_at = None
+        self.paused_total = 0.0
+
+    @property
+    def paused(self):
+        return not self.running.is_set()
+
+    def pause(self):
+        with self.lock:
+            if self.running.is_set():
+                self.paused_at = time.monotonic()
+                self.running.clear()
+
+    def resume(self):
+        with self.lock:
+            if not self.running.is_set():
+                self.paused_total += time.monotonic() - self.paused_at
+                self.paused_at = None
+                self.running.set()
+
+    def cancel(self):
+        self.cancelled.set()
+        self.running.set()
+
+    def tracks_per_minute(self):
+        with self.lock:
+            if self.started_at is None:
+                return 0.0
+            now = self.paused_at or time.monotonic()
+            active = now - self.started_at - self.paused_total
+            return self.counts["analyzed"] * 60 / active if active > 0 else 0.0
+
+    def start(self, tracks):
+        threading.Thread(target=self.run, args=(tracks,), daemon=True).start()
+
+    def run(self, tracks):
+        self.started_at = time.monotonic()
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_lower_priority) as pool:
+            for path, analyzed in tracks:
+                self.running.wait()
+                if self.cancelled.is_set():
+                    break
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                if mtime == analyzed:
+                    continue
+                self.slots.acquire()
+                with self.lock:
+                    self.counts["queued"] += 1
+                future = pool.submit(analyze_file, path, self.ffmpeg_path)
+                future.add_done_callback(lambda f, p=path, m=mtime: self._done(f, p, m))
+        if self.on_finished:
+            self.on_finished(dict(self.counts), self.tracks_per_minute())
+
+    def _done(self, future, path, mtime):
+        self.slots.release()
+        try:
+            result = future.result()
+        except Exception:
+            result = None  # 디코딩 실패 등: 파일이 바뀌기 전에는 다시 시도하지 않음
+        with self.lock:
+            self.counts["analyzed" if result is not None else "failed"] += 1
+        if self.on_result and not self.cancelled.is_set():
+            self.on_result(path, result, mtime)
+
+
+SYNTHETIC_CASES = ((128, 9, True), (90, 0, False), (174, 7, False))  # (BPM, 으뜸음, 단조)
+
+
+def _synthetic_signal(bpm, tonic, minor, seconds=60, rate=ANALYSIS_RATE):
+    """박마다 딸깍 소리 + 으뜸화음 + 베이스로 된 합성 신호 (정확도 확인용)"""
+    t = np.arange(seconds * rate) / rate
+    beat = 60 / bpm
+    clicks = np.exp(-((t % beat) * 60)) * np.sin(2 * np.pi * 1500 * t)
+    intervals = (0, 3, 7) if minor else (0, 4, 7)
+    chord = sum(np.sin(2 * np.pi * 220 * 2 ** ((tonic + i - 9) / 12) * t) for i in intervals)
+    bass = np.sin(2 * np.pi * 110 * 2 ** ((tonic - 9) / 12) * t)
+    return (0.4 * clicks + 0.1 * chord + 0.15 * bass).astype(np.float32)
+
+
+def _run_benchmark(audio_path=None, ffmpeg_path=None):
+    """합성 신호로 정확도 확인 후 (파일이 있으면) 실제 파일 처리 속도 측정"""
+    rate = ANALYSIS_RATE
+    for bpm, tonic, minor in SYNTHETIC_CASES:
+        signal = _synthetic_signal(bpm, tonic, minor)
+        start = time.perf_counter()
+        result = analyze_samples(signal)
+        elapsed = time.perf_counter() - start
+        expected = PITCH_NAMES[tonic] + ("m" if minor else "")
+        print(f"synthetic {bpm} BPM {expected}: got {result['bpm']} BPM {result['key']} "
+              f"({camelot(result['key'])}) in {elapsed * 1000:.0f} ms")
+    # 앞 3초 무음, 뒤 5초 약한 잡음을 붙인 신호에서 무음 구간 검출 확인
+    noise = (np.random.default_rng(0).standard_normal(5 * rate) * 0.002).astype(np.float32)
+    padded = np.concatenate([np.zeros(3 * rate, np.float32), signal, noise])
+    start = time.perf_counter()
+    trim = find_trim(padded)
+    elapsed = time.perf_counter() - start
+    print(f"trim (expect ~3.0 / ~63.0 of {len(padded) / rate:.0f}s): {trim} in {elapsed * 1000:.1f} ms")
+    if audio_path:
+        start = time.perf_counter()
+        result = analyze_file(audio_path, ffmpeg_path)
+        elapsed = time.perf_counter() - start
+        print(f"{os.path.basename(audio_path)}: {result} in {elapsed:.2f}s "
+              f"(~{60 / elapsed:.0f} tracks/min per worker)")
+
+
+if __name__ == '__main__':
+    import sys
+    _run_benchmark(*sys.argv[1:3])
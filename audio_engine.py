@@ -0,0 +1,627 @@
+import os
+import sys
+import mmap
+import time
+import pickle
+import tempfile
+import threading
+import subprocess
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, arbitrary_address, default_family
+import pygame
+from audio_output import MIXER_SETTINGS, PcmPlayer
+from readahead import ReadAheadCache
+
+# 공유 메모리 상태 배열의 칸: 마지막으로 처리한 명령 번호, 재생 중 여부, 위치(초), 끊김 횟수, 출력한 시간(초),
+# 마지막 재생이 디코딩 오류로 끝났는지, 기록할 때마다 1 씩 늘어나는 값 (엔진이 멈췄는지 확인용)
+_SEQ, _BUSY, _POSITION, _UNDERRUNS, _PLAYED, _FAILED, _BEAT = range(7)
+_STATE_BYTES = 7 * 8
+PUBLISH_INTERVAL = 0.01
+START_TIMEOUT = 30.0
+STALL_TIMEOUT = 5.0  # 엔진이 이 시간(초) 넘게 상태를 기록하지 않으면 멈춘 것으로 보고 종료시킴
+REPLY_COMMANDS = ("describe_readahead",)  # 결과를 기다려야 하는 명령 (play 실패는 이벤트로 알림)
+
+
+def _open_state(path):
+    """GUI 와 엔진이 함께 쓰는 상태 배열: 파일을 메모리에 매핑한 double 배열"""
+    with open(path, "r+b") as f:
+        return memoryview(mmap.mmap(f.fileno(), _STATE_BYTES)).cast("d")
+
+
+class _RemoteStream:
+    """엔진 쪽 받는 중인 곡: GUI 프로세스의 StreamingDownload 대신 원본 파일 경로만으로 GrowingFileReader 제공"""
+
+    def __init__(self, source_path, done):
+        self.source_path = source_path
+        self.done = threading.Event()
+        if done:
+            self.done.set()
+        self.finished = False
+
+    def open_reader(self):
+        from downloader import GrowingFileReader  # 엔진 시작 시 yt_dlp 까지 불러오지 않도록 필요할 때 import
+        return GrowingFileReader(self)
+
+    def reader_closed(self):
+        pass  # 원본 파일 정리는 GUI 프로세스의 StreamingDownload 가 담당
+
+
+class _Engine:
+    """엔진 프로세스에서 명령을 PcmPlayer 호출로 바꿔 실행"""
+
+    def __init__(self, ffmpeg_dir, events):
+        self.player = PcmPlayer(ffmpeg_dir)
+        self.player.on_start = lambda started_at: self.send_event("started", started_at)
+        self.player.on_error = lambda message: self.send_event("playback_error", message)
+        self.events = events
+        self.events_lock = threading.Lock()  # 재생 스레드(started/tap)와 명령 루프(play_failed)가 함께 씀
+        self.readahead = None
+
+    def send_event(self, name, value):
+        with self.events_lock:
+            try:
+                self.events.send((name, value))
+            except (OSError, ValueError):
+                pass  # GUI 프로세스 종료
+
+    def load(self, path):
+        self.player.load(path)
+
+    def play(self, start, end, stream):
+        if stream is not None:
+            source_path, done = stream
+            current = self.player.streams.get(self.player.path)
+            if current is None or current.source_path != source_path:
+                self.player.streams[self.player.path] = _RemoteStream(source_path, done)
+        self.player.play(start, end)
+
+    def stream_done(self, path):
+        stream = self.player.streams.get(path)
+        if stream is not None:
+            stream.done.set()
+
+    def forget_stream(self, path):
+        stream = self.player.streams.pop(path, None)
+        if stream is not None:
+            stream.finished = True
+            stream.done.set()
+
+    def pause(self):
+        self.player.pause()
+
+    def unpause(self):
+        self.player.unpause()
+
+    def stop(self):
+        self.player.stop()
+
+    def set_volume(self, volume):
+        self.player.set_volume(volume)
+
+    def add_stage(self, stage):
+        self.player.add_stage(stage)
+
+    def set_tap(self, enabled):
+        # 스펙트럼용 블록은 이미 모노로 줄어 있어 파이프로 보내도 부담이 적음
+        self.player.tap = (lambda mono, media_time, media_length: self.send_event("tap", (mono, media_time,
+                                                                                          media_length))
+                           if enabled else None)
+
+    def call_stage(self, index, method, args):
+        getattr(self.player.stages[index], method)(*args)
+
+    def set_readahead(self, capacity_bytes, enabled):
+        if self.readahead is None:
+            self.readahead = ReadAheadCache(capacity_bytes)
+        else:
+            self.readahead.set_capacity(capacity_bytes)
+        self.player.readahead = self.readahead if enabled else None
+
+    def prefetch(self, paths):
+        if self.readahead is not None:
+            self.readahead.prefetch(paths)
+
+    def describe_readahead(self):
+        return self.readahead.describe() if self.readahead is not None else "off"
+
+
+def _engine_main(commands, events, state, ffmpeg_dir, mixer_settings):
+    """엔진 프로세스 본체: 믹서/디코더/DSP 를 소유하고 연결로 받은 명령을 순서대로 처리
+
+    상태는 별도 스레드가 PUBLISH_INTERVAL 마다 공유 메모리에 기록한다. 명령 번호를 마지막에 쓰므로
+    GUI 는 번호가 따라잡았으면 그 명령이 반영된 상태를 읽는다. 응답에는 명령 번호를 붙여 보내므로
+    GUI 는 시간 초과로 포기한 요청의 늦은 응답을 구분해 버린다.
+    """
+    pygame.mixer.init(**mixer_settings)
+    engine = _Engine(ffmpeg_dir, events)
+    player = engine.player
+    applied = [0]
+    running = threading.Event()
+    running.set()
+
+    def publish():
+        beat = 0
+        while running.is_set():
+            beat += 1
+            seq = applied[0]
+            state[_BUSY] = player.get_busy()
+            state[_POSITION] = player.position()
+            state[_UNDERRUNS] = player.underruns
+            state[_PLAYED] = player.played_seconds()
+            state[_FAILED] = player.error is not None
+            state[_SEQ] = seq
+            state[_BEAT] = beat
+            time.sleep(PUBLISH_INTERVAL)
+
+    threading.Thread(target=publish, daemon=True).start()
+    commands.send(("ready", player.sample_rate, player.channels))
+    try:
+        while True:
+            try:
+                seq, name, args = commands.recv()
+            except EOFError:
+                break  # GUI 프로세스 종료
+            if name == "close":
+                break
+            try:
+                reply = ("ok", getattr(engine, name)(*args))
+            except Exception as e:
+                reply = ("error", str(e))
+            applied[0] = seq
+            if name in REPLY_COMMANDS:
+                commands.send((seq, *reply))
+            elif name == "play" and reply[0] == "error":
+                engine.send_event("play_failed", (seq, reply[1]))
+    finally:
+        running.clear()
+        player.stop()
+        pygame.mixer.quit()
+
+
+class _StreamTable(dict):
+    """RemotePlayer.streams: 재생목록에서 빠진(변환이 끝난) 스트림을 엔진에도 알림"""
+
+    def __init__(self, owner):
+        super().__init__()
+        self.owner = owner
+
+    def pop(self, path, *default):
+        if path in self:
+            self.owner._forget_stream(path)
+        return super().pop(path, *default)
+
+    def __delitem__(self, path):
+        self.owner._forget_stream(path)
+        super().__delitem__(path)
+
+
+class StageProxy:
+    """GUI 쪽 DSP 단계: set_* 호출은 로컬 객체(설정 보관용)에 적용하고 엔진의 같은 단계에도 전달"""
+
+    def __init__(self, owner, index, stage):
+        self._owner = owner
+        self._index = index
+        self._stage = stage
+
+    def __getattr__(self, name):
+        value = getattr(self._stage, name)
+        if not name.startswith("set_") or not callable(value):
+            return value
+
+        def forward(*args):
+            result = value(*args)
+            self._owner._send("call_stage", self._index, name, args)
+            return result
+        return forward
+
+
+class RemoteReadAhead:
+    """GUI 쪽 미리 읽기 설정. 실제 캐시는 디코딩하는 엔진 프로세스에 있음"""
+
+    def __init__(self, owner, capacity_bytes):
+        self.owner = owner
+        self.capacity_bytes = capacity_bytes
+
+    def set_capacity(self, capacity_bytes):
+        self.capacity_bytes = capacity_bytes
+        self.owner._sync_readahead()
+
+    def prefetch(self, paths):
+        self.owner._send("prefetch", [path for path in paths if path])
+
+    def describe(self):
+        try:
+            return self.owner._request("describe_readahead")
+        except pygame.error as e:
+            return str(e)
+
+
+class RemotePlayer:
+    """PcmPlayer 와 같은 인터페이스로 재생을 별도 엔진 프로세스에 맡김
+
+    GUI 프로세스가 바쁘거나(GIL 을 오래 잡는 작업, 다운로드 스레드) 멈춰도 엔진의 디코딩/출력은
+    계속된다. 명령은 연결로 보내고 기다리지 않으며(play 가 실패하면 엔진이 알려 on_error 호출),
+    위치/재생 상태는 엔진이 공유 메모리에 기록한 값을 읽는다. 엔진이 아직 처리하지 않은 load/play/stop 이 있으면 그 명령 기준의 예상 상태를 돌려준다.
+    엔진이 죽거나 멈추면(alive() 참고) 다음 play() 때 작업 스레드에서 DSP/볼륨/미리 읽기 설정과 함께 다시 띄우고,
+    준비될 때까지 보낸 명령은 모아 두었다가 순서대로 보낸다.
+    """
+
+    def __init__(self, ffmpeg_dir, mixer_settings=MIXER_SETTINGS, reply_timeout=1.0):
+        self.ffmpeg_dir = ffmpeg_dir
+        self.mixer_settings = dict(mixer_settings)
+        self.reply_timeout = reply_timeout
+        self.lock = threading.Lock()
+        fd, self.state_path = tempfile.mkstemp(prefix="audio-engine-", suffix=".state")
+        with os.fdopen(fd, "wb") as f:
+            f.write(bytes(_STATE_BYTES))
+        self.state = _open_state(self.state_path)
+        self.process = None
+        self.commands = None
+        self.backlog = []  # 엔진이 준비되기 전에 보낸 명령
+        self.starting = False
+        self.closed = False
+        self.last_beat = None
+        self.beat_seen = 0.0
+        self.seq = 0
+        self.expected_seq = 0  # 마지막 load/play/stop 명령 번호
+        self.path = None
+        self.volume = 1.0
+        self.stages = []
+        self.streams = _StreamTable(self)
+        self.held_stream = None  # 엔진이 읽는 동안 원본이 지워지지 않도록 연 리더 (경로, 리더)
+        self.paused_flag = False
+        self.expected_busy = False
+        self.expected_position = 0.0
+        self.readahead_proxy = None
+        self.readahead_enabled = False
+        self.on_start = None
+        self.on_error = None  # (메시지) -> None: 엔진에서 play 나 디코딩이 실패했을 때 이벤트 스레드에서 호출
+        self.last_error = None  # 엔진이 마지막으로 알린 디코딩 오류 메시지
+        self.tap = None
+        self._prepare_start()
+        self._start()
+
+    def _prepare_start(self):
+        """이후 명령을 엔진이 준비될 때까지 모아 두고, 다시 띄우는 경우의 설정 복원 명령을 맨 앞에 넣음"""
+        with self.lock:
+            self.commands = None
+            self.backlog = []
+            self.seq = self.expected_seq = 0
+            self.state[_SEQ] = 0
+            self.starting = True
+        # 로컬 단계 객체에 현재 설정이 보관되어 있음
+        for proxy in self.stages:
+            self._send("add_stage", proxy._stage)
+        self._send("set_volume", self.volume)
+        if self.tap is not None:
+            self._send("set_tap", True)
+        self._sync_readahead()
+
+    def _start(self):
+        """엔진 프로세스를 띄우고 준비될 때까지 기다린 뒤 모아 둔 명령을 보냄. 실패하면 pygame.error
+
+        multiprocessing 의 spawn 은 자식에서 GUI 의 __main__(player2.py, PyQt)을 다시 import 하므로
+        python -m audio_engine_main 으로 실행하고, 엔진이 연 주소에 명령/이벤트 연결 두 개로 접속한다.
+        """
+        deadline = time.monotonic() + START_TIMEOUT
+        address = arbitrary_address(default_family)
+        authkey = os.urandom(32)
+        engine_dir = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (engine_dir, os.environ.get("PYTHONPATH")))))
+        try:
+            self.process = subprocess.Popen([sys.executable, "-m", "audio_engine_main"], stdin=subprocess.PIPE,
+                                            env=env)
+            with self.process.stdin:
+                pickle.dump((address, authkey, self.state_path, self.ffmpeg_dir, self.mixer_settings),
+                            self.process.stdin)
+            commands = self._connect(address, authkey, deadline)
+            events = self._connect(address, authkey, deadline)
+            if not commands.poll(max(0.0, deadline - time.monotonic())):
+                raise pygame.error("Audio engine did not start")
+            _, self.sample_rate, self.channels = commands.recv()
+        except (OSError, EOFError, AuthenticationError, pygame.error) as e:
+            if self.process is not None:
+                self.process.kill()
+            with self.lock:
+                self.starting = False
+            raise pygame.error(str(e) if isinstance(e, pygame.error) else f"Audio engine failed to start: {e}")
+        threading.Thread(target=self._read_events, args=(events,), daemon=True).start()
+        with self.lock:
+            try:
+                for message in self.backlog:
+                    commands.send(message)
+            except (OSError, ValueError):
+                pass  # 그새 엔진이 죽음: alive() 가 False 가 되고 다음 play() 에서 다시 띄움
+            self.commands = commands
+            self.backlog = []
+            self.last_beat = None
+            self.beat_seen = time.monotonic()
+            self.starting = False
+
+    def _connect(self, address, authkey, deadline):
+        """엔진이 주소를 열 때까지 접속을 다시 시도. 엔진이 그 전에 끝나거나 시간이 지나면 pygame.error"""
+        while True:
+            try:
+                return Client(address, authkey=authkey)
+            except OSError:
+                if self.process.poll() is not None:
+                    raise pygame.error("Audio engine failed to start")
+                if time.monotonic() > deadline:
+                    raise pygame.error("Audio engine did not start")
+                time.sleep(0.01)
+
+    def _restart(self):
+        """play() 가 죽은 엔진을 발견했을 때 작업 스레드에서 다시 띄움 (GUI 스레드를 막지 않음). 실패하면 on_error"""
+        try:
+            self._start()
+        except pygame.error as e:
+            self.expected_busy = False
+            if self.on_error and not self.closed:
+                self.on_error(str(e))
+
+    def _read_events(self, events):
+        while True:
+            try:
+                name, value = events.recv()
+            except (EOFError, OSError):
+                return
+            if name == "tap":
+                tap = self.tap
+                if tap is not None:
+                    tap(*value)
+            elif name == "started" and self.on_start:
+                self.on_start(value)
+            elif name == "playback_error":
+                self.last_error = value
+                if self.on_error:
+                    self.on_error(value)
+            elif name == "play_failed":
+                seq, message = value
+                if seq >= self.expected_seq:  # 그 뒤에 다른 load/play/stop 을 보내지 않았으면
+                    self.expected_busy = False
+                if self.on_error:
+                    self.on_error(message)
+
+    def _send(self, name, *args):
+        with self.lock:
+            self.seq += 1
+            if self.commands is None:
+                self.backlog.append((self.seq, name, args))  # 엔진이 준비되면 보냄
+                return self.seq
+            try:
+                self.commands.send((self.seq, name, args))
+            except (OSError, ValueError):
+                pass  # 엔진이 죽음: get_busy() 가 False 가 되고 다음 play() 에서 다시 띄움
+            return self.seq
+
+    def _request(self, name, *args):
+        """명령을 보내고 엔진의 결과를 기다림. 실패하거나 reply_timeout 안에 답이 없으면 pygame.error
+
+        시간이 지나도 엔진을 종료시키지는 않는다 (멈춘 엔진의 처리는 alive()). 늦게 온 이전 요청의
+        응답은 명령 번호로 구분해 버린다.
+        """
+        with self.lock:
+            if self.commands is None:
+                raise pygame.error("Audio engine is starting")
+            self.seq += 1
+            seq = self.seq
+            deadline = time.monotonic() + self.reply_timeout
+            try:
+                self.commands.send((seq, name, args))
+                while True:
+                    if not self.commands.poll(max(0.0, deadline - time.monotonic())):
+                        raise pygame.error("Audio engine is not responding")
+                    reply_seq, status, value = self.commands.recv()
+                    if reply_seq == seq:
+                        break
+            except (OSError, EOFError, ValueError):
+                raise pygame.error("Audio engine stopped")
+        if status == "error":
+            raise pygame.error(value)
+        return value
+
+    def alive(self):
+        """엔진이 살아 있으면 True (띄우는 중이면 True)
+
+        프로세스가 있어도 STALL_TIMEOUT 초 넘게 상태를 기록하지 않았으면 멈춘 것으로 보고 종료시킨다.
+        get_busy() 가 False 가 되고 다음 play() 에서 다시 띄운다.
+        """
+        if self.starting:
+            return True
+        if self.process is None or self.process.poll() is not None:
+            return False
+        now = time.monotonic()
+        beat = self.state[_BEAT]
+        if beat != self.last_beat:
+            self.last_beat = beat
+            self.beat_seen = now
+        elif now - self.beat_seen > STALL_TIMEOUT:
+            self.process.kill()
+            return False
+        return True
+
+    def set_tap(self, tap):
+        """PcmPlayer.tap 과 같은 콜백. 엔진이 보낸 블록으로 이벤트 스레드에서 호출"""
+        changed = (tap is None) != (self.tap is None)
+        self.tap = tap
+        if changed:
+            self._send("set_tap", tap is not None)
+
+    def add_stage(self, stage):
+        proxy = StageProxy(self, len(self.stages), stage)
+        self.stages.append(proxy)
+        self._send("add_stage", stage)
+        return proxy
+
+    def create_readahead(self, capacity_bytes):
+        self.readahead_proxy = RemoteReadAhead(self, capacity_bytes)
+        return self.readahead_proxy
+
+    @property
+    def readahead(self):
+        return self.readahead_proxy if self.readahead_enabled else None
+
+    @readahead.setter
+    def readahead(self, cache):
+        if cache is not None:
+            self.readahead_proxy = cache
+        self.readahead_enabled = cache is not None
+        self._sync_readahead()
+
+    def _sync_readahead(self):
+        if self.readahead_proxy is not None:
+            self._send("set_readahead", self.readahead_proxy.capacity_bytes, self.readahead_enabled)
+
+    def _forget_stream(self, path):
+        self._send("forget_stream", path)
+        if self.held_stream and self.held_stream[0] == path:
+            self._release_stream()
+
+    def _release_stream(self):
+        if self.held_stream:
+            self.held_stream[1].close()
+            self.held_stream = None
+
+    def _stream_source(self):
+        """받는 중인 곡이면 (원본 경로, 다 받았는지) 를 엔진에 넘기고 재생하는 동안 원본을 붙잡아 둠"""
+        stream = self.streams.get(self.path)
+        if stream is None or stream.finished:
+            return None
+        if not self.held_stream or self.held_stream[0] != self.path:
+            self._release_stream()
+            self.held_stream = (self.path, stream.open_reader())
+            if not stream.done.is_set():
+                threading.Thread(target=self._watch_stream, args=(self.path, stream), daemon=True).start()
+        if stream.finished:
+            return None
+        return stream.source_path, stream.done.is_set()
+
+    def _watch_stream(self, path, stream):
+        stream.done.wait()
+        self._send("stream_done", path)
+
+    def load(self, path):
+        if self.held_stream and self.held_stream[0] != path:
+            self._release_stream()
+        self.path = path
+        self.paused_flag = False
+        self.expected_busy = False
+        self.expected_position = 0.0
+        self.expected_seq = self._send("load", path)
+
+    def play(self, start=0.0, end=None):
+        if not self.path:
+            raise pygame.error("No file loaded")
+        if not self.alive():
+            self._prepare_start()
+            self._send("load", self.path)
+            threading.Thread(target=self._restart, daemon=True).start()
+        self.paused_flag = False
+        self.expected_busy = True
+        self.expected_position = start
+        # 결과를 기다리지 않음: 실패하면 엔진이 play_failed 이벤트로 알리고 get_busy() 는 False 가 됨
+        self.expected_seq = self._send("play", start, end, self._stream_source())
+
+    def pause(self):
+        self.paused_flag = True
+        self._send("pause")
+
+    def unpause(self):
+        self.paused_flag = False
+        self._send("unpause")
+
+    @property
+    def paused(self):
+        return self.paused_flag
+
+    def stop(self):
+        self.paused_flag = False
+        self.expected_busy = False
+        self.expected_seq = self._send("stop")
+
+    def set_volume(self, volume):
+        self.volume = volume
+        self._send("set_volume", volume)
+
+    def _pending(self):
+        """마지막 load/play/stop 을 엔진이 아직 상태에 반영하지 않았으면 True"""
+        return self.state[_SEQ] < self.expected_seq
+
+    def get_busy(self):
+        if not self.alive():
+            return False
+        if self._pending():
+            return self.expected_busy
+        return bool(self.state[_BUSY])
+
+    def position(self):
+        if self._pending() or not self.alive():
+            return self.expected_position
+        return self.state[_POSITION]
+
+    @property
+    def error(self):
+        """PcmPlayer.error 와 같음: 마지막 play() 가 디코딩 오류로 끝났으면 메시지"""
+        if not self.alive() or self._pending() or not self.state[_FAILED]:
+            return None
+        return self.last_error or "audio could not be decoded"
+
+    @property
+    def underruns(self):
+        return int(self.state[_UNDERRUNS])
+
+    def played_seconds(self):
+        """PcmPlayer.played_seconds() 와 같음 (엔진을 다시 띄우면 0 부터 다시 셈)"""
+        return self.state[_PLAYED]
+
+    def close(self):
+        self.closed = True
+        self._release_stream()
+        self._send("close")  # 띄우는 중이면 모아 둔 명령과 함께 엔진이 준비되는 대로 보냄
+        if not self.starting and self.process is not None:
+            try:
+                self.process.wait(1.0)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass  # Windows: 아직 매핑된 파일
+
+
+def _run_benchmark(audio_path, ffmpeg_path, seconds=6.0, items=2000000):
+    """재생 중에 GUI 프로세스가 GIL 을 오래 잡는 작업(큰 리스트 정렬)을 반복할 때 같은 프로세스/엔진 프로세스의
+    출력 끊김 횟수와 명령 지연을 비교"""
+    import random
+    data = [random.random() for _ in range(items)]
+    pygame.mixer.init(**MIXER_SETTINGS)
+    try:
+        for name in ("in-process", "engine process"):
+            if name == "in-process":
+                player = PcmPlayer(ffmpeg_path)
+            else:
+                pygame.mixer.quit()  # 출력 장치는 엔진 프로세스가 사용
+                player = RemotePlayer(ffmpeg_path)
+            player.load(audio_path)
+            start = time.perf_counter()
+            player.play(start=0)
+            while not player.get_busy() or player.position() <= 0:
+                time.sleep(0.001)
+            started = time.perf_counter() - start
+            stalls = []
+            while time.perf_counter() - start < seconds and player.get_busy():
+                stall = time.perf_counter()
+                sorted(data)  # 한 번의 C 호출로 GIL 을 놓지 않음 (태그 파싱/무거운 GUI 작업 흉내)
+                stalls.append(time.perf_counter() - stall)
+            played = player.position()
+            underruns = player.underruns
+            player.close()
+            print(f"{name}: play -> playing in {started * 1000:.1f} ms, {len(stalls)} GUI stall(s) of "
+                  f"~{sum(stalls) / max(1, len(stalls)) * 1000:.0f} ms, reached {played:.1f}s, "
+                  f"{underruns} underrun(s)")
+    finally:
+        pygame.mixer.quit()
+
+
+if __name__ == '__main__':
+    _run_benchmark(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
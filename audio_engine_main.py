@@ -0,0 +1,21 @@
+"""오디오 엔진 프로세스의 진입점: python -m audio_engine_main
+
+RemotePlayer 가 subprocess 로 실행한다. multiprocessing 의 spawn 은 자식에서 부모의 __main__(player2.py, PyQt)을
+다시 import 하므로 쓰지 않는다. 표준 입력으로 받은 주소에서 GUI 의 명령/이벤트 연결을 차례로 받는다.
+"""
+import sys
+import pickle
+from multiprocessing.connection import Listener
+from audio_engine import _engine_main, _open_state
+
+
+def main():
+    address, authkey, state_path, ffmpeg_dir, mixer_settings = pickle.load(sys.stdin.buffer)
+    with Listener(address, authkey=authkey) as listener:
+        commands = listener.accept()
+        events = listener.accept()
+    _engine_main(commands, events, _open_state(state_path), ffmpeg_dir, mixer_settings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+import io
+import os
+import time
+import threading
+from collections import deque
+import numpy as np
+import pygame
+from pcm import PcmDecoder
+from readahead import ReadAheadCache
+
+# PcmPlayer 가 넘기는 PCM 형식에 맞춰 고정 (SDL 이 형식을 바꾸지 않도록 allowedchanges=0)
+MIXER_SETTINGS = {"frequency": 44100, "size": -16, "channels": 2, "buffer": 2048, "allowedchanges": 0}
+
+
+class SoundDecoder:
+    """ffmpeg 가 없을 때의 대체 디코더: pygame 으로 파일 전체를 디코딩해 PcmDecoder 와 같은 read() 제공"""
+
+    def __init__(self, source, start=0.0, sample_rate=44100):
+        samples = pygame.sndarray.array(pygame.mixer.Sound(source))
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        self.samples = samples[int(start * sample_rate):]
+        self.offset = 0
+
+    def read(self, frames):
+        block = self.samples[self.offset:self.offset + frames]
+        self.offset += len(block)
+        return block
+
+    def close(self):
+        self.samples = None
+
+
+class PcmPlayer:
+    """pygame.mixer.music 대체: 디코딩한 PCM 을 DSP 단계(stages)에 통과시켜 pygame 채널 큐로 재생
+
+    각 단계는 process(block) 와 reset() 을 가진다 (예: Equalizer). block 은 float32
+    (frames, channels) 배열이다. 재생 위치는 실제로 출력 중인 블록의 원본 시각으로 계산한다.
+    """
+
+    def __init__(self, ffmpeg_dir, block_frames=8192):
+        self.ffmpeg_dir = ffmpeg_dir
+        self.sample_rate, _, self.channels = pygame.mixer.get_init()
+        self.block_frames = block_frames
+        self.stages = []
+        pygame.mixer.set_reserved(1)  # 채널 0 은 음악 재생 전용
+        self.channel = pygame.mixer.Channel(0)
+        self.volume = 1.0
+        self.path = None
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.paused_at = None
+        self.finished = True
+        self.start_position = 0.0
+        self.streams = {}  # 경로 -> 아직 받는 중인 StreamingDownload (파일 대신 받은 만큼 디코딩)
+        self.readahead = None  # ReadAheadCache: 메모리에 읽어 둔 곡은 디스크 대신 메모리에서 디코딩
+        self.on_start = None  # play() 후 첫 블록이 출력되는 순간 호출 (작업 스레드)
+        # (메시지) -> None: 재생을 시작한 곡을 디코딩하지 못했을 때 작업 스레드에서 호출 (파일을 열지 못하면 play() 가 예외)
+        self.on_error = None
+        self.error = None  # 마지막 play() 가 디코딩 오류로 끝났으면 그 메시지 (get_busy() 가 False 가 된 뒤 확인)
+        # DSP 단계를 거친 블록을 받는 콜백 tap(모노 float32, 원본 시작(초), 원본 길이(초)) (시각화용, 작업 스레드)
+        self.tap = None
+        self.underruns = 0  # 블록 공급이 늦어 출력이 끊긴 횟수
+        self.played = 0.0  # 타임라인에서 빠진 블록의 출력 시간 합계 (played_seconds() 참고)
+        # 출력했거나 대기 중인 블록: [sound, 원본 시작(초), 원본 길이(초), 출력 길이(초), 출력 시작 시각]
+        self.timeline = deque()
+
+    def add_stage(self, stage):
+        """DSP 단계 추가. 설정을 바꿀 때 쓸 객체 반환 (RemotePlayer 와 같은 사용법)"""
+        self.stages.append(stage)
+        return stage
+
+    def create_readahead(self, capacity_bytes):
+        return ReadAheadCache(capacity_bytes)
+
+    def close(self):
+        self.stop()
+
+    def load(self, path):
+        self.stop()
+        self.path = path
+
+    def _open_decoder(self, start):
+        stream = self.streams.get(self.path)
+        if stream is not None and not stream.finished:
+            return PcmDecoder(None, self.ffmpeg_dir, start=start, sample_rate=self.sample_rate,
+                              channels=self.channels, feed=stream.open_reader())
+        # 이미 읽어 둔 곡만 메모리에서 디코딩. 아직 읽는 중이면 기다리지 않고 바로 파일에서 디코딩
+        # (play() 는 GUI 스레드에서 호출되므로 캐시 때문에 멈추지 않도록)
+        data = self.readahead.get(self.path, timeout=0) if self.readahead is not None else None
+        if self.ffmpeg_dir:
+            return PcmDecoder(self.path, self.ffmpeg_dir, start=start, sample_rate=self.sample_rate,
+                              channels=self.channels, feed=io.BytesIO(data) if data is not None else None)
+        return SoundDecoder(io.BytesIO(data) if data is not None else self.path, start, self.sample_rate)
+
+    def play(self, start=0.0, end=None):
+        """start 초부터 재생. end 를 주면 그 위치(원본 기준 초)에서 곡이 끝난 것으로 처리"""
+        if not self.path:
+            raise pygame.error("No file loaded")
+        self.stop()
+        for stage in self.stages:
+            stage.reset()
+        try:
+            decoder = self._open_decoder(start)
+        except OSError as e:
+            raise pygame.error(str(e))
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            self.start_position = start
+            self.finished = False
+            self.error = None
+            self.paused_at = None
+        threading.Thread(target=self._run, args=(decoder, self.path, start, generation, end), daemon=True).start()
+
+    def pause(self):
+        with self.lock:
+            if self.paused_at is None:
+                self.paused_at = time.monotonic()
+                self.channel.pause()
+
+    def unpause(self):
+        with self.lock:
+            if self.paused_at is None:
+                return
+            # 멈춰 있던 시간만큼 출력 시작 시각을 뒤로 밀어 위치 계산 유지
+            paused_for = time.monotonic() - self.paused_at
+            for entry in self.timeline:
+                if entry[4] is not None:
+                    entry[4] += paused_for
+            self.paused_at = None
+            self.channel.unpause()
+
+    @property
+    def paused(self):
+        return self.paused_at is not None
+
+    def stop(self):
+        with self.lock:
+            self.generation += 1
+            self.channel.stop()
+            self.played += self._head_played()
+            self.timeline.clear()
+            self.finished = True
+            self.error = None
+            self.paused_at = None
+
+    def set_volume(self, volume):
+        self.volume = volume
+        self.channel.set_volume(volume)
+
+    def get_busy(self):
+        """재생 중이거나 일시정지 상태면 True, 곡 끝까지 출력했거나 정지했으면 False"""
+        return not self.finished
+
+    def position(self):
+        """지금 들리는 소리의 원본 기준 위치(초)"""
+        with self.lock:
+            if not self.timeline:
+                return self.start_position
+            _, media_start, media_length, output_length, started_at = self.timeline[0]
+            if started_at is None:
+                return media_start
+            now = self.paused_at or time.monotonic()
+            elapsed = min(max(0.0, now - started_at), output_length)
+            return media_start + elapsed * media_length / output_length
+
+    def played_seconds(self):
+        """지금까지 실제로 소리를 낸 시간(초) 누계. 일시정지/탐색으로 건너뛴 구간은 포함하지 않음"""
+        with self.lock:
+            self._advance()
+            return self.played + self._head_played()
+
+    def _head_played(self):
+        """지금 재생 중인 블록에서 이미 출력한 시간 (lock 보유 상태에서 호출)"""
+        if not self.timeline:
+            return 0.0
+        _, _, _, output_length, started_at = self.timeline[0]
+        if started_at is None:
+            return 0.0
+        now = self.paused_at or time.monotonic()
+        return min(max(0.0, now - started_at), output_length)
+
+    def _advance(self):
+        """채널에서 재생이 끝난 블록을 타임라인에서 제거 (lock 보유 상태에서 호출)"""
+        playing = self.channel.get_sound()
+        while len(self.timeline) > 1 and self.timeline[0][0] is not playing:
+            done = self.timeline.popleft()
+            if done[4] is not None:
+                self.played += done[3]
+            head = self.timeline[0]
+            if head[4] is None and done[4] is not None:
+                # 큐에 있던 블록은 앞 블록이 끝나는 즉시 이어서 재생됨
+                head[4] = done[4] + done[3]
+
+    def set_tap(self, tap):
+        self.tap = tap
+
+    def _render(self, block, media_time, media_length):
+        samples = block.astype(np.float32) * (1 / 32768)
+        for stage in self.stages:
+            samples = stage.process(samples)
+        tap = self.tap
+        if tap is not None and len(samples):
+            tap(samples.mean(axis=1), media_time, media_length)
+        return np.clip(samples * 32767, -32768, 32767).astype(np.int16)
+
+    def _run(self, decoder, path, media_time, generation, end=None):
+        poll = self.block_frames / self.sample_rate / 8
+        first_block = True
+        decoded = 0
+        error = None
+        try:
+            while generation == self.generation:
+                with self.lock:
+                    self._advance()
+                    waiting = self.paused_at is not None or self.channel.get_queue() is not None
+                if waiting:
+                    time.sleep(poll)
+                    continue
+                block = decoder.read(self.block_frames)
+                if not len(block):
+                    # 한 프레임도 나오지 않았거나 ffmpeg 가 실패로 끝났으면 곡 끝이 아니라 재생 오류
+                    error = getattr(decoder, "error", lambda: None)()
+                    if not decoded:
+                        error = "no audio could be decoded" + (f" ({error})" if error else "")
+                    break
+                decoded += len(block)
+                if end is not None:
+                    block = block[:max(0, int(round((end - media_time) * self.sample_rate)))]
+                if not len(block):
+                    break
+                media_length = len(block) / self.sample_rate
+                output = self._render(block, media_time, media_length)
+                if not len(output):
+                    media_time += media_length
+                    continue
+                sound = pygame.mixer.Sound(buffer=np.ascontiguousarray(output).tobytes())
+                output_length = len(output) / self.sample_rate
+                with self.lock:
+                    if generation != self.generation:
+                        break
+                    if self.channel.get_busy():
+                        self.channel.queue(sound)
+                        started_at = None
+                    else:
+                        # 첫 블록이거나 공급이 늦어 채널이 비었던 경우
+                        self.channel.play(sound)
+                        self.channel.set_volume(self.volume)
+                        started_at = time.monotonic()
+                        if not first_block:
+                            self.underruns += 1
+                    self.timeline.append([sound, media_time, media_length, output_length, started_at])
+                if first_block:
+                    first_block = False
+                    if self.on_start:
+                        self.on_start(started_at)
+                media_time += media_length
+            # 남은 블록이 모두 재생될 때까지 대기
+            while generation == self.generation:
+                with self.lock:
+                    self._advance()
+                    busy = self.paused_at is not None or self.channel.get_busy()
+                if not busy:
+                    break
+                time.sleep(poll)
+        finally:
+            decoder.close()
+            message = f"{os.path.basename(path)}: {error}" if error is not None else None
+            with self.lock:
+                current = generation == self.generation
+                if current:
+                    self.error = message
+                    self.finished = True
+            if current and message is not None and self.on_error:
+                self.on_error(message)
@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from mutagen.mp3 import MP3
+from library import LibraryLock, SongLibrary
+from title_parser import TitleParser
+from downloader import DownloadArchive, download_video, iter_playlist_entries, sanitize_title, video_id_from_url
+
+SAVE_EVERY = 10  # 곡 n개를 받을 때마다 라이브러리 저장 (중간에 종료돼도 받은 곡 유지)
+
+
+def read_manifest(path):
+    """manifest: 한 줄에 검색어 또는 YouTube 영상/재생목록 URL 하나. 빈 줄과 # 주석은 무시"""
+    with open(path, encoding="utf-8") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")))
+
+
+class Checkpoint:
+    """manifest 옆 <manifest>.progress 에 줄마다 처리 결과를 추가 기록. 다시 실행하면 끝난 줄은 건너뜀 (실패한 줄은 재시도)"""
+
+    def __init__(self, manifest_path):
+        self.path = f"{manifest_path}.progress"
+        self.lock = threading.Lock()
+        self.status = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # 기록 도중 종료된 마지막 줄
+                    self.status[entry["line"]] = entry["status"]
+        except OSError:
+            pass
+
+    def finished(self, line):
+        return self.status.get(line) == "ok"
+
+    def record(self, line, status, **details):
+        with self.lock:
+            self.status[line] = status
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"line": line, "status": status, "t": time.time(), **details},
+                                   ensure_ascii=False) + "\n")
+
+
+class BatchDownloader:
+    """GUI 없이 manifest 의 검색어/URL 을 받아 GUI 와 같은 라이브러리에 추가
+
+    검색(YouTube Data API, 키가 없으면 yt-dlp 검색), 제목 분리(TitleParser), 다운로드/태그 기록
+    (download_video) 은 GUI 와 같은 코드를 쓴다. 다운로드는 최대 max_workers 개를 동시에 돌리고,
+    라이브러리를 저장한 뒤에 체크포인트를 기록하므로 중간에 끊겨도 다시 실행하면 이어서 받는다.
+    GUI 와 동시에 같은 라이브러리를 쓰지 않도록 main() 은 LibraryLock 을 잡은 뒤에만 실행한다.
+    """
+
+    def __init__(self, library, download_dir, ffmpeg_path, checkpoint, youtube=None, max_workers=3, log=print):
+        self.library = library
+        self.download_dir = download_dir
+        self.ffmpeg_path = ffmpeg_path
+        self.checkpoint = checkpoint
+        self.youtube = youtube
+        self.max_workers = max_workers
+        self.log = log
+        self.title_parser = TitleParser(track["artist"] for track in library.tracks.values())
+        self.archive = DownloadArchive(os.path.join(library.data_dir, "download_archive.txt"))
+        self.slots = threading.BoundedSemaphore(max_workers * 2)
+        self.lock = threading.Lock()
+        self.unsaved = 0
+        self.counts = {"downloaded": 0, "in_library": 0, "failed": 0, "lines_done": 0, "lines_skipped": 0,
+                       "lines_failed": 0}
+
+    def resolve(self, line):
+        """manifest 한 줄 -> [(영상 ID, 원래 제목, 썸네일 URL)]"""
+        if line.startswith(("http://", "https://")) or video_id_from_url(line):
+            return [(video_id, title, f"https://i.ytimg.com/vi/{video_id}/default.jpg")
+                    for video_id, title in iter_playlist_entries(line)]
+        if self.youtube:
+            # GUI 검색과 같은 Data API 호출 (할당량 기록/캐시 공유), 첫 결과만 사용
+            items = self.youtube.search(line, max_results=1).get("items", [])
+            return [(item["id"]["videoId"], item["snippet"]["title"], item["snippet"]["thumbnails"]["default"]["url"])
+                    for item in items[:1]]
+        return [(video_id, title, f"https://i.ytimg.com/vi/{video_id}/default.jpg")
+                for video_id, title in iter_playlist_entries(f"ytsearch1:{line}")]
+
+    def run(self, lines):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for line in lines:
+                if self.checkpoint.finished(line):
+                    self._count("lines_skipped")
+                    continue
+                try:
+                    entries = self.resolve(line)
+                except Exception as e:
+                    self._finish_line(line, 0, str(e))
+                    continue
+                if not entries:
+                    self._finish_line(line, 0, "no results")
+                    continue
+                state = {"line": line, "remaining": len(entries), "failed": 0}
+                for entry in entries:
+                    # 대기 작업 수를 제한해 검색/목록 확장이 다운로드보다 너무 앞서지 않도록 함
+                    self.slots.acquire()
+                    executor.submit(self._job, state, *entry)
+        self.library.save()
+        return dict(self.counts, elapsed=time.perf_counter() - started)
+
+    def _job(self, state, video_id, full_title, thumbnail_url):
+        try:
+            result = self._download(video_id, full_title, thumbnail_url)
+        except Exception as e:
+            self._log(f"failed: {full_title}: {e}")
+            result = "failed"
+        finally:
+            self.slots.release()
+        with self.lock:
+            self.counts[result] += 1
+            state["remaining"] -= 1
+            state["failed"] += result == "failed"
+            done = state["remaining"] == 0
+            if result == "downloaded":
+                self.unsaved += 1
+            save = done or self.unsaved >= SAVE_EVERY
+            if save:
+                self.unsaved = 0
+        if save:
+            self.library.save()
+        if done:
+            self._finish_line(state["line"], state["failed"])
+
+    def _download(self, video_id, full_title, thumbnail_url):
+        if self.library.find_video(video_id):
+            return "in_library"
+        title, artist = self.title_parser.parse(full_title)
+        video_url = f"https://www.youtube.com/watch?v={video_id}"
+        mp3_path = download_video(video_url, sanitize_title(title) or video_id, title, artist, thumbnail_url,
+                                  self.download_dir, self.ffmpeg_path)
+        if not mp3_path:
+            self._log(f"failed: {full_title}")
+            return "failed"
+        try:
+            info = MP3(mp3_path).info
+            duration, bitrate = info.length, info.bitrate // 1000
+        except Exception:
+            duration = bitrate = 0
+        self.library.add_track(mp3_path, title, artist, duration, bitrate,
+                               source="youtube", thumbnail_url=thumbnail_url, video_id=video_id)
+        self.title_parser.add_artist(artist)
+        self.archive.add(video_id)
+        self._log(f"downloaded: {artist} - {title}")
+        return "downloaded"
+
+    def _finish_line(self, line, failed, error=None):
+        status = "failed" if failed or error else "ok"
+        self.checkpoint.record(line, status, **({"error": error} if error else {"failed": failed}))
+        self._count("lines_failed" if status == "failed" else "lines_done")
+        if error:
+            self._log(f"failed: {line}: {error}")
+
+    def _count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def _log(self, message):
+        with self.lock:
+            self.log(message)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download songs listed in a manifest into the MP3 player library")
+    parser.add_argument("manifest", help="text file: one search query or YouTube video/playlist URL per line")
+    parser.add_argument("--workers", type=int, default=3, help="concurrent downloads (default 3)")
+    parser.add_argument("--download-dir", default=os.path.join(os.path.expanduser("~"), "Downloads", "MP3Player"))
+    parser.add_argument("--data-dir", default=None, help="library directory (default: the player's)")
+    parser.add_argument("--ffmpeg", default=None, help="directory containing ffmpeg (default: from PATH)")
+    parser.add_argument("--api-key", default=os.environ.get("YOUTUBE_API_KEY", ""),
+                        help="YouTube Data API key for searches (default: $YOUTUBE_API_KEY, else yt-dlp search)")
+    args = parser.parse_args(argv)
+
+    ffmpeg_path = args.ffmpeg
+    if not ffmpeg_path and shutil.which("ffmpeg"):
+        ffmpeg_path = os.path.dirname(shutil.which("ffmpeg"))
+    if not ffmpeg_path:
+        parser.error("ffmpeg is not installed or path is incorrect")
+    library = SongLibrary(args.data_dir)
+    lock = LibraryLock(library.data_dir)
+    if not lock.acquire():
+        print("The library is in use by the MP3 player or another batch download. Close it and try again.",
+              file=sys.stderr)
+        return 3
+    try:
+        library.load()
+        if library.load_error:
+            print(library.load_error, file=sys.stderr)
+        youtube = None
+        if args.api_key:
+            from youtube_api import YouTubeClient
+            youtube = YouTubeClient(args.api_key, os.path.join(library.data_dir, "youtube_cache"))
+        os.makedirs(args.download_dir, exist_ok=True)
+        lines = read_manifest(args.manifest)
+        downloader = BatchDownloader(library, args.download_dir, ffmpeg_path, Checkpoint(args.manifest), youtube,
+                                     max_workers=args.workers)
+        counts = downloader.run(lines)
+        print(f"{len(lines)} line(s): {counts['lines_done']} done, {counts['lines_skipped']} already done, "
+              f"{counts['lines_failed']} failed; {counts['downloaded']} downloaded, "
+              f"{counts['in_library']} already in library, {counts['failed']} failed in {counts['elapsed']:.0f}s")
+        return 1 if counts["lines_failed"] else 0
+    finally:
+        lock.release()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import os
+import queue
+import hashlib
+import threading
+import urllib.request
+from collections import OrderedDict
+from PyQt5.QtCore import Qt, QBuffer, QByteArray, QIODevice
+from PyQt5.QtGui import QImage, QPixmap
+
+
+def extract_embedded_art(path):
+    """MP3 의 APIC 프레임(앞표지 우선)에서 이미지 바이트 추출"""
+    from mutagen import MutagenError
+    from mutagen.id3 import ID3, ID3NoHeaderError
+    try:
+        tags = ID3(path)
+    except (ID3NoHeaderError, MutagenError, OSError):
+        return None
+    frames = tags.getall("APIC")
+    if not frames:
+        return None
+    front = [frame for frame in frames if frame.type == 3]
+    return (front or frames)[0].data
+
+
+def downscale_image(image_data, size=300):
+    """이미지를 size 이하로 축소한 JPEG 바이트 반환 (작업 스레드에서 호출 가능)"""
+    image = QImage()
+    if not image.loadFromData(image_data):
+        return None
+    if image.width() > size or image.height() > size:
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "JPG", 90)
+    return bytes(data)
+
+
+class ThumbnailCache:
+    """축소된 표지 이미지의 디스크 캐시. 원본 이미지 해시를 키로 써서 같은 앨범 표지는 한 번만 저장"""
+
+    def __init__(self, cache_dir, size=150, max_pixmaps=200):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.max_pixmaps = max_pixmaps
+        self.pixmaps = OrderedDict()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.jpg")
+
+    def contains(self, key):
+        return bool(key) and os.path.exists(self.path_for(key))
+
+    def store(self, image_data):
+        """원본 이미지를 축소해 저장하고 키 반환. 작업 스레드에서 호출 가능 (QImage 만 사용)"""
+        key = hashlib.sha1(image_data).hexdigest()
+        path = self.path_for(key)
+        if os.path.exists(path):
+            return key
+        image = QImage()
+        if not image.loadFromData(image_data):
+            return None
+        scaled = image.scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        if not scaled.save(tmp_path, "JPG", 90):
+            return None
+        os.replace(tmp_path, path)
+        return key
+
+    def pixmap(self, key):
+        """GUI 스레드 전용: 메모리 LRU 에 올린 QPixmap 반환"""
+        if key in self.pixmaps:
+            self.pixmaps.move_to_end(key)
+            return self.pixmaps[key]
+        if not self.contains(key):
+            return None
+        pixmap = QPixmap(self.path_for(key))
+        if pixmap.isNull():
+            return None
+        self.pixmaps[key] = pixmap
+        while len(self.pixmaps) > self.max_pixmaps:
+            self.pixmaps.popitem(last=False)
+        return pixmap
+
+
+class CoverLoader:
+    """표지 추출/다운로드를 처리하는 백그라운드 작업 스레드. 완료 시 callback(path, key) 호출"""
+
+    def __init__(self, cache, callback):
+        self.cache = cache
+        self.callback = callback
+        self.tasks = queue.Queue()
+        self.pending = set()
+        self.lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def request(self, path, thumbnail_url=None):
+        with self.lock:
+            if path in self.pending:
+                return
+            self.pending.add(path)
+        self.tasks.put((path, thumbnail_url))
+
+    def _run(self):
+        while True:
+            path, thumbnail_url = self.tasks.get()
+            key = None
+            try:
+                image_data = extract_embedded_art(path)
+                if image_data is None and thumbnail_url:
+                    with urllib.request.urlopen(thumbnail_url, timeout=10) as response:
+                        image_data = response.read()
+                if image_data:
+                    key = self.cache.store(image_data)
+            except Exception:
+                key = None
+            with self.lock:
+                self.pending.discard(path)
+            self.callback(path, key)
@@ -0,0 +1,429 @@
+import os
+import re
+import time
+import threading
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import yt_dlp
+from mutagen.id3 import ID3, ID3NoHeaderError, TIT2, TPE1, APIC, TXXX
+from pcm import ffmpeg_executable
+
+YOUTUBE_ID_TAG = "YOUTUBE_ID"
+
+_VIDEO_ID_RE = re.compile(r"(?:v=|youtu\.be/|/shorts/)([A-Za-z0-9_-]{11})")
+
+
+def video_id_from_url(url):
+    match = _VIDEO_ID_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+def sanitize_title(title):
+    return "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
+
+
+def download_audio(video_url, sanitized_title, download_dir, ffmpeg_path, concurrent_fragments=4):
+    """yt-dlp 로 오디오를 받아 MP3 로 변환. 생성된 MP3 경로 반환 (없으면 None)"""
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': os.path.join(download_dir, f"{sanitized_title}.%(ext)s"),
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': '320',
+        }],
+        'ffmpeg_location': ffmpeg_path,
+        'concurrent_fragment_downloads': concurrent_fragments,
+        'quiet': True,
+        'no_warnings': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl.download([video_url])
+    mp3_path = os.path.join(download_dir, f"{sanitized_title}.mp3")
+    return mp3_path if os.path.exists(mp3_path) else None
+
+
+def transcode_to_mp3(source_path, mp3_path, ffmpeg_path, bitrate="320k"):
+    """원본 오디오를 MP3 로 변환 (FFmpegExtractAudio 후처리와 같은 결과). 성공 여부 반환"""
+    tmp_path = f"{mp3_path}.tmp"
+    cmd = [ffmpeg_executable(ffmpeg_path), "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+           "-i", source_path, "-vn", "-c:a", "libmp3lame", "-b:a", bitrate, "-f", "mp3", tmp_path]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    if result.returncode != 0 or not os.path.exists(tmp_path):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, mp3_path)
+    return True
+
+
+class GrowingFileReader:
+    """다운로드 중인 파일을 끝까지 따라가며 읽는 파일 객체. 아직 받지 못한 부분은 도착할 때까지 기다림"""
+
+    def __init__(self, download):
+        self.download = download
+        self.file = None
+        self.closed = False
+
+    def read(self, size=-1):
+        while not self.closed:
+            if self.file is None and self.download.source_path and os.path.exists(self.download.source_path):
+                self.file = open(self.download.source_path, "rb")
+            finished = self.download.done.is_set()
+            if self.file is not None:
+                data = self.file.read(size)
+                if data or finished:
+                    return data
+            elif finished:
+                return b""
+            time.sleep(0.05)
+        return b""
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.file is not None:
+            self.file.close()
+        self.download.reader_closed()
+
+
+class StreamingDownload:
+    """받는 중에도 재생할 수 있는 다운로드
+
+    yt-dlp 가 원본 오디오(가능하면 스트리밍에 유리한 webm)를 .part 없이 최종 파일에 바로 쓰고,
+    open_reader() 로 연 GrowingFileReader 는 그 파일을 따라가며 읽는다. 다운로드가 끝나면
+    finish() 가 MP3 로 변환하고, 열린 리더가 모두 닫히면 원본 파일을 지운다.
+    """
+
+    def __init__(self, video_url, sanitized_title, download_dir, ffmpeg_path, min_bytes=64 * 1024):
+        self.video_url = video_url
+        self.download_dir = download_dir
+        self.ffmpeg_path = ffmpeg_path
+        self.sanitized_title = sanitized_title
+        self.mp3_path = os.path.join(download_dir, f"{sanitized_title}.mp3")
+        self.min_bytes = min_bytes
+        self.source_path = None
+        self.duration = 0
+        self.error = None
+        self.ready = threading.Event()  # 재생을 시작할 만큼 받았거나 실패함
+        self.done = threading.Event()  # 원본 다운로드가 끝났거나 실패함
+        self.finished = False  # MP3 변환까지 끝남
+        self.readers = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        ydl_opts = {
+            'format': 'bestaudio[ext=webm]/bestaudio[ext=m4a]/bestaudio/best',
+            'outtmpl': os.path.join(self.download_dir, f"{self.sanitized_title}.stream.%(ext)s"),
+            'nopart': True,
+            'http_chunk_size': 1024 * 1024,  # 작은 범위 요청으로 첫 바이트가 빨리 도착하도록
+            'progress_hooks': [self._progress],
+            'ffmpeg_location': self.ffmpeg_path,
+            'quiet': True,
+            'noprogress': True,
+            'no_warnings': True,
+        }
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(self.video_url, download=True)
+                if not self.source_path and info:
+                    self.source_path = ydl.prepare_filename(info)
+                if info and info.get("duration"):
+                    self.duration = info["duration"]
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+            self.ready.set()
+
+    def _progress(self, status):
+        if status.get("filename"):
+            self.source_path = status["filename"]
+        info = status.get("info_dict") or {}
+        if info.get("duration"):
+            self.duration = info["duration"]
+        total = status.get("total_bytes") or status.get("total_bytes_estimate") or 0
+        downloaded = status.get("downloaded_bytes") or 0
+        if downloaded >= min(self.min_bytes, total or self.min_bytes) or status.get("status") == "finished":
+            self.ready.set()
+
+    def open_reader(self):
+        with self.lock:
+            self.readers += 1
+        return GrowingFileReader(self)
+
+    def reader_closed(self):
+        with self.lock:
+            self.readers -= 1
+            cleanup = self.finished and self.readers == 0
+        if cleanup:
+            self._remove_source()
+
+    def finish(self):
+        """원본 다운로드가 끝나길 기다려 MP3 로 변환. 생성된 MP3 경로 반환 (실패하면 None)"""
+        self.done.wait()
+        ok = (not self.error and self.source_path and os.path.exists(self.source_path)
+              and transcode_to_mp3(self.source_path, self.mp3_path, self.ffmpeg_path))
+        with self.lock:
+            self.finished = True
+            cleanup = self.readers == 0
+        if cleanup:
+            self._remove_source()
+        return self.mp3_path if ok else None
+
+    def _remove_source(self):
+        if not self.source_path:
+            return
+        try:
+            os.remove(self.source_path)
+        except OSError:
+            pass
+
+
+def write_tags(mp3_path, title, artist, image_data=None, video_id=None):
+    """다운로드한 MP3 에 제목/아티스트/영상 ID 와 표지(APIC)를 기록"""
+    try:
+        tags = ID3(mp3_path)
+    except ID3NoHeaderError:
+        tags = ID3()
+    tags.setall("TIT2", [TIT2(encoding=3, text=title)])
+    tags.setall("TPE1", [TPE1(encoding=3, text=artist)])
+    if video_id:
+        tags.setall(f"TXXX:{YOUTUBE_ID_TAG}", [TXXX(encoding=3, desc=YOUTUBE_ID_TAG, text=video_id)])
+    if image_data:
+        tags.setall("APIC", [APIC(encoding=3, mime="image/jpeg", type=3, desc="Cover", data=image_data)])
+    tags.save(mp3_path, v2_version=3)
+
+
+def read_video_id(tags):
+    """write_tags 로 기록한 영상 ID 읽기 (mutagen 태그 객체)"""
+    frame = tags.get(f"TXXX:{YOUTUBE_ID_TAG}") if tags is not None else None
+    return str(frame.text[0]) if frame and frame.text else None
+
+
+def file_video_id(mp3_path):
+    try:
+        return read_video_id(ID3(mp3_path))
+    except Exception:
+        return None
+
+
+def tag_downloaded_file(mp3_path, title, artist, thumbnail_url=None, video_id=None, scale_image=None):
+    """후처리 단계: 썸네일을 받아(필요하면 축소) 태그와 함께 파일에 기록. 실패해도 다운로드는 유지"""
+    image_data = None
+    if thumbnail_url:
+        try:
+            with urllib.request.urlopen(thumbnail_url, timeout=10) as response:
+                image_data = response.read()
+            if scale_image:
+                image_data = scale_image(image_data)
+        except Exception:
+            image_data = None
+    try:
+        write_tags(mp3_path, title, artist, image_data, video_id)
+        return True
+    except Exception:
+        return False
+
+
+def download_video(video_url, sanitized_title, title, artist, thumbnail_url, download_dir, ffmpeg_path,
+                   scale_image=None):
+    """단일 다운로드 파이프라인 (GUI/일괄 받기 공용): 받아서 MP3 변환 후 태그/표지 기록. MP3 경로 반환 (실패하면 None)"""
+    video_id = video_id_from_url(video_url)
+    if video_id:
+        for name in (sanitized_title, f"{sanitized_title} ({video_id})"):
+            existing = os.path.join(download_dir, f"{name}.mp3")
+            if os.path.exists(existing) and file_video_id(existing) == video_id:
+                return existing  # 받아 두었지만 라이브러리에 반영되기 전에 종료된 경우
+        if os.path.exists(os.path.join(download_dir, f"{sanitized_title}.mp3")):
+            # 제목이 같은 다른 영상이 이미 있으면 덮어쓰지 않도록 영상 ID 를 붙임
+            sanitized_title = f"{sanitized_title} ({video_id})"
+    mp3_path = download_audio(video_url, sanitized_title, download_dir, ffmpeg_path)
+    if mp3_path:
+        # 태그와 표지를 파일에 기록해 두면 재시작 후에도 네트워크 없이 메타데이터 복원 가능
+        tag_downloaded_file(mp3_path, title, artist, thumbnail_url, video_id, scale_image=scale_image)
+    return mp3_path
+
+
+class DownloadArchive:
+    """다운로드 완료한 영상 ID 기록 (yt-dlp 아카이브와 같은 "youtube <id>" 줄 형식)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.video_ids = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2:
+                        self.video_ids.add(parts[1])
+
+    def __contains__(self, video_id):
+        return video_id in self.video_ids
+
+    def add(self, video_id):
+        with self.lock:
+            if video_id in self.video_ids:
+                return
+            self.video_ids.add(video_id)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(f"youtube {video_id}\n")
+
+
+def iter_playlist_entries(url):
+    """재생목록/채널 URL 을 펼쳐 (video_id, title) 을 하나씩 반환 (전체 목록을 미리 받지 않음)"""
+    ydl_opts = {
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+        'quiet': True,
+        'no_warnings': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        entries = info.get("entries") if info else None
+        if entries is None:
+            if info and info.get("id"):
+                yield info["id"], info.get("title") or info["id"]
+            return
+        for entry in entries:
+            if not entry:
+                continue
+            if entry.get("_type") == "playlist" or entry.get("ie_key") == "YoutubeTab":
+                # 채널의 "동영상" 탭처럼 중첩된 목록은 다시 펼침
+                yield from iter_playlist_entries(entry.get("url"))
+                continue
+            video_id = entry.get("id")
+            if video_id:
+                yield video_id, entry.get("title") or video_id
+
+
+class BulkImporter:
+    """재생목록/채널 일괄 가져오기
+
+    download(video_url, video_id, title, thumbnail_url) 콜백이 실제 다운로드와 라이브러리 추가를
+    담당하며 성공 여부를 반환한다 (None 이면 다른 곳에서 받는 중이라 건너뜀).
+    아카이브에 있는 영상은 네트워크 접근 없이 건너뛴다.
+    """
+
+    def __init__(self, archive, download, max_workers=3, on_finished=None):
+        self.archive = archive
+        self.download = download
+        self.max_workers = max_workers
+        self.on_finished = on_finished
+        self.slots = threading.BoundedSemaphore(max_workers * 2)
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.counts = {"downloaded": 0, "skipped": 0, "failed": 0}
+
+    def start(self, url):
+        threading.Thread(target=self.run, args=(url,), daemon=True).start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self, url):
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                for video_id, title in iter_playlist_entries(url):
+                    if self.cancelled.is_set():
+                        break
+                    if video_id in self.archive:
+                        self._count("skipped")
+                        continue
+                    # 대기 작업 수를 제한해 목록 확장이 다운로드보다 너무 앞서지 않도록 함
+                    self.slots.acquire()
+                    executor.submit(self._job, video_id, title)
+            except Exception as e:
+                error = e
+        if self.on_finished:
+            self.on_finished(dict(self.counts), error)
+
+    def _job(self, video_id, title):
+        try:
+            if self.cancelled.is_set():
+                return
+            video_url = f"https://www.youtube.com/watch?v={video_id}"
+            thumbnail_url = f"https://i.ytimg.com/vi/{video_id}/default.jpg"
+            result = self.download(video_url, video_id, title, thumbnail_url)
+            if result is None:
+                self._count("skipped")
+            elif result:
+                self.archive.add(video_id)
+                self._count("downloaded")
+            else:
+                self._count("failed")
+        except Exception:
+            self._count("failed")
+        finally:
+            self.slots.release()
+
+    def _count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+
+def _run_streaming_benchmark(audio_path, ffmpeg_path, rate_kbps=2000):
+    """로컬 HTTP 서버(대역폭 제한)로 받으면서 재생할 때의 첫 소리까지 시간과 전체 다운로드+변환 시간 비교"""
+    import shutil
+    import tempfile
+    import functools
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+    from pcm import PcmDecoder
+
+    class ThrottledHandler(SimpleHTTPRequestHandler):
+        def copyfile(self, source, outputfile):
+            chunk = max(1024, rate_kbps * 1024 // 20)
+            try:
+                while True:
+                    data = source.read(chunk)
+                    if not data:
+                        break
+                    outputfile.write(data)
+                    time.sleep(0.05)
+            except ConnectionError:
+                pass  # yt-dlp 가 형식 확인용 요청을 중간에 끊는 경우
+
+        def log_message(self, *args):
+            pass
+
+    serve_dir, name = os.path.split(os.path.abspath(audio_path))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(ThrottledHandler, directory=serve_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/{name}"
+    work_dir = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        download = StreamingDownload(url, "stream", work_dir, ffmpeg_path)
+        download.start()
+        download.ready.wait()
+        decoder = PcmDecoder(None, ffmpeg_path, feed=download.open_reader())
+        first_block = decoder.read(4096)
+        first_sound = time.perf_counter() - start
+        decoder.close()
+        mp3_path = download.finish()
+        total = time.perf_counter() - start
+        print(f"time to first sound: {first_sound:.2f}s ({len(first_block)} frames decoded)")
+        print(f"full download + mp3 transcode: {total:.2f}s -> {'ok' if mp3_path else 'failed'}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    import sys
+    import shutil
+    if len(sys.argv) < 2:
+        print("usage: python downloader.py <audio file> [rate_kbps]")
+        sys.exit(1)
+    ffmpeg = shutil.which("ffmpeg")
+    _run_streaming_benchmark(sys.argv[1], os.path.dirname(ffmpeg) if ffmpeg else None,
+                             int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
@@ -0,0 +1,60 @@
+import logging
+import threading
+from collections import deque, OrderedDict
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, Qt
+
+_log = logging.getLogger(__name__)
+
+
+class EventChannel(QObject):
+    """작업 스레드 -> GUI 스레드 이벤트 채널
+
+    post() 는 어느 스레드에서나 호출할 수 있고, 쌓인 이벤트는 GUI 스레드에서
+    최대 1초에 rate 번 종류별 묶음(list)으로 구독 함수에 전달된다.
+    """
+
+    _wake = pyqtSignal()
+
+    def __init__(self, parent=None, rate=10):
+        super().__init__(parent)
+        self.pending = deque()
+        self.handlers = {}
+        self.lock = threading.Lock()
+        self.scheduled = False
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(int(1000 / rate))
+        self.flush_timer.timeout.connect(self.flush)
+        # 다른 스레드에서 emit 되면 큐 연결로 GUI 스레드의 _schedule 이 실행됨
+        self._wake.connect(self._schedule, Qt.QueuedConnection)
+
+    def subscribe(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def post(self, kind, payload=None):
+        self.pending.append((kind, payload))
+        with self.lock:
+            if self.scheduled:
+                return
+            self.scheduled = True
+        self._wake.emit()
+
+    def _schedule(self):
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        with self.lock:
+            self.scheduled = False
+        batches = OrderedDict()
+        while self.pending:
+            kind, payload = self.pending.popleft()
+            batches.setdefault(kind, []).append(payload)
+        for kind, payloads in batches.items():
+            handler = self.handlers.get(kind)
+            if handler:
+                # 한 종류의 처리가 실패해도 같은 묶음의 다른 이벤트(다운로드 완료, 알림 등)는 전달
+                try:
+                    handler(payloads)
+                except Exception:
+                    _log.exception("event handler for %r failed", kind)
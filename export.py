@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pcm import ffmpeg_executable
+from downloader import sanitize_title
+
+# 내보내기 형식: (ffmpeg 코덱, 확장자, 기본 비트레이트; None 이면 무손실)
+FORMATS = {
+    "mp3": ("libmp3lame", ".mp3", "192k"),
+    "aac": ("aac", ".m4a", "192k"),
+    "opus": ("libopus", ".opus", "128k"),
+    "ogg": ("libvorbis", ".ogg", "192k"),
+    "flac": ("flac", ".flac", None),
+}
+MANIFEST_NAME = ".mp3player_export.json"
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+
+class LibraryExporter:
+    """선택한 곡들을 지정한 형식/비트레이트로 변환해 폴더(USB 등)에 내보냄
+
+    ffmpeg 프로세스를 최대 max_workers 개(기본: CPU 수)까지 동시에 돌리며, 각 프로세스는 한 스레드만 쓴다.
+    대상 폴더의 .mp3player_export.json 에 원본 크기/수정 시각/해시와 변환 설정을 기록해 두고,
+    바뀌지 않은 곡은 다시 변환하지 않는다 (수정 시각만 바뀐 경우 해시로 확인).
+    on_progress(done, total, stats) 는 곡 하나가 끝날 때마다 작업 스레드에서 호출된다.
+    """
+
+    def __init__(self, ffmpeg_path, target_dir, codec="mp3", bitrate=None, max_workers=None,
+                 on_progress=None, on_finished=None):
+        if codec not in FORMATS:
+            raise ValueError(f"Unsupported export format: {codec}")
+        self.ffmpeg = ffmpeg_executable(ffmpeg_path)
+        self.target_dir = target_dir
+        self.codec = codec
+        self.bitrate = bitrate or FORMATS[codec][2]
+        self.settings = f"{codec}:{self.bitrate}"
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.manifest_path = os.path.join(target_dir, MANIFEST_NAME)
+        self.manifest = {}
+        self.stats = {"converted": 0, "skipped": 0, "failed": 0, "cancelled": 0, "bytes_in": 0,
+                      "audio_seconds": 0.0, "elapsed": 0.0}
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def _save_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _output_names(self, tracks):
+        """(원본 경로, 출력 파일 이름) 목록. 이름이 겹치면 번호를 붙임"""
+        extension = FORMATS[self.codec][1]
+        used = set()
+        names = []
+        for track in tracks:
+            artist, title = track.get("artist"), track.get("title")
+            stem = sanitize_title(f"{artist} - {title}" if artist and title else
+                                  title or os.path.splitext(os.path.basename(track["path"]))[0])
+            name = f"{stem}{extension}"
+            number = 2
+            while name.lower() in used:
+                name = f"{stem} ({number}){extension}"
+                number += 1
+            used.add(name.lower())
+            names.append((track, name))
+        return names
+
+    def _unchanged(self, source, name, entry):
+        """이전 내보내기 결과를 그대로 쓸 수 있으면 True (필요하면 해시를 갱신한 항목 반환)"""
+        output = os.path.join(self.target_dir, name)
+        if not entry or entry.get("settings") != self.settings or not os.path.exists(output):
+            return False
+        if entry.get("source") != source:
+            return False  # 같은 이름으로 다른 곡을 내보내는 경우 (예: 같은 제목의 다른 파일)
+        stat = os.stat(source)
+        if entry.get("size") != stat.st_size:
+            return False
+        if entry.get("mtime") == stat.st_mtime:
+            return True
+        # 복사/태그 편집 등으로 수정 시각만 바뀐 경우 내용 해시로 판단
+        if entry.get("sha1") == file_sha1(source):
+            entry["mtime"] = stat.st_mtime
+            return True
+        return False
+
+    def _convert(self, source, name):
+        output = os.path.join(self.target_dir, name)
+        tmp_path = f"{output}.part"
+        encoder = FORMATS[self.codec][0]
+        cmd = [self.ffmpeg, "-hide_banner", "-loglevel", "error", "-nostdin", "-y", "-threads", "1",
+               "-i", source, "-map", "0:a:0", "-map_metadata", "0", "-c:a", encoder]
+        if self.bitrate:
+            cmd += ["-b:a", self.bitrate]
+        cmd += ["-f", {"aac": "ipod", "opus": "ogg"}.get(self.codec, self.codec), tmp_path]
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        if result.returncode != 0 or not os.path.exists(tmp_path):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, output)
+        return True
+
+    def _job(self, track, name, started):
+        source = track["path"]
+        entry = self.manifest.get(name)
+        key = "failed"
+        try:
+            if self.cancelled.is_set():
+                key = "cancelled"  # 진행률이 전체 수에 도달하도록 취소된 곡도 셈
+            elif self._unchanged(source, name, entry):
+                key = "skipped"
+            elif self._convert(source, name):
+                stat = os.stat(source)
+                entry = {"source": source, "size": stat.st_size, "mtime": stat.st_mtime,
+                         "sha1": file_sha1(source), "settings": self.settings}
+                key = "converted"
+        except OSError:
+            key = "failed"
+        with self.lock:
+            self.stats[key] += 1
+            if key == "converted":
+                self.stats["bytes_in"] += entry["size"]
+                self.stats["audio_seconds"] += track.get("duration") or 0
+            if key in ("converted", "skipped"):
+                self.manifest[name] = entry
+            self.stats["elapsed"] = time.perf_counter() - started
+            done = sum(self.stats[k] for k in ("converted", "skipped", "failed", "cancelled"))
+            stats = dict(self.stats)
+        if self.on_progress:
+            self.on_progress(done, self.total, stats)
+
+    def start(self, tracks):
+        threading.Thread(target=self.run, args=(tracks,), daemon=True).start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self, tracks):
+        """tracks: path/title/artist/duration 을 가진 dict 목록. 끝나면 통계 dict 반환"""
+        os.makedirs(self.target_dir, exist_ok=True)
+        self._load_manifest()
+        jobs = [(track, name) for track, name in self._output_names(tracks) if os.path.exists(track["path"])]
+        self.total = len(jobs)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for track, name in jobs:
+                executor.submit(self._job, track, name, started)
+        self._save_manifest()
+        self.stats["elapsed"] = time.perf_counter() - started
+        if self.on_finished:
+            self.on_finished(dict(self.stats))
+        return dict(self.stats)
+
+
+def describe_stats(stats):
+    """통계를 한 줄 요약으로 (변환 수, 건너뛴 수, 처리량)"""
+    elapsed = max(stats["elapsed"], 1e-6)
+    text = f"{stats['converted']} converted, {stats['skipped']} unchanged, {stats['failed']} failed"
+    if stats.get("cancelled"):
+        text += f", {stats['cancelled']} cancelled"
+    text += f" in {stats['elapsed']:.1f}s"
+    if stats["converted"]:
+        text += f" ({stats['bytes_in'] / elapsed / 1e6:.1f} MB/s"
+        if stats["audio_seconds"]:
+            text += f", {stats['audio_seconds'] / elapsed:.0f}x real time"
+        text += ")"
+    return text
+
+
+def _run_benchmark(audio_path, ffmpeg_path, copies=16):
+    """같은 파일 여러 개를 1 작업자/전체 코어로 내보내 처리량 비교, 두 번째 실행은 모두 건너뛰는지 확인"""
+    import shutil
+    import tempfile
+    from mutagen import File as MutagenFile
+    work_dir = tempfile.mkdtemp()
+    audio = MutagenFile(audio_path)
+    duration = audio.info.length if audio else 0
+    tracks = []
+    for i in range(copies):
+        path = os.path.join(work_dir, f"track{i}{os.path.splitext(audio_path)[1]}")
+        shutil.copy(audio_path, path)
+        tracks.append({"path": path, "title": f"Track {i}", "artist": "Benchmark", "duration": duration})
+    try:
+        for workers in (1, os.cpu_count()):
+            target = os.path.join(work_dir, f"out{workers}")
+            stats = LibraryExporter(ffmpeg_path, target, "mp3", max_workers=workers).run(tracks)
+            print(f"{workers} worker(s): {describe_stats(stats)}")
+        stats = LibraryExporter(ffmpeg_path, target, "mp3").run(tracks)
+        print(f"re-export: {describe_stats(stats)}")
+        os.utime(tracks[0]["path"])  # 수정 시각만 변경 -> 해시로 건너뜀
+        stats = LibraryExporter(ffmpeg_path, target, "mp3").run(tracks)
+        print(f"after touch: {describe_stats(stats)}")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    import sys
+    _run_benchmark(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import heapq
+import threading
+from collections import deque
+
+EVENT_KINDS = ("start", "finish", "skip", "seek")
+
+
+class TrackStats:
+    __slots__ = ("starts", "finishes", "skips", "seeks", "last_played", "listened")
+
+    def __init__(self, starts=0, finishes=0, skips=0, seeks=0, last_played=0.0, listened=0.0):
+        self.starts = starts
+        self.finishes = finishes
+        self.skips = skips
+        self.seeks = seeks
+        self.last_played = last_played
+        self.listened = listened  # 들은 시간(초) 합계
+
+    @property
+    def skip_rate(self):
+        ended = self.finishes + self.skips
+        return self.skips / ended if ended else 0.0
+
+    def to_list(self):
+        return [self.starts, self.finishes, self.skips, self.seeks, self.last_played, self.listened]
+
+
+class PlayHistory:
+    """재생 기록: 추가 전용 이벤트 로그(history.log) + 점진적으로 갱신되는 집계
+
+    record() 는 GUI 스레드에서 바로 반환하고, 쌓인 이벤트는 작업 스레드가 묶어서 로그에 덧붙인다.
+    집계는 이벤트마다 갱신되며 history_stats.json 에 로그 위치(offset)와 함께 저장되므로,
+    시작할 때는 저장된 집계를 읽고 그 뒤에 추가된 로그만 다시 적용한다.
+    """
+
+    def __init__(self, data_dir, flush_interval=2.0, snapshot_every=500, recent_size=200):
+        self.log_path = os.path.join(data_dir, "history.log")
+        self.snapshot_path = os.path.join(data_dir, "history_stats.json")
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.tracks = {}  # 경로 -> TrackStats
+        self.daily = {}  # "YYYY-MM-DD" -> 재생 시작 수
+        self.recent = deque(maxlen=recent_size)  # (시각, 경로)
+        self.pending = []
+        self.since_snapshot = 0
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # 로그 추가와 집계 저장 순서 보장
+        self.wake = threading.Event()
+        self.closing = threading.Event()  # close() 가 작업 스레드에 보내는 종료 신호
+        os.makedirs(data_dir, exist_ok=True)
+        self._load()
+        self.writer = threading.Thread(target=self._run, daemon=True)
+        self.writer.start()
+
+    def _load(self):
+        offset = 0
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            offset = snapshot["offset"]
+            self.tracks = {path: TrackStats(*values) for path, values in snapshot["tracks"].items()}
+            self.daily = snapshot["daily"]
+            self.recent.extend(tuple(entry) for entry in snapshot["recent"])
+        except (OSError, ValueError, KeyError, TypeError):
+            offset = 0
+        if not os.path.exists(self.log_path):
+            return
+        if os.path.getsize(self.log_path) < offset:
+            # 로그가 집계보다 짧으면(로그를 지운 경우 등) 처음부터 다시 집계
+            self.tracks, self.daily, offset = {}, {}, 0
+            self.recent.clear()
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    self._apply(json.loads(line))
+                except ValueError:
+                    continue  # 비정상 종료로 잘린 마지막 줄
+
+    def _apply(self, event):
+        kind, path, at = event["e"], event["p"], event["t"]
+        stats = self.tracks.get(path)
+        if stats is None:
+            stats = self.tracks[path] = TrackStats()
+        if kind == "start":
+            stats.starts += 1
+            stats.last_played = at
+            self.recent.append((at, path))
+            day = time.strftime("%Y-%m-%d", time.localtime(at))
+            self.daily[day] = self.daily.get(day, 0) + 1
+        elif kind == "finish":
+            stats.finishes += 1
+            stats.listened += event.get("l", 0)
+        elif kind == "skip":
+            stats.skips += 1
+            stats.listened += event.get("l", 0)
+        elif kind == "seek":
+            stats.seeks += 1
+
+    def record(self, kind, path, position=0.0, listened=0.0):
+        """kind: start/finish/skip/seek. position 은 이벤트 시점의 재생 위치, listened 는 이번 재생에서 들은 시간"""
+        event = {"t": round(time.time(), 3), "e": kind, "p": path, "pos": round(position, 2)}
+        if listened:
+            event["l"] = round(listened, 2)
+        with self.lock:
+            self._apply(event)
+            self.pending.append(event)
+        self.wake.set()
+
+    def _run(self):
+        while True:
+            self.wake.wait(self.flush_interval)
+            # 이벤트가 몰릴 때 한 번에 쓰도록 잠시 모음. 종료 신호를 받으면 남은 기록은 close() 가 직접 씀
+            if self.closing.wait(self.flush_interval):
+                return
+            self.wake.clear()
+            self.flush()
+
+    def flush(self, force_snapshot=False):
+        with self.flush_lock:
+            self._flush(force_snapshot)
+
+    def _flush(self, force_snapshot):
+        with self.lock:
+            batch, self.pending = self.pending, []
+            self.since_snapshot += len(batch)
+            snapshot = None
+            if self.since_snapshot >= self.snapshot_every or (force_snapshot and self.since_snapshot):
+                # 집계는 방금 꺼낸 이벤트까지 반영된 상태 (lock 으로 record 와 직렬화)
+                snapshot = {
+                    "tracks": {path: stats.to_list() for path, stats in self.tracks.items()},
+                    "daily": dict(self.daily),
+                    "recent": list(self.recent),
+                }
+                self.since_snapshot = 0
+        if not batch and snapshot is None:
+            return
+        with open(self.log_path, "ab") as f:
+            f.write(b"".join(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n" for event in batch))
+            offset = f.tell()
+        if snapshot is not None:
+            snapshot["offset"] = offset
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+
+    def close(self):
+        """작업 스레드를 기다리지 않고 남은 이벤트와 집계를 바로 기록 (쓰는 중이면 flush_lock 에서 그만큼만 대기)"""
+        self.closing.set()
+        self.wake.set()
+        self.flush(force_snapshot=True)
+
+    # 조회: 모두 메모리의 집계만 사용 (로그를 읽지 않음)
+    def get(self, path):
+        return self.tracks.get(path)
+
+    def most_played(self, count=10):
+        """끝까지 들은 횟수 기준 (라이브러리의 재생 횟수와 같은 값)"""
+        return heapq.nlargest(count, ((stats.finishes, path) for path, stats in self.tracks.items()
+                                      if stats.finishes))
+
+    def play_counts(self):
+        """경로 -> 끝까지 들은 횟수. 라이브러리의 play_count 는 이 값을 따름"""
+        return {path: stats.finishes for path, stats in self.tracks.items() if stats.finishes}
+
+    def most_skipped(self, count=10, min_plays=3):
+        return heapq.nlargest(count, ((stats.skip_rate, path) for path, stats in self.tracks.items()
+                                      if stats.finishes + stats.skips >= min_plays and stats.skips))
+
+    def recently_played(self, count=10):
+        """최근 재생한 곡 (같은 곡은 한 번만)"""
+        seen = set()
+        result = []
+        for at, path in reversed(self.recent):
+            if path not in seen:
+                seen.add(path)
+                result.append((at, path))
+                if len(result) == count:
+                    break
+        return result
+
+    def plays_between(self, first_day, last_day):
+        return sum(count for day, count in self.daily.items() if first_day <= day <= last_day)
+
+
+def _run_benchmark(events=1_000_000, tracks=20000):
+    import random
+    import tempfile
+    data_dir = tempfile.mkdtemp()
+    history = PlayHistory(data_dir)
+    paths = [f"/music/track{i}.mp3" for i in range(tracks)]
+    start = time.perf_counter()
+    for i in range(events):
+        path = random.choice(paths)
+        history.record("start", path)
+        history.record("finish" if i % 3 else "skip", path, listened=120)
+    elapsed = time.perf_counter() - start
+    history.close()
+    print(f"record(): {2 * events / elapsed:,.0f} events/s, log {os.path.getsize(history.log_path) / 1e6:.0f} MB")
+    start = time.perf_counter()
+    history.most_played(10)
+    history.most_skipped(10)
+    history.recently_played(10)
+    print(f"stats queries over {tracks} tracks: {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    reloaded = PlayHistory(data_dir)
+    print(f"reload from snapshot: {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"same totals: {sum(s.starts for s in reloaded.tracks.values()) == events}")
+    reloaded.close()
+
+
+if __name__ == '__main__':
+    _run_benchmark()
@@ -0,0 +1,872 @@
+import os
+import re
+import json
+import time
+import shlex
+import bisect
+import threading
+from array import array
+from datetime import datetime
+
+
+def default_data_dir():
+    """라이브러리/설정 파일을 저장하는 기본 폴더"""
+    return os.path.join(os.path.expanduser("~"), ".mp3player")
+
+
+class LibraryLock:
+    """data_dir/library.lock 에 대한 프로세스 간 배타 잠금
+
+    GUI 와 배치 다운로더(batch_download.py)는 라이브러리 전체를 덮어써 저장하므로 한쪽만 쓰도록 한다.
+    OS 파일 잠금이라 프로세스가 비정상 종료해도 자동으로 풀린다.
+    """
+
+    def __init__(self, data_dir=None):
+        self.path = os.path.join(data_dir or default_data_dir(), "library.lock")
+        self.file = None
+
+    def acquire(self):
+        """잠금을 얻으면 True, 다른 프로세스가 잡고 있으면 False (기다리지 않음)"""
+        if self.file is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a+b")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self.file = f
+        return True
+
+    def release(self):
+        if self.file is not None:
+            self.file.close()  # 파일을 닫으면 잠금도 풀림
+            self.file = None
+
+
+def _words(text):
+    return re.findall(r"\w+", text.casefold())
+
+
+def _atomic_write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class SortedIndex:
+    """숫자 컬럼용 정렬 인덱스: 범위 조회를 bisect 로 처리 (키/ID 는 array 로 저장)"""
+
+    def __init__(self):
+        self.keys = array("d")
+        self.ids = array("I")
+
+    def rebuild(self, pairs):
+        pairs = sorted(pairs)
+        self.keys = array("d", (value for value, _ in pairs))
+        self.ids = array("I", (track_id for _, track_id in pairs))
+
+    def insert(self, value, track_id):
+        pos = bisect.bisect_right(self.keys, value)
+        self.keys.insert(pos, value)
+        self.ids.insert(pos, track_id)
+
+    def remove(self, value, track_id):
+        lo = bisect.bisect_left(self.keys, value)
+        hi = bisect.bisect_right(self.keys, value)
+        for pos in range(lo, hi):
+            if self.ids[pos] == track_id:
+                del self.keys[pos]
+                del self.ids[pos]
+                return
+
+    def range(self, low=None, high=None, include_low=True, include_high=True):
+        if low is None:
+            lo = 0
+        elif include_low:
+            lo = bisect.bisect_left(self.keys, low)
+        else:
+            lo = bisect.bisect_right(self.keys, low)
+        if high is None:
+            hi = len(self.keys)
+        elif include_high:
+            hi = bisect.bisect_right(self.keys, high)
+        else:
+            hi = bisect.bisect_left(self.keys, high)
+        return set(self.ids[lo:hi])
+
+
+def _keyword(value):
+    """키워드 색인 값 (대소문자 무시: key:am 과 key:Am 이 같은 곡을 찾음)"""
+    return value.casefold() if value else value
+
+
+def _postings_remove(postings, key, track_id):
+    ids = postings.get(key)
+    if ids is None:
+        return False
+    try:
+        ids.remove(track_id)
+    except ValueError:
+        pass
+    if not ids:
+        del postings[key]
+        return True
+    return False
+
+
+class WordIndex:
+    """텍스트 컬럼용 단어 역색인: 단어 접두어 조회를 정렬된 단어 목록에서 bisect 로 처리"""
+
+    def __init__(self):
+        self.postings = {}  # 단어 -> array 트랙 ID 목록
+        self.sorted_words = []
+        self.dirty = False
+
+    def add(self, text, track_id):
+        for word in set(_words(text)):
+            if word not in self.postings:
+                self.postings[word] = array("I")
+                self.dirty = True
+            self.postings[word].append(track_id)
+
+    def remove(self, text, track_id):
+        for word in set(_words(text)):
+            if _postings_remove(self.postings, word, track_id):
+                self.dirty = True
+
+    def prefix(self, prefix):
+        if self.dirty:
+            self.sorted_words = sorted(self.postings)
+            self.dirty = False
+        result = set()
+        pos = bisect.bisect_left(self.sorted_words, prefix)
+        while pos < len(self.sorted_words) and self.sorted_words[pos].startswith(prefix):
+            result.update(self.postings[self.sorted_words[pos]])
+            pos += 1
+        return result
+
+
+class StringPool:
+    """사전 인코딩용 문자열 풀: 같은 문자열은 한 번만 저장하고 정수 코드로 참조"""
+
+    def __init__(self):
+        self.strings = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.strings.append(value)
+            self.codes[value] = code
+        return code
+
+    def decode(self, code):
+        return self.strings[code]
+
+
+# 컬럼 구성: 숫자 컬럼은 array, 반복이 많은 문자열은 사전 인코딩, 일부 곡에만 있는 값은 dict
+# bpm/key/trim_* 는 백그라운드 분석 결과, analyzed 는 분석한 파일의 수정 시각 (다르면 다시 분석)
+# trim_start/trim_end 는 앞뒤 무음을 뺀 재생 구간(초, 0 이면 자르지 않음)
+NUMERIC_COLUMNS = {"duration": "f", "bitrate": "I", "added": "d", "play_count": "I", "mtime": "d",
+                   "bpm": "f", "analyzed": "d", "analysis_version": "I", "trim_start": "f", "trim_end": "f"}
+ANALYSIS_COLUMNS = ("bpm", "key", "trim_start", "trim_end", "analyzed", "analysis_version")
+POOLED_COLUMNS = ("artist", "source", "art", "key")
+SPARSE_COLUMNS = ("thumbnail_url", "video_id")
+COLUMNS = ("path", "title") + tuple(NUMERIC_COLUMNS) + POOLED_COLUMNS + SPARSE_COLUMNS
+SAVE_DELAY = 1.0  # request_save(): 마지막 변경 후 이 시간(초)이 지나면 기록
+
+
+class TrackView:
+    """컬럼 저장소의 한 행을 dict 처럼 읽고 쓰기 위한 가벼운 뷰"""
+
+    __slots__ = ("store", "track_id")
+
+    def __init__(self, store, track_id):
+        self.store = store
+        self.track_id = track_id
+
+    def __getitem__(self, column):
+        return self.store.get_value(self.track_id, column)
+
+    def __setitem__(self, column, value):
+        self.store.set_value(self.track_id, column, value)
+
+    def get(self, column, default=None):
+        if column not in COLUMNS:
+            return default
+        return self.store.get_value(self.track_id, column)
+
+    def to_dict(self):
+        return {column: self[column] for column in COLUMNS}
+
+
+class SongStore:
+    """곡 메타데이터 컬럼 저장소. 트랙 ID 가 곧 행 번호이며 삭제된 행은 paths 가 None"""
+
+    def __init__(self):
+        self.paths = [None]  # 0번 행은 사용하지 않음 (트랙 ID 는 1부터)
+        self.titles = [None]
+        self.numeric = {column: array(code, [0]) for column, code in NUMERIC_COLUMNS.items()}
+        self.pools = {column: StringPool() for column in POOLED_COLUMNS}
+        self.pooled = {column: array("I", [self.pools[column].encode(None)]) for column in POOLED_COLUMNS}
+        self.sparse = {column: {} for column in SPARSE_COLUMNS}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, track_id):
+        return 0 < track_id < len(self.paths) and self.paths[track_id] is not None
+
+    def __iter__(self):
+        paths = self.paths
+        return (track_id for track_id in range(1, len(paths)) if paths[track_id] is not None)
+
+    def __getitem__(self, track_id):
+        if track_id not in self:
+            raise KeyError(track_id)
+        return TrackView(self, track_id)
+
+    def get(self, track_id, default=None):
+        return TrackView(self, track_id) if track_id in self else default
+
+    def values(self):
+        return (TrackView(self, track_id) for track_id in self)
+
+    def items(self):
+        return ((track_id, TrackView(self, track_id)) for track_id in self)
+
+    def put(self, track_id, track):
+        """행 기록 (track_id 가 끝을 넘으면 빈 행을 채워 늘림)"""
+        while len(self.paths) <= track_id:
+            self.paths.append(None)
+            self.titles.append(None)
+            for column in self.numeric.values():
+                column.append(0)
+            for column, values in self.pooled.items():
+                values.append(self.pools[column].encode(None))
+        if self.paths[track_id] is None:
+            self.count += 1
+        for column in COLUMNS:
+            self.set_value(track_id, column, track.get(column))
+
+    def delete(self, track_id):
+        if track_id in self:
+            self.paths[track_id] = None
+            self.titles[track_id] = None
+            for column in SPARSE_COLUMNS:
+                self.sparse[column].pop(track_id, None)
+            self.count -= 1
+
+    def get_value(self, track_id, column):
+        if column == "path":
+            return self.paths[track_id]
+        if column == "title":
+            return self.titles[track_id]
+        if column in self.numeric:
+            return self.numeric[column][track_id]
+        if column in self.pooled:
+            return self.pools[column].decode(self.pooled[column][track_id])
+        return self.sparse[column].get(track_id)
+
+    def set_value(self, track_id, column, value):
+        if column == "path":
+            self.paths[track_id] = value
+        elif column == "title":
+            self.titles[track_id] = value
+        elif column in self.numeric:
+            self.numeric[column][track_id] = value or 0
+        elif column in self.pooled:
+            self.pooled[column][track_id] = self.pools[column].encode(value)
+        elif value is None:
+            self.sparse[column].pop(track_id, None)
+        else:
+            self.sparse[column][track_id] = value
+
+    def to_columns(self):
+        """저장용 컬럼 형식 (삭제된 행은 제외)"""
+        ids = list(self)
+        data = {"id": ids}
+        for column in COLUMNS:
+            data[column] = [self.get_value(track_id, column) for track_id in ids]
+        return data
+
+
+class QueryError(ValueError):
+    pass
+
+
+NUMERIC_FIELDS = {
+    "duration": "duration",
+    "length": "duration",
+    "bitrate": "bitrate",
+    "added": "added",
+    "plays": "play_count",
+    "playcount": "play_count",
+    "bpm": "bpm",
+    "tempo": "bpm",
+}
+TEXT_FIELDS = {"artist": "artist", "title": "title"}
+KEYWORD_FIELDS = {"source": "source", "key": "key"}
+
+QUERY_FIELDS = set(NUMERIC_FIELDS) | set(TEXT_FIELDS) | set(KEYWORD_FIELDS)
+_FIELD_RE = re.compile(r"(?:^|\s)[-\"']?(\w+):")
+_RANGE_RE = re.compile(r"^(.*?)\.\.(.*)$")
+_COMPARE_RE = re.compile(r"^(>=|<=|>|<|=)?(.*)$")
+_AGE_RE = re.compile(r"^(\d+(?:\.\d+)?)([hdwmy])$")
+_AGE_UNITS = {"h": 3600, "d": 86400, "w": 604800, "m": 2592000, "y": 31536000}
+
+
+def _parse_number(field, text):
+    text = text.strip()
+    if field == "duration" and ":" in text:
+        minutes, _, seconds = text.partition(":")
+        return int(minutes) * 60 + float(seconds)
+    if field == "added":
+        age = _AGE_RE.match(text)
+        if age:
+            # "added:<7d" 처럼 상대 기간은 "지금으로부터 N 이내" 를 뜻함
+            return time.time() - float(age.group(1)) * _AGE_UNITS[age.group(2)]
+        try:
+            return datetime.strptime(text, "%Y-%m-%d").timestamp()
+        except ValueError:
+            pass
+    try:
+        return float(text)
+    except ValueError:
+        raise QueryError(f"Invalid value for {field}: {text}")
+
+
+class Clause:
+    """컴파일된 조건 하나: 인덱스 조회(lookup)와 단일 곡 판정(matches)을 함께 제공"""
+
+    def __init__(self, lookup, matches, negate=False):
+        self.lookup = lookup
+        self.matches_track = matches
+        self.negate = negate
+
+    def matches(self, track):
+        return self.matches_track(track) != self.negate
+
+
+class CompiledQuery:
+    """OR 로 묶인 AND 그룹 목록"""
+
+    def __init__(self, text, groups):
+        self.text = text
+        self.groups = groups
+
+    def evaluate(self, library):
+        result = set()
+        for group in self.groups:
+            positives = [c for c in group if not c.negate]
+            negatives = [c for c in group if c.negate]
+            if positives:
+                sets = sorted((c.lookup(library) for c in positives), key=len)
+                ids = set(sets[0])
+                for other in sets[1:]:
+                    ids &= other
+                    if not ids:
+                        break
+            else:
+                ids = set(library.tracks)
+            for c in negatives:
+                ids -= c.lookup(library)
+            result |= ids
+        return result
+
+    def matches(self, track):
+        return any(all(c.matches(track) for c in group) for group in self.groups)
+
+
+def _compile_clause(token):
+    negate = token.startswith("-") and len(token) > 1
+    if negate:
+        token = token[1:]
+    field, sep, value = token.partition(":")
+    field = field.lower()
+    if not sep:
+        field, value = "", token
+    if not value:
+        raise QueryError(f"Empty value in '{token}'")
+
+    if field in NUMERIC_FIELDS:
+        column = NUMERIC_FIELDS[field]
+        range_match = _RANGE_RE.match(value)
+        if range_match:
+            low = _parse_number(column, range_match.group(1)) if range_match.group(1) else None
+            high = _parse_number(column, range_match.group(2)) if range_match.group(2) else None
+            include_low = include_high = True
+        else:
+            op, number = _COMPARE_RE.match(value).groups()
+            number = _parse_number(column, number)
+            if column == "added" and _AGE_RE.match(value.lstrip("<>=")):
+                # 상대 기간은 비교 방향이 반대 ("<7d" = 7일 이내 = 시각이 더 큼)
+                op = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}.get(op or "<", op)
+            low = high = None
+            include_low = include_high = True
+            if op in (None, "="):
+                low = high = number
+            elif op in (">", ">="):
+                low, include_low = number, op == ">="
+            else:
+                high, include_high = number, op == "<="
+
+        def matches(track):
+            v = track[column]
+            if low is not None and (v < low if include_low else v <= low):
+                return False
+            if high is not None and (v > high if include_high else v >= high):
+                return False
+            return True
+
+        return Clause(lambda lib: lib.numeric[column].range(low, high, include_low, include_high), matches, negate)
+
+    if field in KEYWORD_FIELDS:
+        column = KEYWORD_FIELDS[field]
+        key = value.casefold()
+        return Clause(lambda lib: set(lib.keywords[column].get(key, ())),
+                      lambda track: _keyword(track[column]) == key, negate)
+
+    if field in TEXT_FIELDS or field == "":
+        columns = [TEXT_FIELDS[field]] if field else ["title", "artist"]
+        exact = value.startswith("=")
+        if exact:
+            # artist:=IU 처럼 '=' 로 시작하면 전체 일치
+            key = value[1:].casefold()
+            key_words = _words(key)
+
+            def lookup(lib):
+                ids = set()
+                for column in columns:
+                    index = lib.text[column]
+                    # 전체 일치면 모든 단어가 그대로 들어 있어야 하므로 단어별 목록의 교집합만 확인
+                    candidates = None
+                    for word in key_words:
+                        found = set(index.postings.get(word, ()))
+                        candidates = found if candidates is None else candidates & found
+                    if candidates is None:
+                        candidates = index.prefix("")
+                    ids |= {i for i in candidates if lib.tracks[i][column].casefold() == key}
+                return ids
+
+            return Clause(lookup, lambda track: any(track[c].casefold() == key for c in columns), negate)
+
+        words = _words(value)
+        if not words:
+            raise QueryError(f"Invalid text value: {value}")
+
+        def lookup(lib):
+            ids = set()
+            for column in columns:
+                column_ids = None
+                for word in words:
+                    found = lib.text[column].prefix(word)
+                    column_ids = found if column_ids is None else column_ids & found
+                ids |= column_ids
+            return ids
+
+        def matches(track):
+            for column in columns:
+                track_words = _words(track[column])
+                if all(any(w.startswith(word) for w in track_words) for word in words):
+                    return True
+            return False
+
+        return Clause(lookup, matches, negate)
+
+    raise QueryError(f"Unknown field: {field}")
+
+
+def is_query(text):
+    """알려진 필드 이름 뒤에 ':' 가 붙은 조건이 있으면 쿼리 ("Re:Zero", "Part 2: Finale" 는 일반 검색어)"""
+    return any(field.lower() in QUERY_FIELDS for field in _FIELD_RE.findall(text))
+
+
+def compile_query(text):
+    """스마트 재생목록 쿼리 컴파일
+
+    예) artist:iu duration:3:00..5:00 source:youtube added:<30d plays:>=5 OR title:love
+        bpm:120..130 key:am (BPM/키는 백그라운드 분석 결과)
+    공백으로 나뉜 조건은 AND, OR 로 그룹을 나누며 '-' 접두어는 제외 조건이다.
+    """
+    try:
+        tokens = shlex.split(text)
+    except ValueError as e:
+        raise QueryError(str(e))
+    groups = [[]]
+    for token in tokens:
+        if token.upper() == "OR":
+            groups.append([])
+        else:
+            groups[-1].append(_compile_clause(token))
+    groups = [g for g in groups if g]
+    if not groups:
+        raise QueryError("Empty query")
+    return CompiledQuery(text, groups)
+
+
+class SmartPlaylist:
+    """저장된 쿼리와 결과 집합. 라이브러리 변경 시 해당 곡만 다시 판정"""
+
+    def __init__(self, name, query):
+        self.name = name
+        self.query = compile_query(query)
+        self.track_ids = set()
+
+    def evaluate(self, library):
+        self.track_ids = self.query.evaluate(library)
+        return self.track_ids
+
+    def track_changed(self, track_id, track):
+        if track is not None and self.query.matches(track):
+            self.track_ids.add(track_id)
+        else:
+            self.track_ids.discard(track_id)
+
+
+class SongLibrary:
+    """곡 메타데이터 색인 (제목, 아티스트, 길이, 비트레이트, 추가일, 재생 횟수, 출처)"""
+
+    def __init__(self, data_dir=None):
+        self.data_dir = data_dir or default_data_dir()
+        self.library_file = os.path.join(self.data_dir, "library.json")
+        self.playlists_file = os.path.join(self.data_dir, "smart_playlists.json")
+        self.lock = threading.RLock()
+        self.save_lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+        self.save_due = None  # request_save() 로 예약된 저장 시각 (monotonic)
+        self.saving = False
+        self.read_only = False  # 다른 프로세스가 LibraryLock 을 잡고 있으면 저장하지 않음
+        self.load_error = None  # load() 가 library.json 을 읽지 못했을 때 사용자에게 보여 줄 메시지
+        self.smart_playlists = {}
+        self._clear()
+
+    def _clear(self):
+        self.tracks = SongStore()
+        self.path_ids = {}
+        self.video_ids = {}  # YouTube 영상 ID -> 트랙 ID
+        self.next_id = 1
+        self.text = {column: WordIndex() for column in TEXT_FIELDS.values()}
+        self.keywords = {column: {} for column in KEYWORD_FIELDS.values()}
+        self.numeric = {column: SortedIndex() for column in set(NUMERIC_FIELDS.values())}
+
+    def load(self):
+        if os.path.exists(self.library_file):
+            try:
+                with open(self.library_file, encoding="utf-8") as f:
+                    data = json.load(f)
+                if "columns" in data:
+                    columns = data["columns"]
+                    names = [name for name in COLUMNS if name in columns]
+                    for row, track_id in enumerate(columns["id"]):
+                        self._insert(track_id, {name: columns[name][row] for name in names}, sort=False)
+                else:
+                    for track in data.get("tracks", []):
+                        self._insert(track.pop("id"), track, sort=False)
+                # 정렬 인덱스는 곡마다 삽입하지 않고 한 번에 정렬해 구축
+                for column, index in self.numeric.items():
+                    values = self.tracks.numeric[column]
+                    index.rebuild((values[i], i) for i in self.tracks)
+                self.next_id = max(data.get("next_id", 1), self.next_id)
+            except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+                self._load_failed(e)
+        if os.path.exists(self.playlists_file):
+            try:
+                with open(self.playlists_file, encoding="utf-8") as f:
+                    for name, query in json.load(f).items():
+                        try:
+                            self.smart_playlists[name] = SmartPlaylist(name, query)
+                        except QueryError:
+                            continue
+            except (OSError, ValueError):
+                pass
+
+    def _load_failed(self, error):
+        """일부만 읽힌 곡은 버리고 빈 라이브러리로 시작
+
+        그대로 두면 다음 저장이 잘린 목록으로 library.json 을 덮어쓰므로, 원본은 옆으로 옮겨 보존한다.
+        옮기지 못하면 이번 실행에서는 저장하지 않는다.
+        """
+        self._clear()
+        backup = f"{self.library_file}.{time.strftime('%Y%m%d-%H%M%S')}.bad"
+        try:
+            os.replace(self.library_file, backup)
+        except OSError:
+            self.read_only = True
+            self.load_error = (f"Could not read {self.library_file} ({error}). "
+                               f"The library was not loaded and changes will not be saved.")
+            return
+        self.load_error = (f"Could not read {self.library_file} ({error}). "
+                           f"It was moved to {backup} and the library starts empty.")
+
+    def save(self):
+        """지금 바로 전체 기록 (종료 시/배치 작업). 예약된 request_save() 도 함께 처리된다"""
+        with self.pending_lock:
+            self.save_due = None
+        if self.read_only:
+            return
+        # 스냅샷을 save_lock 안에서 떠야 동시에 저장될 때 오래된 스냅샷이 나중에 기록되지 않음
+        with self.save_lock:
+            with self.lock:
+                columns = self.tracks.to_columns()
+                playlists = {name: p.query.text for name, p in self.smart_playlists.items()}
+                next_id = self.next_id
+            os.makedirs(self.data_dir, exist_ok=True)
+            _atomic_write_json(self.library_file, {"next_id": next_id, "columns": columns})
+            _atomic_write_json(self.playlists_file, playlists)
+
+    def request_save(self):
+        """GUI 에서 변경 후 호출: SAVE_DELAY 초 뒤 작업 스레드에서 저장
+
+        그 사이에 들어온 요청은 한 번의 기록으로 합쳐지므로 연달아 바꿔도 전체 JSON 을 매번 다시 쓰지 않는다.
+        """
+        with self.pending_lock:
+            self.save_due = time.monotonic() + SAVE_DELAY
+            if self.saving:
+                return  # 작업 스레드가 새 시각까지 기다렸다가 기록
+            self.saving = True
+        threading.Thread(target=self._save_pending, daemon=True).start()
+
+    def _save_pending(self):
+        while True:
+            with self.pending_lock:
+                if self.save_due is None:
+                    self.saving = False
+                    return
+                delay = self.save_due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+                continue
+            try:
+                self.save()
+            except OSError:
+                pass
+
+    def add_track(self, path, title, artist, duration=0, bitrate=0, source="local",
+                  thumbnail_url=None, added=None, video_id=None, mtime=None):
+        """곡 추가 또는 갱신 후 트랙 ID 반환 (재생 횟수/추가일은 유지)"""
+        with self.lock:
+            track_id = self.path_ids.get(path)
+            if track_id is not None:
+                old = self.tracks[track_id]
+                added = old["added"]
+                play_count = old["play_count"]
+                video_id = video_id or old.get("video_id")
+                art = old.get("art")
+                analysis = {column: old[column] for column in ANALYSIS_COLUMNS}
+                self._delete(track_id)
+            else:
+                track_id = self.next_id
+                self.next_id += 1
+                play_count = 0
+                art = None
+                analysis = {}
+            if mtime is None:
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    mtime = 0
+            track = {
+                "path": path,
+                "title": title,
+                "artist": artist,
+                "duration": float(duration or 0),
+                "bitrate": int(bitrate or 0),
+                "added": added if added is not None else time.time(),
+                "play_count": play_count,
+                "source": source,
+                "thumbnail_url": thumbnail_url,
+                "video_id": video_id,
+                "art": art,  # 표지 캐시 키 (None: 미확인, "": 표지 없음)
+                "mtime": mtime,
+                **analysis,
+            }
+            self._insert(track_id, track)
+            self._notify(track_id)
+            return track_id
+
+    def remove_track(self, path):
+        with self.lock:
+            track_id = self.path_ids.get(path)
+            if track_id is None:
+                return
+            self._delete(track_id)
+            self._notify(track_id)
+
+    def record_play(self, path):
+        """끝까지 들은 곡의 재생 횟수 1 증가 (GUI 가 재생 기록에 finish 를 남길 때 함께 호출)"""
+        with self.lock:
+            track_id = self.path_ids.get(path)
+            if track_id is None:
+                return
+            track = self.tracks[track_id]
+            self.numeric["play_count"].remove(track["play_count"], track_id)
+            track["play_count"] += 1
+            self.numeric["play_count"].insert(track["play_count"], track_id)
+            self._notify(track_id)
+
+    def set_play_counts(self, counts):
+        """재생 횟수를 재생 기록(PlayHistory.play_counts())에 맞춤. 바뀐 곡 수 반환"""
+        with self.lock:
+            column = self.tracks.numeric["play_count"]
+            changed = []
+            for track_id in self.tracks:
+                count = counts.get(self.tracks.paths[track_id], 0)
+                if column[track_id] != count:
+                    column[track_id] = count
+                    changed.append(track_id)
+            if changed:
+                self.numeric["play_count"].rebuild((column[i], i) for i in self.tracks)
+                for track_id in changed:
+                    self._notify(track_id)
+            return len(changed)
+
+    def set_analysis(self, path, result, analyzed, version=0):
+        """백그라운드 분석 결과(analysis.analyze_file 의 dict) 기록 (색인 갱신 포함)"""
+        with self.lock:
+            track_id = self.path_ids.get(path)
+            if track_id is None:
+                return
+            track = self.tracks[track_id]
+            self.numeric["bpm"].remove(track["bpm"], track_id)
+            _postings_remove(self.keywords["key"], _keyword(track["key"]), track_id)
+            track["bpm"] = result.get("bpm") or 0
+            track["key"] = result.get("key")
+            track["trim_start"] = result.get("trim_start") or 0
+            track["trim_end"] = result.get("trim_end") or 0
+            track["analyzed"] = analyzed
+            track["analysis_version"] = version
+            # 저장소 형식으로 변환된 값(float32)으로 색인
+            self.numeric["bpm"].insert(track["bpm"], track_id)
+            self.keywords["key"].setdefault(_keyword(track["key"]), array("I")).append(track_id)
+            self._notify(track_id)
+
+    def set_art(self, path, key):
+        with self.lock:
+            track = self.get(path)
+            if track is not None:
+                track["art"] = key
+
+    def get(self, path):
+        track_id = self.path_ids.get(path)
+        return self.tracks.get(track_id) if track_id is not None else None
+
+    def find_video(self, video_id):
+        """이미 받은 영상이면 로컬 파일 경로 반환 (파일이 지워졌으면 None)"""
+        with self.lock:
+            track_id = self.video_ids.get(video_id)
+            path = self.tracks[track_id]["path"] if track_id is not None else None
+        return path if path and os.path.exists(path) else None
+
+    def query(self, text):
+        """쿼리 결과를 추가 순서대로 정렬한 경로 목록으로 반환"""
+        compiled = compile_query(text)
+        with self.lock:
+            return [self.tracks[i]["path"] for i in sorted(compiled.evaluate(self))]
+
+    def save_smart_playlist(self, name, query):
+        playlist = SmartPlaylist(name, query)
+        with self.lock:
+            playlist.evaluate(self)
+            self.smart_playlists[name] = playlist
+        return playlist
+
+    def delete_smart_playlist(self, name):
+        with self.lock:
+            self.smart_playlists.pop(name, None)
+
+    def smart_playlist_paths(self, name):
+        with self.lock:
+            playlist = self.smart_playlists[name]
+            # 상대 날짜 조건(added:<7d)이 시간이 지나며 달라지므로 열 때마다 다시 평가
+            playlist.evaluate(self)
+            return [self.tracks[i]["path"] for i in sorted(playlist.track_ids)]
+
+    def _insert(self, track_id, track, sort=True):
+        self.tracks.put(track_id, track)
+        track = self.tracks[track_id]  # 저장소 형식으로 변환된 값 사용 (예: float32 길이)
+        self.path_ids[track["path"]] = track_id
+        if track["video_id"]:
+            self.video_ids[track["video_id"]] = track_id
+        for column, index in self.text.items():
+            index.add(track[column], track_id)
+        for column, index in self.keywords.items():
+            index.setdefault(_keyword(track[column]), array("I")).append(track_id)
+        if sort:
+            for column, index in self.numeric.items():
+                index.insert(track[column], track_id)
+
+    def _delete(self, track_id):
+        track = self.tracks[track_id]
+        del self.path_ids[track["path"]]
+        if self.video_ids.get(track["video_id"]) == track_id:
+            del self.video_ids[track["video_id"]]
+        for column, index in self.text.items():
+            index.remove(track[column], track_id)
+        for column, index in self.keywords.items():
+            _postings_remove(index, _keyword(track[column]), track_id)
+        for column, index in self.numeric.items():
+            index.remove(track[column], track_id)
+        self.tracks.delete(track_id)
+
+    def _notify(self, track_id):
+        track = self.tracks.get(track_id)
+        for playlist in self.smart_playlists.values():
+            playlist.track_changed(track_id, track)
+
+
+def measure_memory_overhead(count=500000, indexed=False):
+    """곡당 메모리 오버헤드(바이트): 전체 할당량에서 경로/제목/아티스트 문자열 본문 길이를 뺀 값
+
+    200 바이트/곡 목표는 SongStore(곡 메타데이터 자체)에 대한 것이다. indexed=True 면 SongLibrary 로 측정해
+    경로 조회 사전과 쿼리 색인(단어/정렬/키워드)까지 포함한 값을 돌려준다.
+    """
+    import tracemalloc
+    import random
+    artist_names = [f"Artist {i}" for i in range(max(1, count // 50))]
+    picks = [random.randrange(len(artist_names)) for _ in range(count)]
+    payload = sum(len(f"/music/library/{i // 1000}/track_{i}.mp3") + len(f"Title {i}") for i in range(count))
+    payload += sum(len(name) for name in artist_names)
+
+    def rows():
+        # 문자열은 측정 구간 안에서 생성 (파일에서 읽어 들이는 것과 같은 조건)
+        for i in range(count):
+            yield f"/music/library/{i // 1000}/track_{i}.mp3", f"Title {i}", "".join(artist_names[picks[i]])
+
+    tracemalloc.start()
+    try:
+        if indexed:
+            library = SongLibrary(data_dir=os.devnull)
+            for path, title, artist in rows():
+                library.add_track(path, title, artist, 200.0, 320, mtime=0)
+        else:
+            store = SongStore()
+            now = time.time()
+            for track_id, (path, title, artist) in enumerate(rows(), start=1):
+                store.put(track_id, {"path": path, "title": title, "artist": artist, "duration": 200.0,
+                                     "bitrate": 320, "added": now, "play_count": 0, "source": "local", "mtime": now})
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (allocated - payload) / count
+
+
+def _run_memory_benchmark(count=500000):
+    print(f"SongStore: {measure_memory_overhead(count):.1f} bytes/track overhead at {count} tracks (target < 200)")
+    print(f"SongLibrary (store + path lookup + query indexes): "
+          f"{measure_memory_overhead(count, indexed=True):.1f} bytes/track overhead")
+
+
+if __name__ == '__main__':
+    _run_memory_benchmark()
@@ -0,0 +1,110 @@
+import os
+import re
+import bisect
+import threading
+from collections import OrderedDict
+
+_TIME_TAG_RE = re.compile(r"\[(\d+):(\d+(?:\.\d+)?)\]")
+_OFFSET_RE = re.compile(r"\[offset:\s*([+-]?\d+)\]", re.IGNORECASE)
+
+
+class Lyrics:
+    """가사: 정렬된 시각 배열(times)과 줄 배열(lines). times 가 비어 있으면 동기화되지 않은 가사"""
+
+    def __init__(self, times, lines):
+        self.times = times
+        self.lines = lines
+
+    @property
+    def synced(self):
+        return bool(self.times)
+
+    def line_index(self, position):
+        """재생 위치(초)에 해당하는 줄 번호를 이진 탐색으로 찾음 (첫 줄 이전이면 -1)"""
+        return bisect.bisect_right(self.times, position) - 1
+
+
+def parse_lrc(text):
+    """LRC 텍스트 파싱. 한 줄에 시각 태그가 여러 개인 경우도 처리"""
+    offset = 0.0
+    match = _OFFSET_RE.search(text)
+    if match:
+        offset = int(match.group(1)) / 1000
+    entries = []
+    for raw_line in text.splitlines():
+        tags = _TIME_TAG_RE.findall(raw_line)
+        if not tags:
+            continue
+        line = _TIME_TAG_RE.sub("", raw_line).strip()
+        for minutes, seconds in tags:
+            entries.append((max(0.0, int(minutes) * 60 + float(seconds) - offset), line))
+    entries.sort(key=lambda entry: entry[0])
+    return Lyrics([t for t, _ in entries], [line for _, line in entries])
+
+
+def _load_id3_lyrics(path):
+    from mutagen.id3 import ID3, ID3NoHeaderError
+    try:
+        tags = ID3(path)
+    except (ID3NoHeaderError, OSError):
+        return None
+    for frame in tags.getall("SYLT"):
+        # format 2 = 밀리초 단위 타임스탬프
+        if frame.format == 2 and frame.text:
+            entries = sorted(((ts / 1000, text.strip()) for text, ts in frame.text), key=lambda entry: entry[0])
+            return Lyrics([t for t, _ in entries], [line for _, line in entries])
+    for frame in tags.getall("USLT"):
+        if frame.text:
+            lyrics = parse_lrc(frame.text)
+            if lyrics.synced:
+                return lyrics
+            return Lyrics([], [line.strip() for line in frame.text.splitlines()])
+    return None
+
+
+def load_lyrics(path):
+    """사이드카 .lrc 파일 우선, 없으면 ID3 SYLT/USLT 프레임에서 가사 로드"""
+    lrc_path = os.path.splitext(path)[0] + ".lrc"
+    if os.path.exists(lrc_path):
+        for encoding in ("utf-8-sig", "cp949", "latin-1"):
+            try:
+                with open(lrc_path, encoding=encoding) as f:
+                    return parse_lrc(f.read())
+            except UnicodeDecodeError:
+                continue
+    try:
+        return _load_id3_lyrics(path)
+    except Exception:
+        return None
+
+
+class LyricsCache:
+    """곡별 파싱 결과 캐시. 로딩은 백그라운드 스레드에서 수행하고 callback(path, lyrics) 호출"""
+
+    def __init__(self, max_entries=200):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        with self.lock:
+            if path in self.entries:
+                self.entries.move_to_end(path)
+                return True, self.entries[path]
+        return False, None
+
+    def request(self, path, callback):
+        found, lyrics = self.get(path)
+        if found:
+            callback(path, lyrics)
+            return
+        threading.Thread(target=self._load_thread, args=(path, callback), daemon=True).start()
+
+    def _load_thread(self, path, callback):
+        lyrics = load_lyrics(path)
+        with self.lock:
+            self.entries[path] = lyrics
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        callback(path, lyrics)
@@ -0,0 +1,104 @@
+import os
+import sys
+import subprocess
+import threading
+import numpy as np
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+
+def ffmpeg_executable(ffmpeg_dir):
+    """_get_ffmpeg_path 가 돌려준 폴더에서 ffmpeg 실행 파일 경로 구성"""
+    name = "ffmpeg.exe" if sys.platform.startswith("win") else "ffmpeg"
+    return os.path.join(ffmpeg_dir, name) if ffmpeg_dir else name
+
+
+class PcmDecoder:
+    """ffmpeg 로 오디오를 디코딩해 int16 PCM 블록(frames, channels)을 순서대로 읽는 스트림
+
+    feed(read() 를 가진 파일 객체)를 주면 source 대신 feed 에서 읽은 바이트를 ffmpeg 표준 입력으로
+    흘려 넣는다. 다운로드 중인 파일이나 메모리 버퍼를 디코딩할 때 사용.
+    """
+
+    def __init__(self, source, ffmpeg_dir, start=0.0, sample_rate=SAMPLE_RATE, channels=CHANNELS, feed=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        cmd = [ffmpeg_executable(ffmpeg_dir), "-hide_banner", "-loglevel", "error"]
+        if feed is None:
+            cmd.append("-nostdin")
+        else:
+            source = "pipe:0"
+        if start > 0:
+            cmd += ["-ss", f"{start:.3f}"]
+        cmd += ["-i", source, "-f", "s16le", "-acodec", "pcm_s16le",
+                "-ac", str(channels), "-ar", str(sample_rate), "-"]
+        creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        self.process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL if feed is None else subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        creationflags=creationflags)
+        self.feed = feed
+        if feed is not None:
+            threading.Thread(target=self._pump, daemon=True).start()
+
+    def _pump(self):
+        try:
+            while True:
+                data = self.feed.read(65536)
+                if not data:
+                    break
+                self.process.stdin.write(data)
+        except (OSError, ValueError):
+            pass  # close() 로 ffmpeg 가 종료된 경우
+        finally:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            close = getattr(self.feed, "close", None)
+            if close:
+                close()
+
+    def read(self, frames):
+        """최대 frames 프레임을 읽음. 스트림 끝이면 길이 0 배열 반환"""
+        frame_bytes = 2 * self.channels
+        data = self.process.stdout.read(frames * frame_bytes)
+        usable = len(data) - len(data) % frame_bytes
+        return np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, self.channels)
+
+    def error(self):
+        """스트림 끝(read() 가 빈 배열을 돌려준 뒤)에서 호출: ffmpeg 가 실패로 끝났으면 메시지, 정상 종료면 None"""
+        try:
+            code = self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            return None
+        return f"ffmpeg exited with code {code}" if code else None
+
+    def close(self):
+        close_feed = getattr(self.feed, "close", None)
+        if close_feed:
+            close_feed()  # 데이터를 기다리며 멈춰 있는 _pump 를 깨움
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.stdout.close()
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def decode_all(path, ffmpeg_dir, sample_rate=SAMPLE_RATE, channels=CHANNELS, block_frames=65536):
+    """파일 전체를 int16 배열로 디코딩 (분석 작업용)"""
+    blocks = []
+    with PcmDecoder(path, ffmpeg_dir, sample_rate=sample_rate, channels=channels) as decoder:
+        while True:
+            block = decoder.read(block_frames)
+            if not len(block):
+                break
+            blocks.append(block)
+    if not blocks:
+        return np.zeros((0, channels), dtype=np.int16)
+    return np.concatenate(blocks)
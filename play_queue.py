@@ -0,0 +1,71 @@
+import time
+from collections import deque
+
+
+class PlayQueue:
+    """"다음 곡" 대기열: 재생목록 화면과 별개로 트랙 ID 를 deque 에 보관
+
+    add/play_next/pop 이 모두 O(1) 이다. 트랙 ID 는 라이브러리에서 재사용되지 않으므로
+    재시작 후에도 그대로 복원할 수 있고, 그사이 삭제된 곡은 꺼낼 때 건너뛴다.
+    """
+
+    def __init__(self, track_ids=()):
+        self.items = deque(track_ids)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, track_id):
+        """대기열 끝에 추가"""
+        self.items.append(track_id)
+
+    def play_next(self, track_id):
+        """대기열 맨 앞에 추가 (지금 곡이 끝나면 바로 재생)"""
+        self.items.appendleft(track_id)
+
+    def pop(self, valid=None):
+        """맨 앞 트랙 ID 를 꺼냄. valid(track_id) 가 False 인 항목은 버림. 비었으면 None"""
+        while self.items:
+            track_id = self.items.popleft()
+            if valid is None or valid(track_id):
+                return track_id
+        return None
+
+    def peek(self, valid=None):
+        """다음에 꺼낼 트랙 ID (꺼내지 않음)"""
+        while self.items:
+            if valid is None or valid(self.items[0]):
+                return self.items[0]
+            self.items.popleft()
+        return None
+
+    def remove_at(self, indexes):
+        """대기열 보기에서 선택한 위치들을 삭제 (드문 작업이라 선형 처리)"""
+        drop = set(indexes)
+        self.items = deque(track_id for i, track_id in enumerate(self.items) if i not in drop)
+
+    def clear(self):
+        self.items.clear()
+
+
+def _run_benchmark(count=200000):
+    queue = PlayQueue()
+    start = time.perf_counter()
+    for i in range(count):
+        if i % 2:
+            queue.add(i)
+        else:
+            queue.play_next(i)
+    added = time.perf_counter() - start
+    start = time.perf_counter()
+    while queue.pop(lambda track_id: track_id % 7) is not None:
+        pass
+    popped = time.perf_counter() - start
+    print(f"{count} enqueues: {added * 1e9 / count:.0f} ns each, drain: {popped * 1e9 / count:.0f} ns per item")
+
+
+if __name__ == '__main__':
+    _run_benchmark()
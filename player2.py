@@ -1,21 +1,53 @@
 import sys
+from single_instance import InstanceServer, command_from_args, forward_to_running_instance
+
+# 이미 실행 중인 플레이어가 있으면 무거운 초기화(pygame, YouTube API) 전에 인자만 넘기고 종료
+if __name__ == '__main__':
+    forwarded = forward_to_running_instance(sys.argv[1:])
+    if forwarded is not None:
+        sys.exit(forwarded)
+
 import os
 import shutil
-import re
-import urllib.request
-import random
+import time
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QSlider, QLabel, QListWidget, QFileDialog, QDesktopWidget,
-                             QMenuBar, QAction, QLineEdit, QMessageBox, QListWidgetItem)
+                             QMenuBar, QAction, QLineEdit, QMessageBox, QListWidgetItem, QInputDialog,
+                             QActionGroup, QDialog, QMenu)
 from PyQt5.QtCore import Qt, QTimer, QEvent
-from PyQt5.QtGui import QIcon, QPixmap
+from PyQt5.QtGui import QIcon, QPainter, QColor
 from PyQt5.QtWidgets import QStyle
 from mutagen.mp3 import MP3
 import pygame
+import numpy as np
 import uuid
-from googleapiclient.discovery import build
-import yt_dlp
 import threading
+from array import array
+from collections import deque
+from shuffle import ShuffleEngine
+from library import LibraryLock, SongLibrary, QueryError, is_query
+from history import PlayHistory
+from session import SessionStore
+from play_queue import PlayQueue
+from analysis import ANALYSIS_VERSION, LibraryAnalyzer, camelot
+from export import FORMATS, LibraryExporter, describe_stats
+from lyrics import LyricsCache
+from events import EventChannel
+from title_parser import TitleParser
+from covers import CoverLoader, ThumbnailCache, downscale_image
+from spectrum import SpectrumAnalyzer, SpectrumTap
+from audio_output import MIXER_SETTINGS, PcmPlayer
+from audio_engine import RemotePlayer
+from equalizer import BAND_FREQUENCIES, MAX_GAIN_DB, PRESETS, Equalizer
+from timestretch import SPEEDS, TimeStretch
+from youtube_api import YouTubeClient
+from downloader import (BulkImporter, DownloadArchive, StreamingDownload, download_video, read_video_id,
+                        sanitize_title, tag_downloaded_file, video_id_from_url)
+
+READAHEAD_SIZES_MB = (0, 128, 256, 512, 1024)  # 0 = 미리 읽기 끔
+
+VIDEO_ID_ROLE = Qt.UserRole + 1
+TITLE_ROLE = Qt.UserRole + 2
 
 class CustomListWidget(QListWidget):
     def __init__(self, parent=None):
@@ -28,6 +60,154 @@ class CustomListWidget(QListWidget):
         else:
             super().keyPressEvent(event)
 
+class SpectrumWidget(QWidget):
+    """스펙트럼 막대 표시. 재생 중이고 창이 보일 때만 자체 타이머(최대 fps)로 갱신"""
+
+    def __init__(self, analyzer, attach, source, parent=None, fps=30):
+        super().__init__(parent)
+        self.analyzer = analyzer
+        self.attach = attach  # (bool) -> None: 재생 출력에 SpectrumTap 을 붙이거나 뗌
+        self.attached = False
+        self.source = source  # () -> 재생 위치 또는 재생 중이 아니면 None
+        self.levels = np.zeros(analyzer.bands, dtype=np.float32)
+        self.peaks = np.zeros(analyzer.bands, dtype=np.float32)
+        self.bar_color = QColor("#1E90FF")
+        self.peak_color = QColor("#1565C0")
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(int(1000 / fps))
+        self.timer.timeout.connect(self.tick)
+
+    def wake(self):
+        if self.isVisible() and not self.window().isMinimized():
+            if not self.timer.isActive():
+                self.timer.start()
+        else:
+            self.suspend()
+
+    def suspend(self):
+        """창이 숨겨지거나 최소화되면 타이머를 멈추고 탭을 떼어 재생 스레드의 분석 작업도 멈춤"""
+        self.timer.stop()
+        self._attach(False)
+
+    def _attach(self, enabled):
+        if enabled != self.attached:
+            self.attached = enabled
+            self.attach(enabled)
+
+    def tick(self):
+        if not self.isVisible() or self.window().isMinimized():
+            self.suspend()
+            return
+        position = self.source()
+        if position is None:
+            # 정지/일시정지: 막대가 내려온 뒤 타이머 정지
+            self._attach(False)
+            self.levels *= 0.8
+            self.peaks *= 0.8
+            if self.peaks.max() < 0.01:
+                self.levels[:] = 0
+                self.peaks[:] = 0
+                self.timer.stop()
+            self.update()
+            return
+        self._attach(True)
+        levels = self.analyzer.levels(position)
+        if levels is not None:
+            # 빠르게 올라가고 천천히 내려오도록
+            self.levels = np.maximum(levels, self.levels * 0.85)
+            self.peaks = np.maximum(self.levels, self.peaks - 0.02)
+        self.update()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.wake()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.suspend()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        height = self.height()
+        width = self.width() / len(self.levels)
+        for i, (level, peak) in enumerate(zip(self.levels, self.peaks)):
+            x = int(i * width) + 1
+            w = max(1, int(width) - 2)
+            bar = int(level * height)
+            painter.fillRect(x, height - bar, w, bar, self.bar_color)
+            painter.fillRect(x, height - int(peak * height) - 2, w, 2, self.peak_color)
+
+class EqualizerDialog(QDialog):
+    """10밴드 이퀄라이저 조정 창. 슬라이더를 움직이면 바로 on_change(gains) 호출"""
+
+    def __init__(self, gains, on_change, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Equalizer")
+        self.on_change = on_change
+        layout = QVBoxLayout(self)
+        bands_layout = QHBoxLayout()
+        self.sliders = []
+        for frequency, gain in zip(BAND_FREQUENCIES, gains):
+            column = QVBoxLayout()
+            slider = QSlider(Qt.Vertical)
+            slider.setRange(int(-MAX_GAIN_DB), int(MAX_GAIN_DB))
+            slider.setValue(int(round(gain)))
+            slider.setFixedHeight(120)
+            slider.valueChanged.connect(self._changed)
+            label = QLabel(f"{frequency // 1000}k" if frequency >= 1000 else str(frequency))
+            label.setAlignment(Qt.AlignCenter)
+            column.addWidget(slider, 0, Qt.AlignHCenter)
+            column.addWidget(label)
+            bands_layout.addLayout(column)
+            self.sliders.append(slider)
+        layout.addLayout(bands_layout)
+        reset_button = QPushButton("Flat")
+        reset_button.clicked.connect(lambda: self.set_gains(PRESETS["Flat"]))
+        layout.addWidget(reset_button)
+
+    def set_gains(self, gains):
+        for slider, gain in zip(self.sliders, gains):
+            slider.blockSignals(True)
+            slider.setValue(int(round(gain)))
+            slider.blockSignals(False)
+        self._changed()
+
+    def _changed(self):
+        self.on_change([slider.value() for slider in self.sliders])
+
+class QueueDialog(QDialog):
+    """다음 곡 대기열 보기. 선택한 항목 삭제와 전체 비우기"""
+
+    def __init__(self, player):
+        super().__init__(player)
+        self.setWindowTitle("Up Next")
+        self.player = player
+        layout = QVBoxLayout(self)
+        self.list = QListWidget()
+        self.list.setSelectionMode(QListWidget.ExtendedSelection)
+        self.list.setUniformItemSizes(True)  # 항목이 수천 개여도 배치 계산을 줄임
+        layout.addWidget(self.list)
+        button_layout = QHBoxLayout()
+        remove_button = QPushButton("Remove")
+        remove_button.clicked.connect(self._remove_selected)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(player.clear_queue)
+        button_layout.addWidget(remove_button)
+        button_layout.addWidget(clear_button)
+        layout.addLayout(button_layout)
+        self.resize(360, 400)
+
+    def refresh(self):
+        paths = self.player.library.tracks.paths
+        self.list.clear()
+        self.list.addItems([self.player._track_label(paths[track_id]) if track_id < len(paths) and paths[track_id]
+                            else "(deleted)" for track_id in self.player.play_queue])
+
+    def _remove_selected(self):
+        self.player.play_queue.remove_at(self.list.row(item) for item in self.list.selectedItems())
+        self.player._queue_changed()
+
 class MP3Player(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -35,8 +215,6 @@ class MP3Player(QMainWindow):
         self.setFixedSize(500, 250)
         self.center_window()
 
-        pygame.mixer.init()
-
         self.current_song = None
         self.is_playing = False
         self.playlist_songs = []
@@ -47,12 +225,60 @@ class MP3Player(QMainWindow):
         self.is_seeking = False
         self.current_position = 0
         self.last_volume = 50
-        self.all_songs = []
+        self.loaded_ids = array("I")  # 이번 세션에 불러온 곡의 트랙 ID (메타데이터는 라이브러리 컬럼에 한 번만 저장)
+        self.song_positions = {}  # 경로 -> playlist_songs 인덱스 (O(1) 조회용)
+        self.shuffle = ShuffleEngine()
+        self.play_queue = PlayQueue()  # "다음 곡" 대기열 (트랙 ID)
+        self.playing_from_queue = None  # 대기열에서 꺼내 재생 중인 곡의 트랙 ID
+        self.queue_anchor = None  # 대기열 재생 전에 듣던 재생목록 곡 (대기열이 끝나면 그다음부터 이어감)
+        self.queue_dialog = None
+        # 작업 스레드 결과는 이 채널을 통해 GUI 스레드에서 묶음으로 반영
+        self.events = EventChannel(self)
+        self.events.subscribe("notify", self.show_notifications)
+        self.events.subscribe("downloaded", self._apply_downloads)
+        self.events.subscribe("lyrics", self._apply_lyrics)
+        self.events.subscribe("cover", self._apply_covers)
+        self.events.subscribe("stream", self._apply_streams)
+        self.events.subscribe("stream_failed", self._discard_streams)
+        self.events.subscribe("first_sound", self._report_first_sound)
+        self.events.subscribe("enriched", self._apply_enrichment)
+        self.events.subscribe("export_progress", self._show_export_progress)
+        self.events.subscribe("analyzed", self._apply_analysis)
+        self.events.subscribe("analysis_done", self._on_analysis_finished)
+        self.events.subscribe("playback_error", self._on_playback_error)
+        self.notifications = deque(maxlen=50)
+        self.library = SongLibrary()
+        # 배치 다운로드(batch_download.py)가 같은 라이브러리를 쓰는 중이면 이 창에서는 저장하지 않음
+        self.library_lock = LibraryLock(self.library.data_dir)
+        self.library.read_only = not self.library_lock.acquire()
+        self.library.load()
+        self.history = PlayHistory(self.library.data_dir)
+        # 재생 횟수는 재생 기록의 finish 이벤트가 기준: 기록과 어긋난 값(이전 버전, 다른 프로세스)을 맞춤
+        self.library.set_play_counts(self.history.play_counts())
+        # 세션 스냅샷: 상태가 바뀌면 1초 뒤에 한 번 기록 (연속 변경은 묶음)
+        self.session = SessionStore(self.library.data_dir)
+        self.session_timer = QTimer()
+        self.session_timer.setSingleShot(True)
+        self.session_timer.setInterval(1000)
+        self.session_timer.timeout.connect(self.save_session)
+        self.session_saved_at = 0.0
+        self.history_song = None  # 시작을 기록했고 아직 끝/건너뜀을 기록하지 않은 곡
+        self.history_played_mark = 0.0  # 그 곡을 시작할 때의 output.played_seconds()
+        # 라이브러리의 아티스트 목록으로 제목 분리 시 아티스트/곡명 순서를 판별
+        self.title_parser = TitleParser(track["artist"] for track in self.library.tracks.values())
+        self.lyrics_cache = LyricsCache()
+        self.lyrics = None
+        self.lyrics_song = None
+        self.lyrics_line = -1
+        self.thumbnail_cache = ThumbnailCache(os.path.join(self.library.data_dir, "thumbnails"))
+        self.cover_loader = CoverLoader(self.thumbnail_cache,
+                                        lambda path, key: self.events.post("cover", (path, key)))
 
         # YouTube API 설정
         self.YOUTUBE_API_KEY = ""  # 실제 API 키로 교체
         try:
-            self.youtube = build('youtube', 'v3', developerKey=self.YOUTUBE_API_KEY)
+            # 할당량 기록/요청 묶기/디스크 캐시를 거쳐 Data API 호출
+            self.youtube = YouTubeClient(self.YOUTUBE_API_KEY, os.path.join(self.library.data_dir, "youtube_cache"))
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to initialize YouTube API: {str(e)}")
             self.youtube = None
@@ -62,9 +288,31 @@ class MP3Player(QMainWindow):
         if not self.ffmpeg_path:
             QMessageBox.critical(self, "Error", "ffmpeg is not installed or path is incorrect. Please check ffmpeg installation.")
 
+        # 재생: 디코딩한 PCM 을 DSP 단계(속도 조절 -> 이퀄라이저)를 거쳐 출력
+        # 설정하면 별도 엔진 프로세스에서 재생해 GUI 가 바빠도 소리가 끊기지 않음 (다시 시작 후 적용)
+        self.use_audio_engine = bool(self.session.load().get("audio_engine", False))
+        self.output = self._create_output()
+        self.time_stretch = self.output.add_stage(TimeStretch(self.output.sample_rate, self.output.channels))
+        self.equalizer = self.output.add_stage(Equalizer(self.output.sample_rate, self.output.channels))
+        # 현재 곡과 다음 곡을 메모리에 미리 읽어 네트워크 저장소에서도 끊기지 않게 함
+        self.readahead = self.output.create_readahead(256 * 1024 * 1024)
+        self.output.readahead = self.readahead
+        self.output.on_start = lambda started_at: self.events.post("first_sound", started_at)
+        # 엔진 프로세스는 play() 를 기다리지 않으므로 실패를 나중에 알림 (재생은 곡이 끝난 것처럼 다음으로 넘어감)
+        self.output.on_error = lambda message: self.events.post("playback_error", message)
+        self.stream_requested_at = None  # 받으며 재생을 요청한 시각 (첫 소리까지 시간 측정용)
+        self.equalizer_preset = "Flat"
+        self.equalizer_dialog = None
+
         self.download_dir = os.path.join(os.path.expanduser("~"), "Downloads", "MP3Player")
         if not os.path.exists(self.download_dir):
             os.makedirs(self.download_dir)
+        self.download_archive = DownloadArchive(os.path.join(self.library.data_dir, "download_archive.txt"))
+        self.bulk_importer = None
+        self.exporter = None
+        self.analyzer = None  # BPM/키 백그라운드 분석 (LibraryAnalyzer)
+        self.pending_downloads = set()  # 다운로드 중인 영상 ID (중복 요청 방지, 일괄 가져오기 스레드와 공유)
+        self.pending_lock = threading.Lock()
 
         self.menu_bar = self.menuBar()
         self.setup_menus()
@@ -79,12 +327,24 @@ class MP3Player(QMainWindow):
         self.thumbnail_label.setStyleSheet("background-color: #F5F6F5; border: 1px solid #1E90FF;")
         self.thumbnail_label.setAlignment(Qt.AlignCenter)
         self.top_layout.addWidget(self.thumbnail_label)
+        # 스펙트럼: 1초 재생바 타이머와 별개로 자체 타이머(30 fps 상한)로 그림
+        # 재생 중인 PCM(EQ/속도 적용 후)을 출력 쪽 탭으로 받아 분석 (따로 디코딩하지 않음)
+        self.spectrum_analyzer = SpectrumAnalyzer()
+        self.spectrum_tap = SpectrumTap(self.spectrum_analyzer)
+        self.spectrum_widget = SpectrumWidget(self.spectrum_analyzer, self._attach_spectrum, self._spectrum_source)
+        self.spectrum_widget.setFixedSize(96, 150)
+        self.top_layout.addWidget(self.spectrum_widget)
 
         self.info_layout = QVBoxLayout()
         self.title_label = QLabel("No song selected")
         self.artist_label = QLabel("")
         self.info_layout.addWidget(self.title_label)
         self.info_layout.addWidget(self.artist_label)
+        self.lyrics_widget = QListWidget()
+        self.lyrics_widget.setObjectName("lyrics_widget")
+        self.lyrics_widget.setFixedHeight(100)
+        self.lyrics_widget.setFocusPolicy(Qt.NoFocus)
+        self.info_layout.addWidget(self.lyrics_widget)
         self.top_layout.addLayout(self.info_layout)
         self.top_layout.addStretch()
         self.main_layout.addLayout(self.top_layout)
@@ -180,12 +440,34 @@ class MP3Player(QMainWindow):
         self.seek_slider.sliderReleased.connect(self.stop_seeking)
         self.seek_slider.valueChanged.connect(self.seek)
         self.playlist.itemDoubleClicked.connect(self.play_selected_song)
+        self.playlist.setContextMenuPolicy(Qt.ActionsContextMenu)
+        play_next_action = QAction("다음에 재생", self.playlist)
+        play_next_action.triggered.connect(lambda: self.queue_selected(front=True))
+        self.playlist.addAction(play_next_action)
+        enqueue_action = QAction("대기열에 추가", self.playlist)
+        enqueue_action.setShortcut("Q")
+        enqueue_action.setShortcutContext(Qt.WidgetShortcut)
+        enqueue_action.triggered.connect(lambda: self.queue_selected(front=False))
+        self.playlist.addAction(enqueue_action)
+        sort_action = QAction("정렬", self.playlist)
+        sort_menu = QMenu(self.playlist)
+        for label, column in (("제목", "title"), ("아티스트", "artist"), ("길이", "duration"),
+                              ("BPM", "bpm"), ("키 (Camelot)", "key"), ("재생 횟수", "play_count")):
+            action = QAction(label, sort_menu)
+            action.triggered.connect(lambda checked, c=column: self.sort_playlist(c))
+            sort_menu.addAction(action)
+        sort_action.setMenu(sort_menu)
+        self.playlist.addAction(sort_action)
         self.playlist.model().rowsMoved.connect(self.update_playlist_order)
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_seek_slider)
         self.timer.start(1000)
 
+        # 가사 하이라이트용 타이머: 동기화 가사가 있을 때만 동작
+        self.lyrics_timer = QTimer()
+        self.lyrics_timer.timeout.connect(self.update_lyrics_line)
+
         self.setStyleSheet("""
             QMainWindow { background-color: #F5F6F5; }
             QPushButton { 
@@ -233,6 +515,21 @@ class MP3Player(QMainWindow):
         self.seek_slider.setObjectName("seek_slider")
         self.volume_slider.setObjectName("volume_slider")
 
+        # 단일 인스턴스: 이후 실행에서 넘어오는 파일/명령을 이 창에서 처리
+        self.instance_server = InstanceServer(self)
+        self.instance_server.command_received.connect(self.handle_remote_command)
+        self.instance_server.listen()
+
+        self.restore_session()
+        if self.library.read_only:
+            QTimer.singleShot(0, lambda: QMessageBox.warning(
+                self, "Warning", "The library is being updated by another process (batch download). "
+                                 "Library changes made in this window will not be saved."))
+        if self.library.load_error:
+            QTimer.singleShot(0, lambda: QMessageBox.warning(self, "Warning", self.library.load_error))
+        # 시작 직후의 디스크/CPU 사용을 피해 잠시 뒤 새로 추가되거나 바뀐 곡만 분석
+        QTimer.singleShot(10000, self.start_analysis)
+
     def _get_ffmpeg_path(self):
         """ffmpeg 실행 파일 경로 탐지"""
         ffmpeg_path = shutil.which("ffmpeg")
@@ -243,27 +540,39 @@ class MP3Player(QMainWindow):
             return custom_path
         return None
 
+    def _create_output(self):
+        if self.use_audio_engine:
+            try:
+                return RemotePlayer(self.ffmpeg_path)
+            except pygame.error as e:
+                QMessageBox.warning(self, "Warning", f"Failed to start the audio engine process, "
+                                                     f"playing in this process instead: {str(e)}")
+        pygame.mixer.init(**MIXER_SETTINGS)
+        return PcmPlayer(self.ffmpeg_path)
+
+    def set_audio_engine(self, enabled):
+        self.audio_engine_setting = enabled
+        self._session_changed()
+        self.statusBar().showMessage("Audio engine setting will apply after restart.", 5000)
+
     def _parse_title(self, title):
         """유튜브 제목에서 아티스트와 곡명 분리"""
-        patterns = [
-            r'^(.*?)\s*-\s*(.*?)$',  # "아티스트 - 곡명"
-            r'^(.*?)\s*by\s*(.*?)$',  # "곡명 by 아티스트"
-            r'^(.*?)\s*\((.*?)\)$',  # "곡명 (아티스트)"
-            r'^(.*?)\s*[\|]\s*(.*?)$',  # "아티스트 | 곡명"
-        ]
-        for pattern in patterns:
-            match = re.match(pattern, title.strip(), re.IGNORECASE)
-            if match:
-                parts = match.groups()
-                if len(parts) == 2:
-                    artist, song = parts
-                    artist = artist.strip()
-                    song = song.strip()
-                    if pattern == r'^(.*?)\s*by\s*(.*?)$' or pattern == r'^(.*?)\s*\((.*?)\)$':
-                        artist, song = song, artist
-                    if artist and song:
-                        return song, artist
-        return title.strip(), "Unknown Artist"
+        return self.title_parser.parse(title)
+
+    def _register_song(self, file_name, artist=None):
+        """playlist_songs 에 곡을 추가하고 인덱스/무작위 순서에 반영"""
+        self.song_positions[file_name] = len(self.playlist_songs)
+        self.playlist_songs.append(file_name)
+        self.shuffle.add(file_name, artist)
+
+    def _rebuild_song_positions(self):
+        self.song_positions = {path: i for i, path in enumerate(self.playlist_songs)}
+
+    def _reset_shuffle(self):
+        tracks = [self.library.get(path) for path in self.playlist_songs]
+        self.shuffle.reset(self.playlist_songs, [track["artist"] if track else None for track in tracks])
+        if self.current_song in self.song_positions:
+            self.shuffle.start_from(self.current_song)
 
     def setup_menus(self):
         file_menu = self.menu_bar.addMenu("파일")
@@ -275,6 +584,16 @@ class MP3Player(QMainWindow):
         add_action.setShortcut("Ctrl+A")
         add_action.triggered.connect(self.add_song)
         file_menu.addAction(add_action)
+        import_action = QAction("YouTube 재생목록 가져오기...", self)
+        import_action.triggered.connect(self.import_youtube_playlist)
+        file_menu.addAction(import_action)
+        export_action = QAction("내보내기...", self)
+        export_action.triggered.connect(self.export_tracks)
+        file_menu.addAction(export_action)
+        self.streaming_action = QAction("다운로드 중 바로 재생", self)
+        self.streaming_action.setCheckable(True)
+        self.streaming_action.setChecked(True)
+        file_menu.addAction(self.streaming_action)
 
         playback_menu = self.menu_bar.addMenu("재생")
         prev_action = QAction("이전 곡", self)
@@ -311,6 +630,45 @@ class MP3Player(QMainWindow):
         shuffle_action.setShortcut("A")
         shuffle_action.triggered.connect(self.toggle_shuffle)
         playback_menu.addAction(shuffle_action)
+        self.weighted_shuffle_action = QAction("아티스트 분산 재생", self)
+        self.weighted_shuffle_action.setCheckable(True)
+        self.weighted_shuffle_action.toggled.connect(self.set_weighted_shuffle)
+        playback_menu.addAction(self.weighted_shuffle_action)
+        speed_menu = playback_menu.addMenu("재생 속도")
+        self.speed_actions = QActionGroup(self)
+        for speed in SPEEDS:
+            action = QAction(f"{speed:g}x", self)
+            action.setCheckable(True)
+            action.setChecked(speed == 1.0)
+            action.triggered.connect(lambda checked, s=speed: self.set_playback_speed(s))
+            self.speed_actions.addAction(action)
+            speed_menu.addAction(action)
+        queue_action = QAction("대기열 보기...", self)
+        queue_action.triggered.connect(self.show_queue)
+        playback_menu.addAction(queue_action)
+        clear_queue_action = QAction("대기열 비우기", self)
+        clear_queue_action.triggered.connect(self.clear_queue)
+        playback_menu.addAction(clear_queue_action)
+        self.audio_engine_setting = self.use_audio_engine
+        engine_action = QAction("별도 프로세스에서 재생 (다시 시작 후 적용)", self)
+        engine_action.setCheckable(True)
+        engine_action.setChecked(self.use_audio_engine)
+        engine_action.toggled.connect(self.set_audio_engine)
+        playback_menu.addAction(engine_action)
+        readahead_menu = playback_menu.addMenu("미리 읽기 메모리")
+        self.readahead_actions = QActionGroup(self)
+        for size_mb in READAHEAD_SIZES_MB:
+            action = QAction(f"{size_mb} MB" if size_mb else "끄기", self)
+            action.setCheckable(True)
+            action.setChecked(size_mb * 1024 * 1024 == self.readahead.capacity_bytes)
+            action.triggered.connect(lambda checked, mb=size_mb: self.set_readahead_size(mb))
+            self.readahead_actions.addAction(action)
+            readahead_menu.addAction(action)
+        readahead_menu.addSeparator()
+        readahead_stats_action = QAction("미리 읽기 상태...", self)
+        readahead_stats_action.triggered.connect(
+            lambda: QMessageBox.information(self, "미리 읽기", self.readahead.describe()))
+        readahead_menu.addAction(readahead_stats_action)
         volume_up_action = QAction("소리 높임", self)
         volume_up_action.setShortcut("Up")
         volume_up_action.triggered.connect(lambda: self.adjust_volume(10))
@@ -324,6 +682,39 @@ class MP3Player(QMainWindow):
         mute_action.triggered.connect(self.toggle_mute)
         playback_menu.addAction(mute_action)
 
+        equalizer_menu = self.menu_bar.addMenu("이퀄라이저")
+        self.equalizer_actions = QActionGroup(self)
+        for name in PRESETS:
+            action = QAction(name, self)
+            action.setCheckable(True)
+            action.setChecked(name == self.equalizer_preset)
+            action.triggered.connect(lambda checked, n=name: self.set_equalizer_preset(n))
+            self.equalizer_actions.addAction(action)
+            equalizer_menu.addAction(action)
+        equalizer_menu.addSeparator()
+        self.custom_equalizer_action = QAction("사용자 설정...", self)
+        self.custom_equalizer_action.setCheckable(True)
+        self.custom_equalizer_action.triggered.connect(self.show_equalizer_dialog)
+        self.equalizer_actions.addAction(self.custom_equalizer_action)
+        equalizer_menu.addAction(self.custom_equalizer_action)
+
+        self.smart_menu = self.menu_bar.addMenu("스마트 재생목록")
+        self.refresh_smart_playlist_menu()
+
+        stats_menu = self.menu_bar.addMenu("통계")
+        stats_action = QAction("재생 통계...", self)
+        stats_action.triggered.connect(self.show_play_stats)
+        stats_menu.addAction(stats_action)
+
+        analysis_menu = self.menu_bar.addMenu("분석")
+        analyze_action = QAction("BPM/키 분석 시작", self)
+        analyze_action.triggered.connect(self.start_analysis)
+        analysis_menu.addAction(analyze_action)
+        self.pause_analysis_action = QAction("분석 일시정지", self)
+        self.pause_analysis_action.setCheckable(True)
+        self.pause_analysis_action.toggled.connect(self.set_analysis_paused)
+        analysis_menu.addAction(self.pause_analysis_action)
+
         help_menu = self.menu_bar.addMenu("도움말")
         about_action = QAction("About", self)
         about_action.triggered.connect(self.show_about)
@@ -345,6 +736,7 @@ class MP3Player(QMainWindow):
             self.playlist_widget.show()
             self.is_playlist_visible = True
             self.setFixedSize(500, 700)
+        self._session_changed()
 
     def search_youtube(self):
         if not self.youtube:
@@ -360,125 +752,491 @@ class MP3Player(QMainWindow):
         self.youtube_results.clear()
         self.youtube_results.show()
         try:
-            request = self.youtube.search().list(
-                q=query,
-                part="snippet",
-                maxResults=10,
-                type="video"
-            )
-            response = request.execute()
+            response = self.youtube.search(query, max_results=10)
+            video_ids = []
             for item in response.get("items", []):
                 title = item["snippet"]["title"]
                 video_id = item["id"]["videoId"]
                 thumbnail_url = item["snippet"]["thumbnails"]["default"]["url"]
-                list_item = QListWidgetItem(f"{title} [youtube.com/watch?v={video_id}]")
+                list_item = QListWidgetItem()
                 list_item.setData(Qt.UserRole, thumbnail_url)
+                list_item.setData(VIDEO_ID_ROLE, video_id)
+                list_item.setData(TITLE_ROLE, title)
+                self._set_result_text(list_item)
                 self.youtube_results.addItem(list_item)
+                video_ids.append(video_id)
+            if video_ids:
+                # 길이/조회수 등은 videos().list 한 번으로 묶어 백그라운드에서 채움
+                threading.Thread(target=self._enrich_results, args=(video_ids,), daemon=True).start()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to search YouTube: {str(e)}")
 
+    def _set_result_text(self, list_item, details=None):
+        title = list_item.data(TITLE_ROLE)
+        video_id = list_item.data(VIDEO_ID_ROLE)
+        text = f"{title} [youtube.com/watch?v={video_id}]"
+        tooltip = []
+        if details:
+            info = [self.format_time(details["duration"]), f"{details['views']:,} views"]
+            if details["audio_only"]:
+                info.append("audio")
+            text = f"{title} [{' · '.join(info)}]"
+            tooltip.append(f"{details['channel']} · youtube.com/watch?v={video_id}")
+        if self.library.find_video(video_id):
+            # 이미 라이브러리에 있는 영상 표시
+            text = f"✔ {text}"
+            tooltip.append("Already in library")
+        list_item.setText(text)
+        list_item.setToolTip("\n".join(tooltip))
+
+    def _enrich_results(self, video_ids):
+        try:
+            self.events.post("enriched", self.youtube.videos(video_ids))
+        except Exception as e:
+            self.events.post("notify", f"Failed to load video details: {str(e)}")
+
+    def _apply_enrichment(self, batches):
+        details = {}
+        for batch in batches:
+            details.update(batch)
+        for row in range(self.youtube_results.count()):
+            list_item = self.youtube_results.item(row)
+            video_details = details.get(list_item.data(VIDEO_ID_ROLE))
+            if video_details:
+                self._set_result_text(list_item, video_details)
+
     def download_youtube(self, item):
         if not self.ffmpeg_path:
             QMessageBox.critical(self, "Error", "ffmpeg is not installed. Please install it first.")
             return
-        video_url = item.text().split("[")[-1].rstrip("]")
-        full_title = item.text().split("[")[0].strip()
+        video_id = item.data(VIDEO_ID_ROLE)
+        full_title = item.data(TITLE_ROLE)
         thumbnail_url = item.data(Qt.UserRole)
+        video_url = f"https://www.youtube.com/watch?v={video_id}"
         title, artist = self._parse_title(full_title)
-        sanitized_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
+        existing_path = self.library.find_video(video_id)
+        if existing_path:
+            # 이미 받은 영상은 네트워크 없이 바로 재생
+            self._add_existing_download(existing_path, video_id, play_immediately=True)
+            return
+        if not self._claim_download(video_id):
+            return
+        sanitized_title = sanitize_title(title) or video_id
+        if self.streaming_action.isChecked():
+            threading.Thread(target=self.stream_youtube_thread,
+                             args=(video_url, sanitized_title, title, artist, thumbnail_url, time.monotonic()),
+                             daemon=True).start()
+            return
         threading.Thread(target=self.download_youtube_thread, args=(video_url, sanitized_title, title, artist, thumbnail_url), daemon=True).start()
 
-    def download_youtube_thread(self, video_url, sanitized_title, title, artist, thumbnail_url):
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': os.path.join(self.download_dir, f"{sanitized_title}.%(ext)s"),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '320',
-            }],
-            'ffmpeg_location': self.ffmpeg_path,
-        }
+    def _claim_download(self, video_id):
+        """다운로드 시작 전에 영상 ID 등록. 이미 받는 중이면 False (끝나면 작업 스레드가 discard)"""
+        with self.pending_lock:
+            if video_id in self.pending_downloads:
+                return False
+            self.pending_downloads.add(video_id)
+            return True
+
+    def download_youtube_thread(self, video_url, sanitized_title, title, artist, thumbnail_url,
+                                play_immediately=True, notify=True):
+        video_id = video_id_from_url(video_url)
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-            mp3_path = os.path.join(self.download_dir, f"{sanitized_title}.mp3")
-            if os.path.exists(mp3_path):
-                QApplication.postEvent(self, CustomEvent(f"Downloaded and added: {title}"))
-                self.add_downloaded_song(mp3_path, title, artist, thumbnail_url, play_immediately=True)
-            else:
-                QApplication.postEvent(self, CustomEvent(f"Failed to find downloaded song: {title}"))
+            existing_path = self.library.find_video(video_id) if video_id else None
+            if existing_path:
+                track = self.library.get(existing_path)
+                self.events.post("downloaded", (existing_path, track["title"], track["artist"],
+                                                track["thumbnail_url"], play_immediately, video_id))
+                return True
+            mp3_path = download_video(video_url, sanitized_title, title, artist, thumbnail_url, self.download_dir,
+                                      self.ffmpeg_path, scale_image=downscale_image)
+            if mp3_path:
+                if notify:
+                    self.events.post("notify", f"Downloaded and added: {title}")
+                self.events.post("downloaded", (mp3_path, title, artist, thumbnail_url, play_immediately, video_id))
+                if video_id:
+                    self.download_archive.add(video_id)
+                return True
+            if notify:
+                self.events.post("notify", f"Failed to find downloaded song: {title}")
         except Exception as e:
-            QApplication.postEvent(self, CustomEvent(f"Error downloading {title}: {str(e)}"))
+            if notify:
+                self.events.post("notify", f"Error downloading {title}: {str(e)}")
+        finally:
+            with self.pending_lock:
+                self.pending_downloads.discard(video_id)
+        return False
 
-    def add_downloaded_song(self, file_name, title, artist, thumbnail_url=None, play_immediately=False):
-        self.playlist_songs.append(file_name)
-        self.all_songs.append((file_name, title, artist, thumbnail_url))
-        self.playlist.addItem(f"{artist} - {title}")
-        if thumbnail_url:
-            try:
-                with urllib.request.urlopen(thumbnail_url) as response:
-                    image_data = response.read()
-                pixmap = QPixmap()
-                pixmap.loadFromData(image_data)
-                scaled_pixmap = pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.thumbnail_label.setPixmap(scaled_pixmap)
-            except Exception:
-                self.thumbnail_label.setText("No Image")
-        else:
-            self.thumbnail_label.setText("No Image")
+    def stream_youtube_thread(self, video_url, sanitized_title, title, artist, thumbnail_url, requested_at):
+        """받으면서 재생: 재생할 만큼 받으면 바로 재생하고, 다 받으면 MP3 로 변환해 라이브러리에 반영"""
+        video_id = video_id_from_url(video_url)
+        try:
+            if video_id and os.path.exists(os.path.join(self.download_dir, f"{sanitized_title}.mp3")):
+                sanitized_title = f"{sanitized_title} ({video_id})"
+            stream = StreamingDownload(video_url, sanitized_title, self.download_dir, self.ffmpeg_path)
+            stream.start()
+            stream.ready.wait()
+            if stream.error:
+                raise stream.error
+            self.events.post("stream", (stream, title, artist, thumbnail_url, video_id, requested_at))
+            mp3_path = stream.finish()
+            if not mp3_path:
+                self.events.post("stream_failed", stream.mp3_path)
+                raise stream.error or RuntimeError("failed to convert the download to MP3")
+            tag_downloaded_file(mp3_path, title, artist, thumbnail_url, video_id, scale_image=downscale_image)
+            self.events.post("notify", f"Downloaded and added: {title}")
+            self.events.post("downloaded", (mp3_path, title, artist, thumbnail_url, False, video_id))
+            if video_id:
+                self.download_archive.add(video_id)
+        except Exception as e:
+            self.events.post("notify", f"Error downloading {title}: {str(e)}")
+        finally:
+            with self.pending_lock:
+                self.pending_downloads.discard(video_id)
+
+    def _apply_streams(self, streams):
+        """GUI 스레드: 재생할 만큼 받은 곡을 재생목록에 올리고 마지막 요청을 바로 재생"""
+        for stream, title, artist, thumbnail_url, video_id, requested_at in streams:
+            self.output.streams[stream.mp3_path] = stream
+            if stream.mp3_path not in self.song_positions:
+                self.add_downloaded_song(stream.mp3_path, title, artist, thumbnail_url, video_id=video_id,
+                                         duration=stream.duration)
+        stream, requested_at = streams[-1][0], streams[-1][5]
+        self.stream_requested_at = requested_at
+        self.current_song = stream.mp3_path
+        self.play_song()
+
+    def _discard_streams(self, paths):
+        """받다가 실패한 곡을 재생목록과 라이브러리에서 제거"""
+        for path in paths:
+            self.output.streams.pop(path, None)
+            index = self.song_positions.get(path)
+            if index is not None:
+                item = self.playlist.takeItem(index)
+                self.playlist_songs.pop(index)
+                self.shuffle.remove(path)
+                track_id = item.data(Qt.UserRole)
+                if track_id in self.loaded_ids:
+                    self.loaded_ids.remove(track_id)
+                self._rebuild_song_positions()
+            self.library.remove_track(path)
+            if self.current_song == path:
+                self.current_song = None
+                self.stop()
+
+    def _on_playback_error(self, messages):
+        self.show_notifications([f"Failed to play song: {message}" for message in messages])
+
+    def _report_first_sound(self, started):
+        if self.stream_requested_at is None:
+            return
+        elapsed = started[-1] - self.stream_requested_at
+        self.stream_requested_at = None
+        self.show_notifications([f"Time to first sound: {elapsed:.2f}s"])
+
+    def _add_existing_download(self, path, video_id, play_immediately):
+        """라이브러리에 이미 있는 영상을 재생목록에 올리고 필요하면 재생"""
+        if path not in self.song_positions:
+            track = self.library.get(path)
+            self.add_downloaded_song(path, track["title"], track["artist"], track["thumbnail_url"],
+                                     play_immediately=play_immediately, video_id=video_id)
+        elif play_immediately:
+            self.current_song = path
+            self.play_song()
+
+    def import_youtube_playlist(self):
+        if not self.ffmpeg_path:
+            QMessageBox.critical(self, "Error", "ffmpeg is not installed. Please install it first.")
+            return
+        if self.bulk_importer:
+            QMessageBox.warning(self, "Warning", "A playlist import is already running.")
+            return
+        url, ok = QInputDialog.getText(self, "Import from YouTube", "Playlist or channel URL:")
+        if not ok or not url.strip():
+            return
+        self.bulk_importer = BulkImporter(self.download_archive, self._import_youtube_video,
+                                          on_finished=self._on_import_finished)
+        self.bulk_importer.start(url.strip())
+
+    def _import_youtube_video(self, video_url, video_id, full_title, thumbnail_url):
+        """일괄 가져오기 작업 스레드에서 호출: 단일 다운로드와 같은 파이프라인 사용
+
+        검색 결과에서 같은 영상을 이미 받는 중이면 None (건너뜀) 을 반환한다.
+        """
+        if not self._claim_download(video_id):
+            return None
+        title, artist = self._parse_title(full_title)
+        sanitized_title = sanitize_title(title) or video_id
+        return self.download_youtube_thread(video_url, sanitized_title, title, artist, thumbnail_url,
+                                            play_immediately=False, notify=False)
+
+    def _on_import_finished(self, counts, error):
+        self.bulk_importer = None
+        message = (f"Playlist import finished: {counts['downloaded']} downloaded, "
+                   f"{counts['skipped']} already in archive, {counts['failed']} failed")
+        if error:
+            message += f" (error: {str(error)})"
+        self.events.post("notify", message)
+
+    def export_tracks(self):
+        """선택한 곡(없으면 현재 재생목록 전체)을 다른 형식으로 폴더에 내보냄"""
+        if not self.ffmpeg_path:
+            QMessageBox.critical(self, "Error", "ffmpeg is not installed. Please install it first.")
+            return
+        if self.exporter:
+            QMessageBox.warning(self, "Warning", "An export is already running.")
+            return
+        rows = sorted(self.playlist.row(item) for item in self.playlist.selectedItems())
+        paths = [self.playlist_songs[row] for row in rows] or list(self.playlist_songs)
+        if not paths:
+            QMessageBox.warning(self, "Warning", "No songs to export.")
+            return
+        codec, ok = QInputDialog.getItem(self, "Export", f"Format for {len(paths)} song(s):", list(FORMATS), 0, False)
+        if not ok:
+            return
+        target_dir = QFileDialog.getExistingDirectory(self, "Export to")
+        if not target_dir:
+            return
+        tracks = []
+        for path in paths:
+            track = self.library.get(path)
+            tracks.append(track.to_dict() if track is not None else {"path": path})
+        self.exporter = LibraryExporter(self.ffmpeg_path, target_dir, codec,
+                                        on_progress=lambda done, total, stats:
+                                        self.events.post("export_progress", (done, total, stats)),
+                                        on_finished=self._on_export_finished)
+        self.exporter.start(tracks)
+
+    def _show_export_progress(self, updates):
+        done, total, stats = updates[-1]
+        self.statusBar().showMessage(f"Exporting {done}/{total}: {describe_stats(stats)}")
+
+    def _on_export_finished(self, stats):
+        self.exporter = None
+        self.events.post("notify", f"Export finished: {describe_stats(stats)}")
+
+    def _apply_downloads(self, downloads):
+        """GUI 스레드: 다운로드 완료 묶음을 재생목록/라이브러리에 반영 (재생은 마지막 요청 하나만)"""
+        play_path = None
+        for path, title, artist, thumbnail_url, play_immediately, video_id in downloads:
+            streamed = self.output.streams.pop(path, None)
+            if path not in self.song_positions:
+                self.add_downloaded_song(path, title, artist, thumbnail_url, video_id=video_id)
+            elif streamed:
+                # 받으며 재생한 곡: 완성된 MP3 로 길이/비트레이트 갱신
+                self._add_download_to_library(path, title, artist, thumbnail_url, video_id)
+            if play_immediately:
+                play_path = path
+        self.library.request_save()
+        self.start_analysis()
+        if play_path:
+            self.current_song = play_path
+            self.play_song()
+
+    def _apply_lyrics(self, results):
+        for path, lyrics in results:
+            self.show_lyrics(path, lyrics)
+
+    def _apply_covers(self, results):
+        for path, key in results:
+            self.library.set_art(path, key or "")
+            if path == self.current_song:
+                self.show_cover(path)
+
+    def show_notifications(self, messages):
+        """비모달 알림: 상태 표시줄에 최근 메시지를 표시하고 묶인 메시지 수를 함께 보여줌"""
+        self.notifications.extend(messages)
+        text = messages[-1] if len(messages) == 1 else f"{messages[-1]} (+{len(messages) - 1} more)"
+        self.statusBar().showMessage(text, 8000)
+        self.statusBar().setToolTip("\n".join(self.notifications))
+
+    def _add_download_to_library(self, file_name, title, artist, thumbnail_url=None, video_id=None, duration=0):
+        try:
+            info = MP3(file_name).info
+            duration, bitrate = info.length, info.bitrate // 1000
+        except Exception:
+            bitrate = 0  # 아직 받는 중인 곡은 yt-dlp 가 알려준 길이 사용
+        return self.library.add_track(file_name, title, artist, duration, bitrate,
+                                      source="youtube", thumbnail_url=thumbnail_url, video_id=video_id)
+
+    def add_downloaded_song(self, file_name, title, artist, thumbnail_url=None, play_immediately=False, video_id=None,
+                            duration=0):
+        track_id = self._add_download_to_library(file_name, title, artist, thumbnail_url, video_id, duration)
+        self._register_song(file_name, artist)
+        self.title_parser.add_artist(artist)
+        self.loaded_ids.append(track_id)
+        self._add_playlist_item(track_id)
+        self._request_cover(file_name, thumbnail_url)
         if play_immediately:
             self.current_song = file_name
             self.play_song()
         else:
             self.update_song_info()
 
-    def add_song(self):
-        file_names, _ = QFileDialog.getOpenFileNames(self, "Add MP3 Files", "", "MP3 Files (*.mp3)")
+    def _add_files(self, file_names):
+        """MP3 파일들을 재생목록에 추가하고 첫 번째 곡 경로 반환 (이미 있는 곡은 다시 추가하지 않음)"""
+        first_song = None
         for file_name in file_names:
             if file_name:
-                self.playlist_songs.append(file_name)
+                if file_name in self.song_positions:
+                    first_song = first_song or file_name
+                    continue
                 try:
                     song = MP3(file_name)
                     title = str(song.get("TIT2", os.path.basename(file_name)))
                     artist = str(song.get("TPE1", "Unknown Artist"))
-                    self.all_songs.append((file_name, title, artist, None))
-                    self.playlist.addItem(f"{artist} - {title}")
+                    video_id = read_video_id(song.tags)
+                    track_id = self.library.add_track(file_name, title, artist, song.info.length,
+                                                      song.info.bitrate // 1000,
+                                                      source="youtube" if video_id else "local", video_id=video_id)
+                    self._register_song(file_name, artist)
+                    self.title_parser.add_artist(artist)
+                    self.loaded_ids.append(track_id)
+                    self._add_playlist_item(track_id)
+                    self._request_cover(file_name)
+                    if not first_song:
+                        first_song = file_name
                 except Exception as e:
                     QMessageBox.critical(self, "Error", f"Failed to add song: {str(e)}")
+        if file_names:
+            self.library.request_save()
+            self._session_changed()
+            self.start_analysis()
+        return first_song
+
+    def _add_playlist_item(self, track_id):
+        track = self.library.tracks[track_id]
+        item = QListWidgetItem(self._playlist_item_text(track))
+        item.setData(Qt.UserRole, track_id)
+        self.playlist.addItem(item)
+
+    def _playlist_item_text(self, track):
+        text = f"{track['artist']} - {track['title']}"
+        details = [f"{track['bpm']:.0f} BPM"] if track["bpm"] else []
+        if track["key"]:
+            details.append(track["key"])
+        return f"{text}  ({', '.join(details)})" if details else text
+
+    def sort_playlist(self, column):
+        """보이는 재생목록을 컬럼 기준으로 정렬 (분석 전 곡은 뒤로)"""
+        def sort_key(path):
+            track = self.library.get(path)
+            if track is None:
+                return (1, 0)
+            if column == "key":
+                code = camelot(track["key"])
+                return (0, (int(code[:-1]), code[-1])) if code else (1, 0)
+            value = track[column]
+            if column in ("title", "artist"):
+                return (0, value.casefold())
+            return (0 if value else 1, value)
+        self.show_tracks(sorted(self.playlist_songs, key=sort_key))
+
+    def start_analysis(self):
+        if self.analyzer or not self.ffmpeg_path:
+            return
+        # 분석 항목이 늘어난 뒤에는 이전 버전으로 분석한 곡도 다시 분석
+        tracks = [(track["path"], track["analyzed"] if track["analysis_version"] == ANALYSIS_VERSION else 0)
+                  for track in self.library.tracks.values()]
+        self.analyzer = LibraryAnalyzer(self.ffmpeg_path,
+                                        on_result=lambda path, result, mtime:
+                                        self.events.post("analyzed", (path, result, mtime)),
+                                        on_finished=lambda counts, rate:
+                                        self.events.post("analysis_done", (counts, rate)))
+        if self.pause_analysis_action.isChecked():
+            self.analyzer.pause()
+        self.analyzer.start(tracks)
+
+    def set_analysis_paused(self, paused):
+        if self.analyzer:
+            if paused:
+                self.analyzer.pause()
+            else:
+                self.analyzer.resume()
+
+    def _apply_analysis(self, results):
+        for path, result, mtime in results:
+            self.library.set_analysis(path, result or {}, mtime, ANALYSIS_VERSION)
+            if path == self.current_song:
+                self._show_length()
+            row = self.song_positions.get(path)
+            track = self.library.get(path)
+            if row is not None and track is not None:
+                self.playlist.item(row).setText(self._playlist_item_text(track))
+        if self.analyzer:
+            counts = self.analyzer.counts
+            self.statusBar().showMessage(f"Analyzing BPM/key: {counts['analyzed'] + counts['failed']}/"
+                                         f"{counts['queued']} ({self.analyzer.tracks_per_minute():.0f} tracks/min)", 5000)
+
+    def _on_analysis_finished(self, results):
+        """GUI 스레드: 마지막 분석 결과가 반영된 뒤 라이브러리 저장"""
+        self.analyzer = None
+        counts, tracks_per_minute = results[-1]
+        if counts["queued"]:
+            self.library.request_save()
+            self.show_notifications([f"BPM/key analysis finished: {counts['analyzed']} analyzed, "
+                                     f"{counts['failed']} failed ({tracks_per_minute:.0f} tracks/min)"])
+
+    def add_song(self):
+        file_names, _ = QFileDialog.getOpenFileNames(self, "Add MP3 Files", "", "MP3 Files (*.mp3)")
+        self._add_files(file_names)
         if file_names and not self.is_playing:
             self.update_song_info()
 
     def open_song(self):
         file_names, _ = QFileDialog.getOpenFileNames(self, "Open MP3 Files", "", "MP3 Files (*.mp3)")
-        first_song = None
-        for file_name in file_names:
-            if file_name:
-                self.playlist_songs.append(file_name)
-                try:
-                    song = MP3(file_name)
-                    title = str(song.get("TIT2", os.path.basename(file_name)))
-                    artist = str(song.get("TPE1", "Unknown Artist"))
-                    self.all_songs.append((file_name, title, artist, None))
-                    self.playlist.addItem(f"{artist} - {title}")
-                    if not first_song:
-                        first_song = file_name
-                except Exception as e:
-                    QMessageBox.critical(self, "Error", f"Failed to add song: {str(e)}")
+        self.open_files(file_names)
+
+    def open_files(self, file_names):
+        first_song = self._add_files(file_names)
         if first_song:
             self.current_song = first_song
             self.play_song()
 
+    def handle_remote_command(self, message):
+        """다른 실행(또는 스크립트)에서 로컬 소켓으로 전달된 명령 처리"""
+        command = message.get("command")
+        files = message.get("files", [])  # InstanceServer 가 message_error 로 검사한 뒤 전달
+        if command == "open":
+            self.open_files(files)
+        elif command == "enqueue":
+            self._add_files(files)
+            if files and not self.is_playing:
+                self.update_song_info()
+        elif command == "play":
+            if not self.is_playing:
+                self.play_pause()
+        elif command == "pause":
+            if self.is_playing:
+                self.play_pause()
+        elif command == "next":
+            self.next_song()
+        elif command == "prev":
+            self.prev_song()
+        elif command == "stop":
+            self.stop()
+        if command in ("open", "raise"):
+            self.showNormal()
+            self.raise_()
+            self.activateWindow()
+
     def play_song(self):
-        if self.current_song and self.current_song in self.playlist_songs:
+        if self.playing_from_queue is not None and self.library.path_ids.get(self.current_song) != self.playing_from_queue:
+            self.playing_from_queue = None  # 대기열 밖의 곡을 직접 고른 경우
+        if self.current_song and (self.current_song in self.song_positions or self.playing_from_queue is not None):
             try:
-                pygame.mixer.music.load(self.current_song)
-                pygame.mixer.music.set_volume(self.volume_slider.value() / 100)
-                pygame.mixer.music.play(start=0)
+                self._end_play_record("skip")  # 이전 곡을 끝까지 듣지 않고 바뀐 경우
+                # 디코더를 열기 전에 현재 곡과 다음 곡을 미리 읽기 큐에 올림 (다음 곡은 이번 곡을 재생하는 동안 읽힘)
+                self._prefetch_upcoming()
+                self.output.load(self.current_song)
+                self.output.set_volume(self.volume_slider.value() / 100)
+                start, end = self._trim_range(self.current_song)
+                self.output.play(start=start, end=end)  # 앞뒤 무음 구간은 건너뜀
                 self.is_playing = True
-                self.current_position = 0
+                self.current_position = start
+                self._start_play_record()
                 self.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaPause))
                 self.update_song_info()
+                self._session_changed()
             except pygame.error as e:
                 QMessageBox.critical(self, "Error", f"Failed to play song: {str(e)}")
                 self.stop()
@@ -486,6 +1244,84 @@ class MP3Player(QMainWindow):
             QMessageBox.warning(self, "Warning", "No song selected.")
             self.stop()
 
+    def _predicted_next(self):
+        """곡이 끝났을 때 next_song 이 고를 곡 (없으면 None)"""
+        if self.repeat_mode == "one":
+            return self.current_song
+        track_id = self.play_queue.peek(self._queue_valid)
+        if track_id is not None:
+            return self.library.tracks.paths[track_id]
+        if self.playing_from_queue is not None:
+            return None
+        if self.is_shuffle:
+            if self.shuffle.current() != self.current_song:
+                return None
+            return self.shuffle.peek()
+        index = self.song_positions.get(self.current_song)
+        if index is None:
+            return None
+        if index < len(self.playlist_songs) - 1:
+            return self.playlist_songs[index + 1]
+        return self.playlist_songs[0] if self.repeat_mode == "all" else None
+
+    def _prefetch_upcoming(self):
+        if self.output.readahead is not None:
+            self.readahead.prefetch([self.current_song, self._predicted_next()])
+
+    def set_readahead_size(self, size_mb):
+        self.readahead.set_capacity(size_mb * 1024 * 1024)
+        self.output.readahead = self.readahead if size_mb else None
+        self._session_changed()
+
+    def _queue_valid(self, track_id):
+        return track_id in self.library.tracks
+
+    def queue_selected(self, front=False):
+        """선택한 곡들을 대기열 끝(또는 맨 앞)에 추가. 재생목록 순서는 바꾸지 않음"""
+        track_ids = [self.playlist.item(row).data(Qt.UserRole)
+                     for row in sorted(self.playlist.row(item) for item in self.playlist.selectedItems())]
+        if front:
+            for track_id in reversed(track_ids):
+                self.play_queue.play_next(track_id)
+        else:
+            for track_id in track_ids:
+                self.play_queue.add(track_id)
+        if track_ids:
+            self.statusBar().showMessage(f"Up next: {len(self.play_queue)} song(s)", 3000)
+            self._queue_changed()
+
+    def clear_queue(self):
+        self.play_queue.clear()
+        self._queue_changed()
+
+    def show_queue(self):
+        if self.queue_dialog is None:
+            self.queue_dialog = QueueDialog(self)
+        self.queue_dialog.refresh()
+        self.queue_dialog.show()
+        self.queue_dialog.raise_()
+
+    def _queue_changed(self):
+        if self.queue_dialog and self.queue_dialog.isVisible():
+            self.queue_dialog.refresh()
+        if self.is_playing:
+            self._prefetch_upcoming()
+        self._session_changed()
+
+    def _start_play_record(self):
+        self.history.record("start", self.current_song)
+        self.history_song = self.current_song
+        self.history_played_mark = self.output.played_seconds()
+
+    def _end_play_record(self, kind):
+        """재생 중인 곡의 끝(finish) 또는 건너뜀(skip)을 기록. 들은 시간은 일시정지/탐색을 뺀 실제 출력 시간"""
+        if self.history_song:
+            listened = max(0.0, self.output.played_seconds() - self.history_played_mark)
+            self.history.record(kind, self.history_song, position=self.current_position, listened=listened)
+            if kind == "finish":
+                self.library.record_play(self.history_song)  # 다음 실행 때 기록에서 다시 맞추므로 따로 저장하지 않음
+            self.history_song = None
+
     def delete_song(self):
         selected_items = self.playlist.selectedItems()
         if not selected_items:
@@ -494,34 +1330,132 @@ class MP3Player(QMainWindow):
             index = self.playlist.row(item)
             self.playlist.takeItem(index)
             removed_song = self.playlist_songs.pop(index)
-            self.all_songs = [(path, title, artist, thumb) for path, title, artist, thumb in self.all_songs if path != removed_song]
-        if self.current_song not in self.playlist_songs:
+            self.shuffle.remove(removed_song)
+            track_id = item.data(Qt.UserRole)
+            if track_id in self.loaded_ids:
+                self.loaded_ids.remove(track_id)
+            self.library.remove_track(removed_song)
+        self._rebuild_song_positions()
+        self.library.request_save()
+        if self.playing_from_queue is not None and not self._queue_valid(self.playing_from_queue):
+            self.playing_from_queue = None  # 대기열에서 재생 중이던 곡을 삭제함
+        if self.current_song not in self.song_positions and self.playing_from_queue is None:
             self.current_song = None
             self.stop()
         else:
             self.update_song_info()
+        self._session_changed()
 
     def filter_songs(self):
         search_text = self.search_bar.text().lower()
+        if is_query(search_text):
+            # "artist:iu duration:>200" 같은 쿼리는 라이브러리 색인으로 검색
+            try:
+                self.show_tracks(self.library.query(search_text))
+                return
+            except QueryError as e:
+                # 잘못된 쿼리는 일반 검색어로 취급
+                self.statusBar().showMessage(f"Invalid query, showing text matches: {e}", 5000)
         self.playlist.clear()
         self.playlist_songs.clear()
-        for file_name, title, artist, thumbnail_url in self.all_songs:
-            if search_text in title.lower() or search_text in artist.lower():
-                self.playlist_songs.append(file_name)
-                self.playlist.addItem(f"{artist} - {title}")
-        if self.current_song not in self.playlist_songs:
+        tracks = self.library.tracks
+        for track_id in self.loaded_ids:
+            track = tracks[track_id]
+            if search_text in track["title"].lower() or search_text in track["artist"].lower():
+                self.playlist_songs.append(track["path"])
+                self._add_playlist_item(track_id)
+        self._rebuild_song_positions()
+        self._reset_shuffle()
+        if self.current_song not in self.song_positions and self.playing_from_queue is None:
             self.current_song = None
             self.stop()
+        self._session_changed()
+
+    def show_tracks(self, paths):
+        """주어진 경로 목록을 재생목록에 표시 (라이브러리에만 있는 곡은 loaded_ids 에 추가)"""
+        loaded = set(self.loaded_ids)
+        self.playlist.clear()
+        self.playlist_songs = []
+        for path in paths:
+            track_id = self.library.path_ids.get(path)
+            if track_id is None:
+                continue
+            if track_id not in loaded:
+                self.loaded_ids.append(track_id)
+                loaded.add(track_id)
+            self.playlist_songs.append(path)
+            self._add_playlist_item(track_id)
+        self._rebuild_song_positions()
+        self._reset_shuffle()
+        if self.current_song not in self.song_positions and self.playing_from_queue is None:
+            self.current_song = None
+            self.stop()
+        self._session_changed()
+
+    def refresh_smart_playlist_menu(self):
+        self.smart_menu.clear()
+        new_action = QAction("새 스마트 재생목록...", self)
+        new_action.triggered.connect(self.create_smart_playlist)
+        self.smart_menu.addAction(new_action)
+        delete_action = QAction("스마트 재생목록 삭제...", self)
+        delete_action.triggered.connect(self.delete_smart_playlist)
+        self.smart_menu.addAction(delete_action)
+        if self.library.smart_playlists:
+            self.smart_menu.addSeparator()
+        for name in sorted(self.library.smart_playlists):
+            action = QAction(name, self)
+            action.triggered.connect(lambda checked, n=name: self.open_smart_playlist(n))
+            self.smart_menu.addAction(action)
+
+    def create_smart_playlist(self):
+        name, ok = QInputDialog.getText(self, "Smart Playlist", "Name:")
+        if not ok or not name.strip():
+            return
+        query, ok = QInputDialog.getText(self, "Smart Playlist",
+                                         "Query (e.g. artist:iu duration:3:00..5:00 source:youtube added:<30d plays:>=5 bpm:120..130 key:Am):")
+        if not ok or not query.strip():
+            return
+        try:
+            self.library.save_smart_playlist(name.strip(), query.strip())
+        except QueryError as e:
+            QMessageBox.warning(self, "Warning", f"Invalid query: {str(e)}")
+            return
+        self.library.request_save()
+        self.refresh_smart_playlist_menu()
+        self.open_smart_playlist(name.strip())
+
+    def delete_smart_playlist(self):
+        names = sorted(self.library.smart_playlists)
+        if not names:
+            return
+        name, ok = QInputDialog.getItem(self, "Smart Playlist", "Delete:", names, 0, False)
+        if ok:
+            self.library.delete_smart_playlist(name)
+            self.library.request_save()
+            self.refresh_smart_playlist_menu()
+
+    def open_smart_playlist(self, name):
+        if not self.is_playlist_visible:
+            self.toggle_playlist()
+        self.show_tracks(self.library.smart_playlist_paths(name))
 
     def play_pause(self):
-        if self.playlist_songs:
-            if not self.current_song or self.current_song not in self.playlist_songs:
+        if self.playlist_songs or self.playing_from_queue is not None:
+            if self.playing_from_queue is None and (not self.current_song or self.current_song not in self.song_positions):
                 self.current_song = self.playlist_songs[0]
             if not self.is_playing:
                 try:
-                    pygame.mixer.music.load(self.current_song)
-                    pygame.mixer.music.set_volume(self.volume_slider.value() / 100)
-                    pygame.mixer.music.play(start=self.current_position)
+                    if self.output.paused and self.output.path == self.current_song:
+                        self.output.unpause()
+                    else:
+                        self.output.load(self.current_song)
+                        self.output.set_volume(self.volume_slider.value() / 100)
+                        start, end = self._trim_range(self.current_song)
+                        self.output.play(start=max(start, self.current_position), end=end)
+                        if self.history_song != self.current_song:
+                            # 정지 후 다시 재생하거나 복원한 세션을 이어서 재생하는 경우도 시작으로 기록
+                            self._end_play_record("skip")
+                            self._start_play_record()
                     self.is_playing = True
                     self.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaPause))
                     self.update_song_info()
@@ -529,12 +1463,14 @@ class MP3Player(QMainWindow):
                     QMessageBox.critical(self, "Error", f"Failed to play song: {str(e)}")
                     self.stop()
             else:
-                pygame.mixer.music.pause()
+                self.output.pause()
                 self.is_playing = False
                 self.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
+            self._session_changed()
 
     def stop(self):
-        pygame.mixer.music.stop()
+        self._end_play_record("skip")
+        self.output.stop()
         self.is_playing = False
         self.current_position = 0
         self.seek_slider.setValue(0)
@@ -543,10 +1479,30 @@ class MP3Player(QMainWindow):
         self.thumbnail_label.setText("No Image")
         self.title_label.setText("No song selected")
         self.artist_label.setText("")
+        self.clear_lyrics()
+        self._session_changed()
 
     def prev_song(self):
+        if self.playing_from_queue is not None:
+            # 대기열 곡에서 이전: 지금 곡을 대기열 맨 앞에 되돌리고 대기열 전에 듣던 곡으로
+            self.play_queue.play_next(self.playing_from_queue)
+            self.playing_from_queue = None
+            self._queue_changed()
+            if self.queue_anchor in self.song_positions:
+                self.current_song = self.queue_anchor
+                self.play_song()
+            return
         if self.current_song and self.playlist_songs:
-            index = self.playlist_songs.index(self.current_song)
+            if self.is_shuffle:
+                # 무작위 재생 모드: 재생 기록을 따라 이전 곡으로
+                if self.shuffle.current() != self.current_song:
+                    self.shuffle.start_from(self.current_song)
+                previous = self.shuffle.prev()
+                if previous:
+                    self.current_song = previous
+                    self.play_song()
+                return
+            index = self.song_positions.get(self.current_song, 0)
             if index > 0:
                 self.current_song = self.playlist_songs[index - 1]
                 self.play_song()
@@ -555,20 +1511,35 @@ class MP3Player(QMainWindow):
                 self.play_song()
 
     def next_song(self):
+        self._end_play_record("skip")
+        track_id = self.play_queue.pop(self._queue_valid)
+        if track_id is not None:
+            # 대기열이 재생목록보다 우선
+            if self.playing_from_queue is None and self.current_song in self.song_positions:
+                self.queue_anchor = self.current_song
+            self.playing_from_queue = track_id
+            self.current_song = self.library.tracks.paths[track_id]
+            self._queue_changed()
+            self.play_song()
+            return
+        if self.playing_from_queue is not None:
+            # 대기열을 다 들었으면 대기열 전에 듣던 곡 다음부터 이어감
+            self.playing_from_queue = None
+            if self.queue_anchor in self.song_positions:
+                self.current_song = self.queue_anchor
         if not self.playlist_songs:
             QMessageBox.warning(self, "Warning", "No songs in playlist.")
             return
-        if not self.current_song or self.current_song not in self.playlist_songs:
+        if not self.current_song or self.current_song not in self.song_positions:
             self.current_song = self.playlist_songs[0]
             self.play_song()
             return
-        index = self.playlist_songs.index(self.current_song)
+        index = self.song_positions[self.current_song]
         if self.is_shuffle:
-            # 무작위 재생 모드: 무작위로 다음 곡 선택
-            new_index = random.randint(0, len(self.playlist_songs) - 1)
-            while new_index == index and len(self.playlist_songs) > 1:
-                new_index = random.randint(0, len(self.playlist_songs) - 1)
-            self.current_song = self.playlist_songs[new_index]
+            # 무작위 재생 모드: 셔플 순서에서 다음 곡 선택 (한 바퀴 돌기 전에는 중복 없음)
+            if self.shuffle.current() != self.current_song:
+                self.shuffle.start_from(self.current_song)
+            self.current_song = self.shuffle.next()
             self.play_song()
         else:
             # Shuffle이 꺼져 있는 경우
@@ -590,58 +1561,142 @@ class MP3Player(QMainWindow):
         self.play_song()
 
     def update_song_info(self):
+        self.spectrum_widget.wake()
         if self.current_song:
+            if self.current_song != self.lyrics_song:
+                self.clear_lyrics()
+                self.lyrics_song = self.current_song
+                self.lyrics_cache.request(self.current_song,
+                                          lambda path, lyrics: self.events.post("lyrics", (path, lyrics)))
             try:
-                song = MP3(self.current_song)
-                self.seek_slider.setMaximum(int(song.info.length))
-                self.total_time_label.setText(self.format_time(song.info.length))
-                for song_path, title, artist, thumbnail_url in self.all_songs:
-                    if song_path == self.current_song:
-                        self.title_label.setText(title)
-                        self.artist_label.setText(artist)
-                        if thumbnail_url:
-                            try:
-                                with urllib.request.urlopen(thumbnail_url) as response:
-                                    image_data = response.read()
-                                pixmap = QPixmap()
-                                pixmap.loadFromData(image_data)
-                                scaled_pixmap = pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                                self.thumbnail_label.setPixmap(scaled_pixmap)
-                            except Exception:
-                                self.thumbnail_label.setText("No Image")
-                        else:
-                            self.thumbnail_label.setText("No Image")
-                        break
+                track = self.library.get(self.current_song)
+                self._show_length()
+                if track:
+                    self.title_label.setText(track["title"])
+                    self.artist_label.setText(track["artist"])
+                    self.show_cover(self.current_song, track["thumbnail_url"])
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to load song metadata: {str(e)}")
                 self.current_song = None
                 self.stop()
 
+    def _song_length(self, path):
+        """라이브러리에 기록된 길이 우선 (받는 중인 곡은 아직 MP3 가 없음)"""
+        track = self.library.get(path)
+        if track and (track["duration"] or path in self.output.streams):
+            return track["duration"]
+        return MP3(path).info.length
+
+    def _trim_range(self, path):
+        """분석으로 찾은 재생 구간 (시작 초, 끝 초). 끝이 None 이면 곡 끝까지"""
+        track = self.library.get(path)
+        if track is None:
+            return 0.0, None
+        return track["trim_start"], track["trim_end"] or None
+
+    def _show_length(self):
+        """탐색 막대와 전체 시간은 앞뒤 무음을 뺀 구간 기준"""
+        start, end = self._trim_range(self.current_song)
+        length = max(0, (end or self._song_length(self.current_song)) - start)
+        self.seek_slider.setMaximum(int(length))
+        self.total_time_label.setText(self.format_time(length))
+
+    def _show_position(self, position):
+        """원본 기준 위치를 재생 구간 시작 기준으로 탐색 막대/시간 표시에 반영"""
+        offset = max(0, position - self._trim_range(self.current_song)[0])
+        self.seek_slider.setValue(int(offset))
+        self.current_time_label.setText(self.format_time(offset))
+
+    def _request_cover(self, path, thumbnail_url=None):
+        """표지가 아직 확인되지 않은 곡이면 백그라운드에서 추출/다운로드 요청"""
+        track = self.library.get(path)
+        if track is None:
+            return
+        art = track.get("art")
+        if art is None or (art and not self.thumbnail_cache.contains(art)):
+            self.cover_loader.request(path, thumbnail_url or track.get("thumbnail_url"))
+
+    def show_cover(self, path, thumbnail_url=None):
+        track = self.library.get(path)
+        key = track.get("art") if track else None
+        pixmap = self.thumbnail_cache.pixmap(key) if key else None
+        if pixmap:
+            self.thumbnail_label.setPixmap(pixmap)
+        else:
+            self.thumbnail_label.setText("No Image")
+            self._request_cover(path, thumbnail_url)
+
+    def clear_lyrics(self):
+        self.lyrics_timer.stop()
+        self.lyrics_widget.clear()
+        self.lyrics = None
+        self.lyrics_song = None
+        self.lyrics_line = -1
+
+    def show_lyrics(self, path, lyrics):
+        if path != self.lyrics_song or lyrics is None:
+            return
+        self.lyrics = lyrics
+        self.lyrics_line = -1
+        self.lyrics_widget.clear()
+        self.lyrics_widget.addItems(lyrics.lines)
+        if lyrics.synced:
+            self.lyrics_timer.start(200)
+
+    def playback_position(self):
+        """현재 재생 위치(초). 출력 중인 PCM 블록 기준이라 1초 타이머의 current_position 보다 정밀"""
+        return self.output.position()
+
+    def _spectrum_source(self):
+        if self.is_playing and self.current_song:
+            return self.playback_position()
+        return None
+
+    def _attach_spectrum(self, enabled):
+        self.output.set_tap(self.spectrum_tap if enabled else None)
+
+    def update_lyrics_line(self):
+        if not self.lyrics or not self.is_playing:
+            return
+        line = self.lyrics.line_index(self.playback_position())
+        if line != self.lyrics_line:
+            self.lyrics_line = line
+            if line >= 0:
+                self.lyrics_widget.setCurrentRow(line)
+                self.lyrics_widget.scrollToItem(self.lyrics_widget.item(line), QListWidget.PositionAtCenter)
+            else:
+                self.lyrics_widget.clearSelection()
+
     def set_volume(self):
         volume = self.volume_slider.value() / 100
-        pygame.mixer.music.set_volume(volume)
+        self.output.set_volume(volume)
         if volume > 0:
             self.volume_button.setIcon(self.style().standardIcon(QStyle.SP_MediaVolume))
             self.last_volume = self.volume_slider.value()
         else:
             self.volume_button.setIcon(self.style().standardIcon(QStyle.SP_MediaVolumeMuted))
+        self._session_changed()
 
     def start_seeking(self):
         self.is_seeking = True
 
     def stop_seeking(self):
         self.is_seeking = False
-        position = self.seek_slider.value()
         if self.current_song:
             try:
-                pygame.mixer.music.stop()
-                pygame.mixer.music.load(self.current_song)
-                pygame.mixer.music.set_volume(self.volume_slider.value() / 100)
-                pygame.mixer.music.play(start=position)
+                start, end = self._trim_range(self.current_song)
+                position = start + self.seek_slider.value()
+                self.output.stop()
+                self.output.load(self.current_song)
+                self.output.set_volume(self.volume_slider.value() / 100)
+                self.output.play(start=position, end=end)
                 self.is_playing = True
+                self.history.record("seek", self.current_song, position=position)
                 self.current_position = position
-                self.current_time_label.setText(self.format_time(position))
+                self._show_position(position)
                 self.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaPause))
+                self.spectrum_widget.wake()
+                self._session_changed()
             except pygame.error as e:
                 QMessageBox.critical(self, "Error", f"Failed to seek song: {str(e)}")
                 self.stop()
@@ -655,15 +1710,17 @@ class MP3Player(QMainWindow):
         if self.current_song and self.is_playing:
             current_pos = self.current_position
             try:
-                song_length = MP3(self.current_song).info.length
-                new_pos = max(0, min(song_length, current_pos + seconds))
-                pygame.mixer.music.stop()
-                pygame.mixer.music.load(self.current_song)
-                pygame.mixer.music.set_volume(self.volume_slider.value() / 100)
-                pygame.mixer.music.play(start=new_pos)
+                start, end = self._trim_range(self.current_song)
+                song_length = end or self._song_length(self.current_song)
+                new_pos = max(start, min(song_length, current_pos + seconds))
+                self.output.stop()
+                self.output.load(self.current_song)
+                self.output.set_volume(self.volume_slider.value() / 100)
+                self.output.play(start=new_pos, end=end)
+                self.history.record("seek", self.current_song, position=new_pos)
                 self.current_position = new_pos
-                self.seek_slider.setValue(int(new_pos))
-                self.current_time_label.setText(self.format_time(new_pos))
+                self._show_position(new_pos)
+                self._session_changed()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to seek song: {str(e)}")
                 self.stop()
@@ -675,46 +1732,51 @@ class MP3Player(QMainWindow):
 
     def update_seek_slider(self):
         if self.is_playing and self.current_song and not self.is_seeking:
-            position = pygame.mixer.music.get_pos() / 1000
-            if position >= 0 and pygame.mixer.music.get_busy():
-                self.current_position += 1
-                self.seek_slider.setValue(int(self.current_position))
-                self.current_time_label.setText(self.format_time(self.current_position))
+            if self.output.get_busy():
+                self.current_position = self.output.position()
+                self._show_position(self.current_position)
+                if time.monotonic() - self.session_saved_at > 10:
+                    # 비정상 종료에 대비해 재생 중에는 위치도 가끔 기록
+                    self.save_session()
             try:
-                song = MP3(self.current_song)
-                if self.current_position >= song.info.length:
+                # 출력이 곡 끝까지 재생을 마치면 다음 동작 결정
+                if not self.output.get_busy():
+                    if self.output.error:
+                        # 디코딩하지 못한 곡: on_error 알림으로 사용자에게 알리고, 끝까지 들은 것으로 기록하지 않음
+                        self.history_song = None
+                        if self.repeat_mode == "one":
+                            self.stop()  # 같은 곡을 계속 다시 시도하지 않도록
+                            return
+                    else:
+                        self._end_play_record("finish")
                     if self.repeat_mode == "one":
-                        pygame.mixer.music.stop()
-                        pygame.mixer.music.load(self.current_song)
-                        pygame.mixer.music.set_volume(self.volume_slider.value() / 100)
-                        pygame.mixer.music.play(start=0)
-                        self.current_position = 0
+                        self.output.stop()
+                        self.output.load(self.current_song)
+                        self.output.set_volume(self.volume_slider.value() / 100)
+                        start, end = self._trim_range(self.current_song)
+                        self.output.play(start=start, end=end)
+                        self.current_position = start
+                        self._start_play_record()
                     elif self.repeat_mode == "all":
                         self.next_song()
                     elif self.is_shuffle:
                         self.next_song()
                     else:  # repeat_mode == "off"
-                        index = self.playlist_songs.index(self.current_song) if self.current_song in self.playlist_songs else -1
-                        if index < len(self.playlist_songs) - 1:
+                        base = self.queue_anchor if self.playing_from_queue is not None else self.current_song
+                        index = self.song_positions.get(base, -1)
+                        if self.play_queue or index < len(self.playlist_songs) - 1:
                             self.next_song()
                         else:
                             self.stop()
             except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to check song duration: {str(e)}")
+                QMessageBox.critical(self, "Error", f"Failed to continue playback: {str(e)}")
                 self.stop()
 
     def update_playlist_order(self):
-        new_order = []
-        new_all_songs = []
-        for i in range(self.playlist.count()):
-            item = self.playlist.item(i)
-            for song_path, title, artist, thumbnail_url in self.all_songs:
-                if f"{artist} - {title}" == item.text():
-                    new_order.append(song_path)
-                    new_all_songs.append((song_path, title, artist, thumbnail_url))
-                    break
-        self.playlist_songs = new_order
-        self.all_songs = new_all_songs
+        paths = self.library.tracks.paths
+        self.playlist_songs = [paths[self.playlist.item(i).data(Qt.UserRole)] for i in range(self.playlist.count())]
+        self._rebuild_song_positions()
+        self._session_changed()
 
     def cycle_repeat_mode(self):
         if self.repeat_mode == "off":
@@ -732,12 +1794,14 @@ class MP3Player(QMainWindow):
             self.previous_repeat_mode = "off"
             self.repeat_action.setText("반복 끄기")
             self.repeat_button.setIcon(QIcon("images/repeat_off.png"))
+        self._session_changed()
 
     def toggle_shuffle(self):
         self.is_shuffle = not self.is_shuffle
         if self.is_shuffle:
             self.previous_repeat_mode = self.repeat_mode  # Shuffle 활성화 전 반복 모드 저장
             self.repeat_mode = "off"  # Shuffle 중에는 반복 비활성화
+            self._reset_shuffle()
             self.repeat_action.setText("무작위 재생")
             self.repeat_button.setIcon(QIcon("images/shuffle.png"))
         else:
@@ -751,6 +1815,58 @@ class MP3Player(QMainWindow):
             else:  # self.repeat_mode == "all"
                 self.repeat_action.setText("전체 반복")
                 self.repeat_button.setIcon(QIcon("images/repeat_all.png"))
+        self._session_changed()
+
+    def _show_repeat_mode(self):
+        """반복/무작위 상태를 메뉴 문구와 버튼 아이콘에 반영"""
+        if self.is_shuffle:
+            self.repeat_action.setText("무작위 재생")
+            self.repeat_button.setIcon(QIcon("images/shuffle.png"))
+        elif self.repeat_mode == "one":
+            self.repeat_action.setText("한곡 반복")
+            self.repeat_button.setIcon(QIcon("images/repeat_one.png"))
+        elif self.repeat_mode == "all":
+            self.repeat_action.setText("전체 반복")
+            self.repeat_button.setIcon(QIcon("images/repeat_all.png"))
+        else:
+            self.repeat_action.setText("반복 끄기")
+            self.repeat_button.setIcon(QIcon("images/repeat_off.png"))
+
+    def set_equalizer_preset(self, name):
+        self.equalizer_preset = name
+        self.equalizer.set_preset(name)
+        if self.equalizer_dialog:
+            self.equalizer_dialog.set_gains(self.equalizer.gains)
+        self._session_changed()
+
+    def set_equalizer_gains(self, gains):
+        self.equalizer.set_gains(gains)
+        preset = next((name for name, values in PRESETS.items() if list(values) == list(gains)), None)
+        self.equalizer_preset = preset
+        for action in self.equalizer_actions.actions():
+            if action.text() == preset:
+                action.setChecked(True)
+                break
+        else:
+            self.custom_equalizer_action.setChecked(True)
+        self._session_changed()
+
+    def show_equalizer_dialog(self):
+        if self.equalizer_dialog is None:
+            self.equalizer_dialog = EqualizerDialog(self.equalizer.gains, self.set_equalizer_gains, self)
+        self.equalizer_dialog.show()
+        self.equalizer_dialog.raise_()
+        if self.equalizer_preset:
+            self.equalizer_actions.actions()[list(PRESETS).index(self.equalizer_preset)].setChecked(True)
+
+    def set_playback_speed(self, speed):
+        """음정을 유지한 채 재생 속도 변경. 위치는 원본 기준으로 계산되므로 재생바/시간 표시는 그대로 맞음"""
+        self.time_stretch.set_rate(speed)
+        self._session_changed()
+
+    def set_weighted_shuffle(self, enabled):
+        self.shuffle.weighted = enabled
+        self._session_changed()
 
     def adjust_volume(self, delta):
         current_volume = self.volume_slider.value()
@@ -766,20 +1882,151 @@ class MP3Player(QMainWindow):
             self.volume_slider.setValue(self.last_volume)
             self.volume_button.setIcon(self.style().standardIcon(QStyle.SP_MediaVolume))
 
+    def _session_changed(self):
+        self.session_timer.start()  # 다시 시작하므로 연속 변경은 마지막 한 번만 기록
+
+    def _session_state(self):
+        if self.current_song and self.output.path == self.current_song and self.output.get_busy():
+            position = self.output.position()
+        else:
+            position = self.current_position
+        paths = self.library.tracks.paths
+        return {
+            "current_song": self.current_song,
+            "position": round(position, 3),
+            "playing": self.is_playing,
+            "volume": self.volume_slider.value(),
+            "last_volume": self.last_volume,
+            "repeat_mode": self.repeat_mode,
+            "previous_repeat_mode": self.previous_repeat_mode,
+            "shuffle": self.is_shuffle,
+            "weighted_shuffle": self.shuffle.weighted,
+            "speed": self.time_stretch.rate,
+            "equalizer": self.equalizer.gains,
+            "readahead_mb": self.readahead.capacity_bytes // (1024 * 1024) if self.output.readahead else 0,
+            "audio_engine": self.audio_engine_setting,
+            "search": self.search_bar.text(),
+            "playlist_visible": self.is_playlist_visible,
+            "loaded": [paths[track_id] for track_id in self.loaded_ids],
+            "playlist": list(self.playlist_songs),
+            "queue": list(self.play_queue),
+            "playing_from_queue": self.playing_from_queue,
+            "queue_anchor": self.queue_anchor,
+        }
+
+    def save_session(self):
+        self.session_saved_at = time.monotonic()
+        self.session.save(self._session_state())
+
+    def restore_session(self):
+        """이전 세션의 재생목록/설정/곡 위치 복원. 라이브러리 색인만 쓰고 곡 파일은 다시 읽지 않음"""
+        state = self.session.load()
+        if not state:
+            return
+        self.last_volume = state.get("last_volume", self.last_volume)
+        self.volume_slider.setValue(state.get("volume", self.volume_slider.value()))
+        self.repeat_mode = state.get("repeat_mode", "off")
+        self.previous_repeat_mode = state.get("previous_repeat_mode", "off")
+        self.is_shuffle = state.get("shuffle", False)
+        self.weighted_shuffle_action.setChecked(state.get("weighted_shuffle", False))
+        self._show_repeat_mode()
+        speed = state.get("speed", 1.0)
+        self.set_playback_speed(speed)
+        for action in self.speed_actions.actions():
+            action.setChecked(action.text() == f"{speed:g}x")
+        if state.get("equalizer"):
+            self.set_equalizer_gains(state["equalizer"])
+        readahead_mb = state.get("readahead_mb", 256)
+        self.set_readahead_size(readahead_mb)
+        for action, size_mb in zip(self.readahead_actions.actions(), READAHEAD_SIZES_MB):
+            action.setChecked(size_mb == readahead_mb)
+
+        for path in state.get("loaded", []):
+            track_id = self.library.path_ids.get(path)
+            if track_id is not None:
+                self.loaded_ids.append(track_id)
+        self.search_bar.blockSignals(True)
+        self.search_bar.setText(state.get("search", ""))
+        self.search_bar.blockSignals(False)
+        self.play_queue = PlayQueue(state.get("queue", []))
+        self.queue_anchor = state.get("queue_anchor")
+        self.show_tracks(state.get("playlist", []))
+        if state.get("playlist_visible") and not self.is_playlist_visible:
+            self.toggle_playlist()
+
+        current = state.get("current_song")
+        from_queue = state.get("playing_from_queue")
+        if from_queue is not None and self.library.path_ids.get(current) == from_queue:
+            self.playing_from_queue = from_queue
+        elif current not in self.song_positions:
+            return
+        if not current or not os.path.exists(current):
+            self.playing_from_queue = None
+            return
+        self.current_song = current
+        self.shuffle.start_from(current)
+        self.current_position = state.get("position", 0)
+        self.update_song_info()
+        self._show_position(self.current_position)
+        if state.get("playing"):
+            self.play_pause()  # 저장된 위치부터 이어서 재생
+
+    def _track_label(self, path):
+        track = self.library.get(path)
+        if track is None:
+            return os.path.basename(path)
+        return f"{track['artist']} - {track['title']}" if track["artist"] else track["title"]
+
+    def show_play_stats(self):
+        # 집계만 읽으므로 기록이 많아도 바로 표시됨
+        lines = ["많이 들은 곡"]
+        lines += [f"  {count}회  {self._track_label(path)}" for count, path in self.history.most_played(10)]
+        lines += ["", "최근 들은 곡"]
+        lines += [f"  {time.strftime('%m-%d %H:%M', time.localtime(at))}  {self._track_label(path)}"
+                  for at, path in self.history.recently_played(10)]
+        lines += ["", "자주 건너뛴 곡"]
+        lines += [f"  {rate:.0%}  {self._track_label(path)}" for rate, path in self.history.most_skipped(5)]
+        today = time.strftime("%Y-%m-%d")
+        week_start = time.strftime("%Y-%m-%d", time.localtime(time.time() - 6 * 86400))
+        lines += ["", f"오늘 {self.history.plays_between(today, today)}곡, "
+                      f"최근 7일 {self.history.plays_between(week_start, today)}곡 재생"]
+        QMessageBox.information(self, "재생 통계", "\n".join(lines))
+
     def show_about(self):
         QMessageBox.about(self, "About", "AlSong Style MP3 Player\nVersion 1.0\nBuilt with PyQt5 and pygame\nYouTube integration added")
 
-    def customEvent(self, event):
-        if hasattr(event, 'message'):
-            QMessageBox.information(self, "Download Status", event.message)
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            # 최소화되면 스펙트럼 갱신을 멈추고, 복원되면 다시 시작
+            self.spectrum_widget.wake()
+        super().changeEvent(event)
 
-class CustomEvent(QEvent):
-    def __init__(self, message):
-        super().__init__(QEvent.Type.User)
-        self.message = message
+    def closeEvent(self, event):
+        # 출력을 멈추기 전에 정확한 재생 위치를 기록
+        self.session_timer.stop()
+        self.session.flush(self._session_state())
+        self.output.set_tap(None)
+        if self.exporter:
+            self.exporter.cancel()
+        if self.analyzer:
+            self.analyzer.cancel()
+        self.output.stop()
+        for path, stream in self.output.streams.items():
+            if not stream.finished:
+                # 받다 만 곡은 파일이 없으므로 라이브러리에 남기지 않음
+                self.library.remove_track(path)
+        self.output.close()
+        self.instance_server.close()
+        self.library.save()
+        self.library_lock.release()
+        self.history.close()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     player = MP3Player()
     player.show()
+    startup_command = command_from_args([arg for arg in sys.argv[1:] if arg != "--new-instance"])
+    if startup_command:
+        player.handle_remote_command(startup_command)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,207 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+
+def _read_file(path, chunk_size=1 << 20):
+    chunks = []
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            chunks.append(data)
+    return b"".join(chunks)
+
+
+class ReadAheadCache:
+    """느린 저장소(NFS/SMB 등)의 곡 파일을 작업 스레드에서 통째로 메모리에 읽어 두는 LRU 캐시
+
+    prefetch() 로 현재 곡과 다음에 재생될 곡을 넘기면 순서대로 읽어 두고, get() 은 메모리의 바이트를
+    돌려준다. 전체 크기가 capacity_bytes 를 넘으면 가장 오래 쓰지 않은 곡부터 버린다.
+    캐시에 넣을 때의 크기/수정 시각이 바뀐 파일은 get() 에서 버리고 다음 prefetch 때 다시 읽는다.
+    """
+
+    def __init__(self, capacity_bytes=256 * 1024 * 1024, read_file=_read_file):
+        self.capacity_bytes = capacity_bytes
+        self.read_file = read_file
+        self.entries = OrderedDict()  # 경로 -> (크기, 수정 시각, 바이트)
+        self.used_bytes = 0
+        self.loading = {}  # 읽는 중인 경로 -> 완료 Event
+        self.queue = []
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.stats = {"hits": 0, "misses": 0, "prefetched_files": 0, "prefetched_bytes": 0, "evictions": 0}
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def set_capacity(self, capacity_bytes):
+        with self.lock:
+            self.capacity_bytes = capacity_bytes
+            self._evict(0)
+
+    def hit_rate(self):
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return self.stats["hits"] / lookups if lookups else 0.0
+
+    def prefetch(self, paths):
+        """paths 를 앞에서부터 읽어 둠. 이전에 요청했지만 아직 시작하지 않은 목록은 대체됨"""
+        with self.lock:
+            self.queue = [path for path in paths if path]
+            self.wake.notify()
+
+    def get(self, path, timeout=10.0):
+        """메모리에 있으면 바이트, 없으면 None. 지금 읽는 중이면 끝날 때까지 기다림 (같은 파일을 두 번 읽지 않음)"""
+        with self.lock:
+            pending = self.loading.get(path)
+        if pending is not None:
+            pending.wait(timeout)
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry is not None:
+            # 읽어 둔 뒤 파일이 바뀌었으면(태그 기록 등) 오래된 바이트를 돌려주지 않음
+            try:
+                stat = os.stat(path)
+                changed = entry[:2] != (stat.st_size, stat.st_mtime)
+            except OSError:
+                changed = True
+            if changed:
+                with self.lock:
+                    if self.entries.get(path) is entry:
+                        del self.entries[path]
+                        self.used_bytes -= entry[0]
+                entry = None
+        with self.lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if path in self.entries:
+                self.entries.move_to_end(path)
+            self.stats["hits"] += 1
+            return entry[2]
+
+    def _evict(self, incoming):
+        while self.entries and self.used_bytes + incoming > self.capacity_bytes:
+            _, (size, _, _) = self.entries.popitem(last=False)
+            self.used_bytes -= size
+            self.stats["evictions"] += 1
+
+    def _next_job(self):
+        """캐시에 없거나 바뀐 다음 경로와 그 stat. 큐가 비면 None"""
+        while self.queue:
+            path = self.queue.pop(0)
+            entry = self.entries.get(path)
+            self.lock.release()
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            finally:
+                self.lock.acquire()
+            if stat is None or stat.st_size > self.capacity_bytes:
+                continue
+            if entry and entry[:2] == (stat.st_size, stat.st_mtime):
+                self.entries.move_to_end(path)
+                continue
+            self.loading[path] = threading.Event()
+            return path, stat
+        return None
+
+    def _run(self):
+        while True:
+            with self.lock:
+                job = self._next_job()
+                while job is None:
+                    self.wake.wait()
+                    job = self._next_job()
+            path, stat = job
+            try:
+                data = self.read_file(path)
+            except OSError:
+                data = None
+            with self.lock:
+                old = self.entries.pop(path, None)
+                if old is not None:
+                    self.used_bytes -= old[0]
+                if data is not None and len(data) <= self.capacity_bytes:
+                    self._evict(len(data))
+                    self.entries[path] = (len(data), stat.st_mtime, data)
+                    self.used_bytes += len(data)
+                    self.stats["prefetched_files"] += 1
+                    self.stats["prefetched_bytes"] += len(data)
+                self.loading.pop(path).set()
+
+    def describe(self):
+        with self.lock:
+            stats = dict(self.stats)
+            used, capacity, files = self.used_bytes, self.capacity_bytes, len(self.entries)
+        lookups = stats["hits"] + stats["misses"]
+        rate = stats["hits"] / lookups if lookups else 0.0
+        return (f"hit rate {rate:.0%} ({stats['hits']}/{lookups}), {files} file(s) / {used / 1e6:.1f} of "
+                f"{capacity / 1e6:.0f} MB in memory, prefetched {stats['prefetched_files']} file(s) "
+                f"({stats['prefetched_bytes'] / 1e6:.1f} MB), {stats['evictions']} eviction(s)")
+
+
+def _run_benchmark(audio_path, ffmpeg_path, latency=0.05, chunk_size=256 * 1024):
+    """청크마다 지연이 있는 저장소를 흉내 내 곡을 바꿀 때 첫 블록까지의 시간을 캐시 유무로 비교"""
+    import io
+    import shutil
+    import tempfile
+    from pcm import PcmDecoder
+
+    def slow_read(path):
+        chunks = []
+        with open(path, "rb") as f:
+            while True:
+                time.sleep(latency)
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                chunks.append(data)
+        return b"".join(chunks)
+
+    class SlowFile(io.RawIOBase):
+        """ffmpeg 에 원격 파일을 직접 넘기는 경우를 흉내 냄 (읽을 때마다 지연)"""
+
+        def __init__(self, path):
+            self.file = open(path, "rb")
+
+        def read(self, size=-1):
+            time.sleep(latency)
+            return self.file.read(min(size, chunk_size) if size and size > 0 else chunk_size)
+
+        def close(self):
+            self.file.close()
+
+    work_dir = tempfile.mkdtemp()
+    paths = []
+    for i in range(4):
+        paths.append(os.path.join(work_dir, f"track{i}{os.path.splitext(audio_path)[1]}"))
+        shutil.copy(audio_path, paths[-1])
+    try:
+        def first_block(feed):
+            start = time.perf_counter()
+            with PcmDecoder(None, ffmpeg_path, feed=feed) as decoder:
+                decoder.read(8192)
+            return time.perf_counter() - start
+
+        direct = [first_block(SlowFile(path)) for path in paths]
+        cache = ReadAheadCache(capacity_bytes=3 * os.path.getsize(audio_path), read_file=slow_read)
+        cache.prefetch(paths[:2])
+        cached = []
+        for i, path in enumerate(paths):
+            # 재생 중 다음 곡을 미리 읽을 시간(곡 길이)을 흉내 냄
+            time.sleep(1.0)
+            cached.append(first_block(io.BytesIO(cache.get(path))))
+            cache.prefetch(paths[i:i + 2])
+        print(f"track change, direct from slow storage: {sum(direct) / len(direct) * 1000:.0f} ms to first block")
+        print(f"track change, from read-ahead buffer: {sum(cached) / len(cached) * 1000:.0f} ms to first block")
+        print(cache.describe())
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    import sys
+    _run_benchmark(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
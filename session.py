@@ -0,0 +1,68 @@
+import os
+import json
+import time
+import threading
+
+SESSION_VERSION = 1
+
+
+class SessionStore:
+    """종료 직전 상태(현재 곡/위치/볼륨/반복/재생목록 등)를 session.json 에 저장하고 시작할 때 복원
+
+    save() 는 상태 dict 를 받아 작업 스레드에서 임시 파일에 쓴 뒤 이름을 바꾸므로
+    GUI 를 막지 않고, 쓰는 도중에 종료돼도 이전 스냅샷이 깨지지 않는다.
+    여러 번 연달아 호출되면 가장 마지막 상태만 기록한다.
+    """
+
+    def __init__(self, data_dir):
+        self.path = os.path.join(data_dir, "session.json")
+        self.lock = threading.Lock()
+        self.pending = None
+        self.writing = False
+        os.makedirs(data_dir, exist_ok=True)
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) and state.get("version") == SESSION_VERSION else {}
+
+    def save(self, state):
+        with self.lock:
+            self.pending = dict(state, version=SESSION_VERSION)
+            if self.writing:
+                return  # 쓰고 있는 스레드가 끝난 뒤 새 상태를 이어서 기록
+            self.writing = True
+        threading.Thread(target=self._write_pending, daemon=True).start()
+
+    def _write_pending(self):
+        while True:
+            with self.lock:
+                state, self.pending = self.pending, None
+                if state is None:
+                    self.writing = False
+                    return
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(state, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                pass
+
+    def flush(self, state):
+        """종료 시: 진행 중인 기록을 기다린 뒤 마지막 상태를 바로 기록"""
+        with self.lock:
+            self.pending = dict(state, version=SESSION_VERSION)
+            busy = self.writing
+            self.writing = True
+        if busy:
+            # 작업 스레드가 pending 을 이어서 기록하고 끝낼 때까지 대기
+            while True:
+                with self.lock:
+                    if not self.writing:
+                        return
+                time.sleep(0.01)
+        self._write_pending()
@@ -0,0 +1,178 @@
+import random
+from collections import deque
+
+
+class ShuffleEngine:
+    """지연 Fisher-Yates 순열 기반 무작위 재생 순서 관리
+
+    pool[:drawn] 은 이번 회차에 이미 뽑힌 곡, pool[drawn:] 은 아직 남은 곡이다.
+    다음 곡은 남은 구간에서 하나를 골라 drawn 위치로 교환하므로 next/prev 가 O(1) 이다.
+    """
+
+    def __init__(self, recent_artist_window=5, weighted=False, max_attempts=8):
+        self.pool = []
+        self.positions = {}  # 곡 키 -> pool 내 위치
+        self.artists = {}  # 곡 키 -> 아티스트 (가중 모드용)
+        self.drawn = 0
+        self.history = []  # 재생 기록 스택
+        self.cursor = -1  # history 내 현재 위치 (이전 곡 이동 후 다시 앞으로 갈 때 사용)
+        self.peeked = None  # peek() 로 뽑아 기록 끝에 넣었지만 아직 재생하지 않은 곡
+        self.weighted = weighted
+        self.max_attempts = max_attempts
+        self.recent_artists = deque(maxlen=recent_artist_window)
+
+    def __len__(self):
+        return len(self.pool)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def reset(self, keys, artists=None):
+        """곡 목록 전체를 새로 설정"""
+        self.pool = []
+        self.positions = {}
+        self.artists = {}
+        self.drawn = 0
+        self.history = []
+        self.cursor = -1
+        self.peeked = None
+        self.recent_artists.clear()
+        for i, key in enumerate(keys):
+            artist = artists[i] if artists else None
+            self.add(key, artist)
+
+    def add(self, key, artist=None):
+        """곡 추가: 남은 구간 끝에 붙이므로 이번 회차에 바로 등장할 수 있음"""
+        if key in self.positions:
+            return
+        self.positions[key] = len(self.pool)
+        self.pool.append(key)
+        if artist is not None:
+            self.artists[key] = artist
+
+    def remove(self, key):
+        """곡 삭제: 마지막 원소와 교환 후 pop 하여 O(1) 로 처리"""
+        pos = self.positions.get(key)
+        if pos is None:
+            return
+        if key == self.peeked:
+            self.peeked = None
+        if pos < self.drawn:
+            # 이미 뽑힌 구간이면 뽑힌 구간의 마지막 칸으로 먼저 옮겨 경계를 유지
+            self._swap(pos, self.drawn - 1)
+            pos = self.drawn - 1
+            self.drawn -= 1
+        self._swap(pos, len(self.pool) - 1)
+        self.pool.pop()
+        del self.positions[key]
+        self.artists.pop(key, None)
+        if key in self.history:
+            # 삭제는 드문 작업이므로 기록 정리는 선형 처리
+            before = self.history[:self.cursor + 1].count(key)
+            self.history = [k for k in self.history if k != key]
+            self.cursor = max(-1, self.cursor - before)
+
+    def current(self):
+        if 0 <= self.cursor < len(self.history):
+            return self.history[self.cursor]
+        return None
+
+    def start_from(self, key):
+        """사용자가 직접 선택한 곡을 현재 곡으로 기록"""
+        if key not in self.positions:
+            return
+        self._release_peek(keep=key)
+        pos = self.positions[key]
+        if pos >= self.drawn:
+            self._swap(pos, self.drawn)
+            self.drawn += 1
+        self._push_history(key)
+
+    def next(self):
+        """다음 무작위 곡 반환. 기록 중간이면 기록을 따라 앞으로 이동"""
+        if not self.pool:
+            return None
+        if self.cursor < len(self.history) - 1:
+            self.cursor += 1
+            if self.cursor == len(self.history) - 1:
+                self.peeked = None  # 미리 정해 둔 곡을 실제로 재생
+            return self.history[self.cursor]
+        if self.drawn >= len(self.pool):
+            self._new_round()
+        key = self._draw()
+        self._push_history(key)
+        return key
+
+    def peek(self):
+        """next() 가 돌려줄 곡을 미리 정해 반환 (현재 위치는 그대로)"""
+        if not self.pool:
+            return None
+        if self.cursor < len(self.history) - 1:
+            return self.history[self.cursor + 1]
+        if self.drawn >= len(self.pool):
+            self._new_round()
+        key = self._draw()
+        # 기록 끝에 넣어 두면 next() 가 기록을 따라 이 곡으로 이동
+        self.history.append(key)
+        self.peeked = key
+        artist = self.artists.get(key)
+        if artist is not None:
+            self.recent_artists.append(artist)
+        return key
+
+    def prev(self):
+        """기록 스택에서 이전 곡 반환"""
+        if self.cursor > 0:
+            self.cursor -= 1
+            return self.history[self.cursor]
+        return None
+
+    def _release_peek(self, keep=None):
+        """다른 곡을 직접 고르면 미리 뽑아 둔 곡을 기록에서 빼고 이번 회차의 남은 곡으로 되돌림"""
+        key, self.peeked = self.peeked, None
+        if key is None or key == keep:
+            return
+        if len(self.history) - 1 > self.cursor and self.history[-1] == key:
+            self.history.pop()
+        pos = self.positions.get(key)
+        if pos is not None and pos < self.drawn:
+            self._swap(pos, self.drawn - 1)
+            self.drawn -= 1
+
+    def _new_round(self):
+        # 한 회차를 모두 재생하면 새 회차 시작. 직전 곡이 바로 반복되지 않도록 뽑힌 상태로 둠
+        last = self.current()
+        self.drawn = 0
+        if last is not None and len(self.pool) > 1:
+            self._swap(self.positions[last], 0)
+            self.drawn = 1
+
+    def _draw(self):
+        remaining = len(self.pool) - self.drawn
+        j = self.drawn + random.randrange(remaining)
+        if self.weighted and self.recent_artists and remaining > 1:
+            # 최근 아티스트와 겹치지 않는 후보를 제한된 횟수 내에서 탐색 (O(1) 유지)
+            for _ in range(self.max_attempts):
+                if self.artists.get(self.pool[j]) not in self.recent_artists:
+                    break
+                j = self.drawn + random.randrange(remaining)
+        self._swap(j, self.drawn)
+        key = self.pool[self.drawn]
+        self.drawn += 1
+        return key
+
+    def _push_history(self, key):
+        del self.history[self.cursor + 1:]
+        self.history.append(key)
+        self.cursor = len(self.history) - 1
+        artist = self.artists.get(key)
+        if artist is not None:
+            self.recent_artists.append(artist)
+
+    def _swap(self, i, j):
+        if i == j:
+            return
+        a, b = self.pool[i], self.pool[j]
+        self.pool[i], self.pool[j] = b, a
+        self.positions[b] = i
+        self.positions[a] = j
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import getpass
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+SERVER_NAME = f"mp3player-{getpass.getuser()}"
+COMMANDS = ("open", "enqueue", "play", "pause", "next", "prev", "stop")
+
+
+def send_command(message, timeout=2000):
+    """실행 중인 플레이어에 JSON 명령 전송. 응답(dict) 반환, 실행 중인 인스턴스가 없으면 None
+
+    연결은 됐지만 시간 안에 응답이 없으면 (멈췄거나 바쁜 인스턴스) {"ok": False, "error": "timeout"}.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(SERVER_NAME)
+    if not socket.waitForConnected(timeout):
+        return None
+    socket.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+    socket.waitForBytesWritten(timeout)
+    reply = {"ok": False, "error": "timeout"}
+    if socket.waitForReadyRead(timeout):
+        try:
+            reply = json.loads(bytes(socket.readLine()).decode("utf-8"))
+        except ValueError:
+            reply = {"ok": False, "error": "invalid reply"}
+    socket.disconnectFromServer()
+    return reply
+
+
+def message_error(message):
+    """명령 메시지 검사: 잘못됐으면 오류 문자열, 올바르면 None"""
+    if not isinstance(message, dict):
+        return "message must be an object"
+    if message.get("command") not in COMMANDS + ("raise",):
+        return f"unknown command: {message.get('command')}"
+    files = message.get("files", [])
+    if not isinstance(files, list) or not all(isinstance(f, str) for f in files):
+        return "files must be a list of paths"
+    return None
+
+
+def command_from_args(args):
+    """명령행 인자를 명령으로 변환
+
+    player2.py a.mp3 b.mp3        -> open (첫 곡 재생)
+    player2.py --enqueue a.mp3    -> enqueue
+    player2.py --command next     -> play/pause/next/prev/stop
+    """
+    if not args:
+        return None
+    if args[0] == "--command":
+        return {"command": args[1] if len(args) > 1 else None}
+    if args[0] == "--enqueue":
+        return {"command": "enqueue", "files": [os.path.abspath(f) for f in args[1:]]}
+    files = [os.path.abspath(f) for f in args if not f.startswith("--")]
+    return {"command": "open", "files": files} if files else None
+
+
+def forward_to_running_instance(args):
+    """실행 중인 인스턴스가 있으면 인자를 넘기고 종료 코드 반환 (새 창을 만들지 않음), 없으면 None
+
+    잘못된 명령은 실행 중인 인스턴스가 없어도 오류를 출력하고 2 를 반환한다.
+    """
+    message = command_from_args([arg for arg in args if arg != "--new-instance"]) or {"command": "raise"}
+    error = message_error(message)
+    if error:
+        print(f"{error} (expected one of: {', '.join(COMMANDS)})", file=sys.stderr)
+        return 2
+    if "--new-instance" in args:
+        return None
+    reply = send_command(message)
+    if reply is None:
+        return None
+    if reply.get("error") == "timeout":
+        print("MP3 Player is running but did not respond. Try again, or start with --new-instance.",
+              file=sys.stderr)
+        return 1
+    if not reply.get("ok"):
+        print(f"MP3 Player rejected the command: {reply.get('error')}", file=sys.stderr)
+        return 1
+    return 0
+
+
+class InstanceServer(QObject):
+    """단일 인스턴스용 로컬 소켓 서버. 줄 단위 JSON 명령을 받아 command_received 시그널로 전달"""
+
+    command_received = pyqtSignal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._accept)
+
+    def listen(self):
+        if not self.server.listen(SERVER_NAME):
+            probe = QLocalSocket()
+            probe.connectToServer(SERVER_NAME)
+            if probe.waitForConnected(100):
+                # --new-instance 로 띄운 경우: 기존 인스턴스가 계속 명령을 받음
+                probe.disconnectFromServer()
+                return False
+            # 비정상 종료로 남은 소켓 파일 제거 후 재시도
+            QLocalServer.removeServer(SERVER_NAME)
+            return self.server.listen(SERVER_NAME)
+        return True
+
+    def close(self):
+        self.server.close()
+
+    def _accept(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda s=socket: self._read(s))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def _read(self, socket):
+        while socket.canReadLine():
+            line = bytes(socket.readLine()).decode("utf-8", "replace").strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+                error = message_error(message)
+            except ValueError as e:
+                error = str(e)
+            if error:
+                socket.write((json.dumps({"ok": False, "error": error}) + "\n").encode("utf-8"))
+                continue
+            # 응답을 먼저 보내고 명령은 이벤트 루프에서 처리 (클라이언트는 즉시 반환)
+            socket.write(b'{"ok": true}\n')
+            socket.flush()
+            QTimer.singleShot(0, lambda m=message: self.command_received.emit(m))
+
+
+if __name__ == '__main__':
+    # 스크립트용: python single_instance.py pause / python single_instance.py enqueue a.mp3
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(f"usage: {sys.argv[0]} {{{'|'.join(COMMANDS)}}} [files...]")
+        sys.exit(2)
+    message = {"command": sys.argv[1]}
+    if sys.argv[2:]:
+        message["files"] = [os.path.abspath(f) for f in sys.argv[2:]]
+    reply = send_command(message)
+    if reply is None:
+        print("MP3 Player is not running.")
+        sys.exit(1)
+    print(json.dumps(reply))
+    if not reply.get("ok"):
+        sys.exit(1)
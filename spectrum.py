@@ -0,0 +1,120 @@
+import time
+import threading
+import numpy as np
+
+
+class SpectrumAnalyzer:
+    """재생 위치 주변의 PCM 을 링 버퍼에 보관하고 FFT 로 밴드별 에너지(0~1)를 계산
+
+    feed() 는 재생 스레드(SpectrumTap), levels() 는 GUI 스레드에서 호출된다.
+    샘플은 절대 샘플 번호로 관리되므로 재생 시각(초)으로 바로 창을 잘라낼 수 있다.
+    """
+
+    def __init__(self, sample_rate=22050, bands=12, fft_size=1024, capacity_seconds=20,
+                 min_freq=40.0, max_freq=11000.0, floor_db=-70.0):
+        self.sample_rate = sample_rate
+        self.bands = bands
+        self.fft_size = fft_size
+        self.floor_db = floor_db
+        self.capacity = int(capacity_seconds * sample_rate)
+        self.ring = np.zeros(self.capacity, dtype=np.float32)
+        self.start = 0  # 링 버퍼에 남아 있는 첫 샘플 번호
+        self.end = 0  # 마지막으로 기록된 샘플 다음 번호
+        self.lock = threading.Lock()
+        self.window = np.hanning(fft_size).astype(np.float32)
+        # 로그 간격 밴드 경계 -> FFT 빈 번호. reduceat 으로 밴드 합을 한 번에 계산
+        freqs = np.geomspace(min_freq, min(max_freq, sample_rate / 2), bands + 1)
+        edges = np.clip(np.round(freqs * fft_size / sample_rate).astype(np.int64), 1, fft_size // 2)
+        edges = np.maximum(edges, np.arange(len(edges)) + 1)  # 저역 밴드가 빈 하나씩은 갖도록
+        self.edges = edges[:-1]
+        # 전체 스케일 사인파의 빈 전력으로 정규화 (창 함수 이득 포함)
+        self.reference = float((self.window.sum() / 2) ** 2)
+
+    def reset(self, position=0.0):
+        with self.lock:
+            self.start = self.end = int(round(position * self.sample_rate))
+
+    def feed(self, samples, position=None):
+        """모노 float32 샘플(-1~1)을 이어서 기록. position(초)이 지금까지 기록한 끝과 다르면 그 위치부터 새로 시작"""
+        n = len(samples)
+        with self.lock:
+            if position is not None:
+                index = int(round(position * self.sample_rate))
+                if index != self.end:
+                    self.start = self.end = index  # 탐색/곡 변경 또는 중간에 끊겼던 경우
+            if n > self.capacity:
+                samples = samples[-self.capacity:]
+                self.end += n - self.capacity
+                n = self.capacity
+            offset = self.end % self.capacity
+            first = min(n, self.capacity - offset)
+            self.ring[offset:offset + first] = samples[:first]
+            self.ring[:n - first] = samples[first:]
+            self.end += n
+            self.start = max(self.start, self.end - self.capacity)
+
+    def levels(self, position):
+        """position(초) 직전 fft_size 샘플의 밴드 에너지. 버퍼에 없으면 None"""
+        end = int(position * self.sample_rate)
+        begin = end - self.fft_size
+        with self.lock:
+            if begin < self.start or end > self.end:
+                return None
+            frame = self.ring[np.arange(begin, end) % self.capacity]
+        spectrum = np.fft.rfft(frame * self.window)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        band_power = np.add.reduceat(power, self.edges)[:self.bands]
+        db = 10 * np.log10(band_power / self.reference + 1e-12)
+        return np.clip(1 - db / self.floor_db, 0.0, 1.0)
+
+
+class SpectrumTap:
+    """PcmPlayer.tap 으로 등록: DSP(EQ/속도)를 거친 재생 블록을 분석기 샘플레이트로 줄여 SpectrumAnalyzer 에 공급
+
+    따로 디코딩하지 않으므로 미리 읽기 캐시/받는 중인 곡도 그대로 쓰고, 들리는 소리를 분석한다.
+    블록은 원본 기준 구간(media_time, media_length)에 맞춰 늘이거나 줄이므로 속도를 바꿔도
+    재생 위치(position())로 바로 창을 잘라낼 수 있다.
+    """
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+
+    def __call__(self, mono, media_time, media_length):
+        rate = self.analyzer.sample_rate
+        first = int(round(media_time * rate))
+        count = int(round((media_time + media_length) * rate)) - first
+        if count <= 0 or not len(mono):
+            return
+        samples = np.interp(np.linspace(0, len(mono) - 1, count), np.arange(len(mono)), mono)
+        self.analyzer.feed(samples.astype(np.float32), first / rate)
+
+
+def _run_benchmark(frames=3000):
+    """GUI 타이머 한 번(30 fps 기준 한 프레임)에 드는 분석 비용 측정"""
+    analyzer = SpectrumAnalyzer()
+    rate = analyzer.sample_rate
+    t = np.arange(rate * 10) / rate
+    signal = (0.5 * np.sin(2 * np.pi * 440 * t) + 0.1 * np.random.randn(len(t))).astype(np.float32)
+    for offset in range(0, len(signal), rate // 4):
+        analyzer.feed(signal[offset:offset + rate // 4])
+    start = time.perf_counter()
+    for i in range(frames):
+        analyzer.levels(1.0 + (i % 240) / 30)
+    elapsed = time.perf_counter() - start
+    per_frame = elapsed / frames
+    print(f"levels(): {per_frame * 1e6:.1f} us/frame, {per_frame * 30 * 100:.2f}% of one core at 30 fps")
+
+    # 재생 스레드 쪽 비용: 44.1kHz 8192 프레임 블록을 탭으로 공급
+    tap = SpectrumTap(analyzer)
+    block_frames, output_rate = 8192, 44100
+    mono = np.resize(signal, block_frames)
+    start = time.perf_counter()
+    for i in range(400):
+        tap(mono, i * block_frames / output_rate, block_frames / output_rate)
+    elapsed = time.perf_counter() - start
+    audio_seconds = 400 * block_frames / output_rate
+    print(f"tap: {audio_seconds / elapsed:.0f}x real time ({elapsed / audio_seconds * 100:.3f}% of one core)")
+
+
+if __name__ == '__main__':
+    _run_benchmark()
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from analysis import (ANALYSIS_RATE, PITCH_NAMES, SYNTHETIC_CASES, _synthetic_signal, analyze_samples, camelot,
+                      chroma, estimate_bpm, estimate_key, find_trim, onset_envelope)
+
+
+@pytest.mark.parametrize("bpm, tonic, minor", SYNTHETIC_CASES)
+def test_synthetic_tempo_and_key(bpm, tonic, minor):
+    signal = _synthetic_signal(bpm, tonic, minor)
+    assert abs(estimate_bpm(onset_envelope(signal)) - bpm) <= 1.5
+    assert estimate_key(chroma(signal)) == PITCH_NAMES[tonic] + ("m" if minor else "")
+
+
+def test_short_or_silent_input():
+    assert estimate_bpm(np.zeros(10)) == 0.0
+    assert estimate_key(np.zeros(12)) is None
+    result = analyze_samples(np.zeros(ANALYSIS_RATE // 10, dtype=np.float32))
+    assert (result["bpm"], result["key"]) == (0.0, None)
+
+
+@pytest.mark.parametrize("key, code", [("C", "8B"), ("Am", "8A"), ("G", "9B"), ("Ebm", "2A"), ("X", None)])
+def test_camelot(key, code):
+    assert camelot(key) == code
+
+
+def padded_signal(lead=3, tail=5):
+    signal = _synthetic_signal(*SYNTHETIC_CASES[0])
+    noise = (np.random.default_rng(0).standard_normal(tail * ANALYSIS_RATE) * 0.002).astype(np.float32)
+    return np.concatenate([np.zeros(lead * ANALYSIS_RATE, np.float32), signal, noise])
+
+
+def test_find_trim_skips_leading_silence_and_trailing_noise():
+    start, end = find_trim(padded_signal())
+    assert 2.7 <= start <= 3.0
+    assert 63.0 <= end <= 63.5
+    result = analyze_samples(padded_signal())
+    assert (result["trim_start"], result["trim_end"]) == (start, end)
+
+
+def test_find_trim_keeps_short_gaps_and_silent_tracks():
+    signal = _synthetic_signal(*SYNTHETIC_CASES[1], seconds=10)
+    gap = np.zeros(int(0.2 * ANALYSIS_RATE), np.float32)
+    assert find_trim(np.concatenate([gap, signal, gap])) == (0.0, 0.0)
+    assert find_trim(np.zeros(5 * ANALYSIS_RATE, np.float32)) == (0.0, 0.0)
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import signal
+import pytest
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame
+import audio_engine
+from audio_engine import RemotePlayer
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, "SIGSTOP"), reason="엔진을 SIGSTOP 으로 멈춰 확인")
+
+
+@pytest.fixture
+def player():
+    player = RemotePlayer(None, reply_timeout=0.2)
+    yield player
+    player.close()
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_engine_does_not_import_the_gui_main_module(player):
+    # 엔진은 python -m audio_engine_main 으로 실행되고 GUI 의 __main__ 은 그대로
+    assert sys.modules["__main__"].__name__ == "__main__"
+    assert player.process.args[1:] == ["-m", "audio_engine_main"]
+    assert player._request("describe_readahead") == "off"
+
+
+def test_reply_timeout_keeps_engine_and_drops_late_reply(player):
+    os.kill(player.process.pid, signal.SIGSTOP)
+    try:
+        with pytest.raises(pygame.error, match="not responding"):
+            player._request("describe_readahead")
+        assert player.process.poll() is None
+    finally:
+        os.kill(player.process.pid, signal.SIGCONT)
+    player.readahead = player.create_readahead(1024 * 1024)
+    # 시간 초과된 요청의 응답("off")이 먼저 도착해도 이번 요청의 응답을 받음
+    assert player._request("describe_readahead") != "off"
+
+
+def test_stalled_engine_is_killed_and_restarted_without_blocking(player, monkeypatch):
+    monkeypatch.setattr(audio_engine, "STALL_TIMEOUT", 0.2)
+    stalled = player.process
+    assert player.alive()
+    os.kill(stalled.pid, signal.SIGSTOP)
+    wait_for(lambda: not player.alive())
+    assert stalled.wait(5) == -signal.SIGKILL
+
+    player.load("/music/missing.mp3")
+    started = time.monotonic()
+    player.play()
+    assert time.monotonic() - started < 0.1  # 엔진은 작업 스레드에서 다시 띄움
+    assert player.get_busy()
+    wait_for(lambda: player.process is not stalled and not player.starting)
+    assert player._request("describe_readahead") == "off"
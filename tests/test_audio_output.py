@@ -0,0 +1,55 @@
+import os
+import numpy as np
+import pytest
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame
+from audio_output import MIXER_SETTINGS, PcmPlayer
+
+
+class EmptyDecoder:
+    """ffmpeg 가 아무것도 디코딩하지 못하고 끝난 경우와 같은 디코더"""
+
+    def __init__(self, error=None):
+        self.exit_error = error
+        self.closed = False
+
+    def read(self, frames):
+        return np.zeros((0, 2), dtype=np.int16)
+
+    def error(self):
+        return self.exit_error
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def player():
+    pygame.mixer.init(**MIXER_SETTINGS)
+    player = PcmPlayer(None)
+    yield player
+    player.close()
+    pygame.mixer.quit()
+
+
+def run(player, decoder, path="/music/broken.mp3", end=None):
+    errors = []
+    player.on_error = errors.append
+    player.finished = False
+    player._run(decoder, path, 0.0, player.generation, end)
+    return errors
+
+
+def test_undecodable_file_is_reported_not_finished(player):
+    errors = run(player, EmptyDecoder("ffmpeg exited with code 183"))
+    assert not player.get_busy()
+    assert player.error == "broken.mp3: no audio could be decoded (ffmpeg exited with code 183)"
+    assert errors == [player.error]
+
+
+def test_stop_clears_the_error(player):
+    run(player, EmptyDecoder())
+    assert player.error == "broken.mp3: no audio could be decoded"
+    player.stop()
+    assert player.error is None
@@ -0,0 +1,45 @@
+import os
+import pytest
+
+pytest.importorskip("PyQt5")
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt5.QtGui import QColor, QImage
+from covers import ThumbnailCache, downscale_image, extract_embedded_art
+from downloader import write_tags
+
+
+def make_image(width, height, color="red"):
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor(color))
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(data)
+
+
+def test_extract_embedded_art(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"")
+    assert extract_embedded_art(str(path)) is None
+    art = make_image(8, 8)
+    write_tags(str(path), "Song", "Artist", image_data=art)
+    assert extract_embedded_art(str(path)) == art
+
+
+def test_same_art_is_stored_once(tmp_path):
+    cache = ThumbnailCache(str(tmp_path), size=150)
+    art = make_image(600, 300)
+    key = cache.store(art)
+    assert cache.store(art) == key
+    assert cache.store(make_image(600, 300, "blue")) != key
+    assert len(os.listdir(tmp_path)) == 2
+    stored = QImage(cache.path_for(key))
+    assert (stored.width(), stored.height()) == (150, 75)
+
+
+def test_invalid_image_data_is_not_cached(tmp_path):
+    cache = ThumbnailCache(str(tmp_path))
+    assert cache.store(b"not an image") is None
+    assert not cache.contains(None)
+    assert downscale_image(b"not an image") is None
@@ -0,0 +1,161 @@
+import os
+import time
+import threading
+import downloader
+import pytest
+from downloader import (BulkImporter, DownloadArchive, StreamingDownload, download_video, file_video_id,
+                        tag_downloaded_file, video_id_from_url, write_tags)
+
+
+def test_archive_persists_in_yt_dlp_format(tmp_path):
+    path = str(tmp_path / "data" / "archive.txt")
+    archive = DownloadArchive(path)
+    archive.add("dQw4w9WgXcQ")
+    archive.add("dQw4w9WgXcQ")
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "youtube dQw4w9WgXcQ\n"
+    assert "dQw4w9WgXcQ" in DownloadArchive(path)
+
+
+def test_bulk_import_skips_archived_and_in_flight_videos(tmp_path, monkeypatch):
+    entries = [("aaaaaaaaaaa", "A"), ("bbbbbbbbbbb", "B"), ("ccccccccccc", "C"), ("ddddddddddd", "D")]
+    monkeypatch.setattr(downloader, "iter_playlist_entries", lambda url: iter(entries))
+    archive = DownloadArchive(str(tmp_path / "archive.txt"))
+    archive.add("aaaaaaaaaaa")
+    results = {"bbbbbbbbbbb": True, "ccccccccccc": None, "ddddddddddd": False}
+    requested = []
+
+    def download(video_url, video_id, title, thumbnail_url):
+        requested.append(video_id)
+        assert video_url.endswith(video_id)
+        return results[video_id]
+
+    finished = []
+    BulkImporter(archive, download, max_workers=2, on_finished=lambda *args: finished.append(args)).run("url")
+    assert sorted(requested) == ["bbbbbbbbbbb", "ccccccccccc", "ddddddddddd"]
+    assert finished == [({"downloaded": 1, "skipped": 2, "failed": 1}, None)]
+    assert "bbbbbbbbbbb" in archive and "ddddddddddd" not in archive
+
+
+def test_bulk_import_reports_listing_errors(tmp_path, monkeypatch):
+    def entries(url):
+        yield "aaaaaaaaaaa", "A"
+        raise RuntimeError("playlist unavailable")
+
+    monkeypatch.setattr(downloader, "iter_playlist_entries", entries)
+    finished = []
+    BulkImporter(DownloadArchive(str(tmp_path / "archive.txt")), lambda *args: True,
+                 on_finished=lambda *args: finished.append(args)).run("url")
+    counts, error = finished[0]
+    assert counts["downloaded"] == 1 and str(error) == "playlist unavailable"
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123",
+    "https://youtu.be/dQw4w9WgXcQ?t=10",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+])
+def test_video_id_from_url(url):
+    assert video_id_from_url(url) == "dQw4w9WgXcQ"
+
+
+def test_video_id_from_url_without_id():
+    assert video_id_from_url("https://www.youtube.com/@channel") is None
+    assert video_id_from_url(None) is None
+
+
+def test_download_video_reuses_tagged_file_and_keeps_other_titles(tmp_path, monkeypatch):
+    existing = tmp_path / "Song.mp3"
+    existing.write_bytes(b"")
+    write_tags(str(existing), "Song", "Artist", video_id="aaaaaaaaaaa")
+    downloads = []
+
+    def fake_download(video_url, sanitized_title, download_dir, ffmpeg_path):
+        downloads.append(sanitized_title)
+        path = os.path.join(download_dir, f"{sanitized_title}.mp3")
+        open(path, "wb").close()
+        return path
+
+    monkeypatch.setattr(downloader, "download_audio", fake_download)
+    args = ("Song", "Song", "Artist", None, str(tmp_path), "")
+    assert download_video("https://youtu.be/aaaaaaaaaaa", *args) == str(existing)
+    assert downloads == []
+    # 제목이 같은 다른 영상은 영상 ID 를 붙인 새 파일로 받음
+    other = download_video("https://youtu.be/bbbbbbbbbbb", *args)
+    assert downloads == ["Song (bbbbbbbbbbb)"]
+    assert file_video_id(other) == "bbbbbbbbbbb" and file_video_id(str(existing)) == "aaaaaaaaaaa"
+
+
+def test_write_tags_replaces_frames(tmp_path):
+    from mutagen.id3 import ID3
+    path = str(tmp_path / "song.mp3")
+    open(path, "wb").close()
+    write_tags(path, "Old", "Old Artist", image_data=b"old", video_id="aaaaaaaaaaa")
+    write_tags(path, "Song", "Artist", image_data=b"new", video_id="aaaaaaaaaaa")
+    tags = ID3(path)
+    assert (str(tags["TIT2"]), str(tags["TPE1"])) == ("Song", "Artist")
+    assert [frame.data for frame in tags.getall("APIC")] == [b"new"]
+    assert file_video_id(path) == "aaaaaaaaaaa"
+
+
+def test_tag_downloaded_file_scales_art_and_survives_missing_thumbnail(tmp_path):
+    from mutagen.id3 import ID3
+    thumbnail = tmp_path / "thumb.jpg"
+    thumbnail.write_bytes(b"big image")
+    path = str(tmp_path / "song.mp3")
+    open(path, "wb").close()
+    assert tag_downloaded_file(path, "Song", "Artist", thumbnail.as_uri(), scale_image=lambda data: data[:3])
+    assert ID3(path).getall("APIC")[0].data == b"big"
+    assert tag_downloaded_file(path, "Song 2", "Artist", (tmp_path / "missing.jpg").as_uri())
+    assert str(ID3(path)["TIT2"]) == "Song 2"
+    assert not tag_downloaded_file(str(tmp_path / "missing.mp3"), "Song", "Artist")
+
+
+def test_growing_file_reader_follows_the_download(tmp_path):
+    stream = StreamingDownload("url", "song", str(tmp_path), None)
+    reader = stream.open_reader()
+    chunks = [bytes([i]) * 1000 for i in range(5)]
+
+    def write():
+        time.sleep(0.1)  # 리더는 파일이 생길 때까지 기다림
+        stream.source_path = str(tmp_path / "song.stream.webm")
+        with open(stream.source_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                f.flush()
+                time.sleep(0.05)
+        stream.done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    received = b""
+    while True:
+        data = reader.read(700)
+        if not data:
+            break
+        received += data
+    writer.join()
+    assert received == b"".join(chunks)
+    reader.close()
+
+
+def test_close_wakes_a_waiting_reader_and_source_is_removed_after_last_reader(tmp_path):
+    stream = StreamingDownload("url", "song", str(tmp_path), None)
+    reader = stream.open_reader()
+    result = []
+    waiting = threading.Thread(target=lambda: result.append(reader.read(100)))
+    waiting.start()
+    time.sleep(0.1)
+    reader.close()
+    waiting.join(1)
+    assert result == [b""]
+
+    stream.source_path = str(tmp_path / "song.stream.webm")
+    open(stream.source_path, "wb").close()
+    second = stream.open_reader()
+    stream.error = RuntimeError("download failed")
+    stream.done.set()
+    assert stream.finish() is None
+    assert os.path.exists(stream.source_path)  # 재생 중인 리더가 있으면 원본을 남겨 둠
+    second.close()
+    assert not os.path.exists(stream.source_path)
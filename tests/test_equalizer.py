@@ -0,0 +1,46 @@
+import numpy as np
+from equalizer import BAND_FREQUENCIES, Equalizer
+
+RATE = 48000
+
+
+def noise(seconds=1.0):
+    return np.random.default_rng(1).uniform(-0.5, 0.5, (int(seconds * RATE), 2)).astype(np.float32)
+
+
+def test_blocks_match_whole_signal_processing():
+    signal = noise()
+    whole, blocked = Equalizer(RATE), Equalizer(RATE)
+    whole.set_preset("Rock")
+    blocked.set_preset("Rock")
+    reference = whole.process(signal)
+    pieces = np.concatenate([blocked.process(signal[i:i + 1000]) for i in range(0, len(signal), 1000)])
+    assert np.abs(reference - pieces).max() < 1e-5
+
+
+def test_flat_gains_pass_through():
+    eq = Equalizer(RATE)
+    eq.set_preset("Rock")
+    eq.set_preset("Flat")
+    signal = noise(0.1)
+    assert eq.process(signal) is signal
+
+
+def test_band_cut_attenuates_its_frequency():
+    eq = Equalizer(RATE)
+    gains = [0.0] * len(BAND_FREQUENCIES)
+    gains[BAND_FREQUENCIES.index(1000)] = -6.0
+    eq.set_gains(gains)
+    t = np.arange(RATE) / RATE
+    sine = np.repeat((0.5 * np.sin(2 * np.pi * 1000 * t))[:, None], 2, axis=1).astype(np.float32)
+    out = eq.process(sine)[RATE // 2:]  # 필터가 안정된 뒤
+    assert abs(out.max() / 0.5 - 10 ** (-6 / 20)) < 0.05
+
+
+def test_reset_clears_filter_state():
+    eq = Equalizer(RATE)
+    eq.set_preset("Bass Boost")
+    eq.process(noise(0.1))
+    eq.reset()
+    silence = np.zeros((1000, 2), dtype=np.float32)
+    assert not eq.process(silence).any()
@@ -0,0 +1,40 @@
+import threading
+import pytest
+
+pytest.importorskip("PyQt5")
+from events import EventChannel
+
+
+def test_events_are_batched_by_kind_in_order():
+    channel = EventChannel()
+    received = []
+    channel.subscribe("downloaded", lambda payloads: received.append(("downloaded", payloads)))
+    channel.subscribe("notify", lambda payloads: received.append(("notify", payloads)))
+    threads = [threading.Thread(target=channel.post, args=("downloaded", i)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    channel.post("notify", "done")
+    channel.post("unsubscribed", None)
+    channel.flush()
+    assert [kind for kind, _ in received] == ["downloaded", "notify"]
+    assert sorted(received[0][1]) == [0, 1, 2] and received[1][1] == ["done"]
+    assert not channel.pending and not channel.scheduled
+
+
+def test_failing_handler_does_not_drop_other_kinds():
+    channel = EventChannel()
+    received = []
+
+    def broken(payloads):
+        raise ValueError("bad analysis result")
+
+    channel.subscribe("analyzed", broken)
+    channel.subscribe("downloaded", received.extend)
+    channel.subscribe("notify", received.extend)
+    channel.post("analyzed", {"bpm": None})
+    channel.post("downloaded", "a.mp3")
+    channel.post("notify", "Downloaded and added: a")
+    channel.flush()
+    assert received == ["a.mp3", "Downloaded and added: a"]
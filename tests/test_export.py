@@ -0,0 +1,72 @@
+import os
+import shutil
+import pytest
+from export import LibraryExporter, MANIFEST_NAME
+
+
+def fake_convert(exporter):
+    """ffmpeg 대신 원본을 그대로 복사하고 호출된 이름을 기록"""
+    calls = []
+
+    def convert(source, name):
+        calls.append(name)
+        shutil.copy(source, os.path.join(exporter.target_dir, name))
+        return True
+    exporter._convert = convert
+    return calls
+
+
+@pytest.fixture
+def sources(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"src{i}.mp3"
+        path.write_bytes(bytes([i]) * 1000)
+        paths.append(str(path))
+    return paths
+
+
+def export(target, tracks, **kwargs):
+    exporter = LibraryExporter(None, str(target), "mp3", max_workers=2, **kwargs)
+    calls = fake_convert(exporter)
+    return exporter, calls, exporter.run(tracks)
+
+
+def test_second_export_skips_unchanged_tracks(tmp_path, sources):
+    tracks = [{"path": path, "title": f"Song {i}", "artist": "A"} for i, path in enumerate(sources)]
+    _, calls, stats = export(tmp_path / "out", tracks)
+    assert sorted(calls) == ["A - Song 0.mp3", "A - Song 1.mp3", "A - Song 2.mp3"]
+    assert os.path.exists(tmp_path / "out" / MANIFEST_NAME)
+
+    os.utime(sources[0], (1, 1))  # 수정 시각만 바뀜 -> 해시로 확인
+    with open(sources[1], "ab") as f:
+        f.write(b"changed")
+    _, calls, stats = export(tmp_path / "out", tracks)
+    assert calls == ["A - Song 1.mp3"]
+    assert (stats["converted"], stats["skipped"]) == (1, 2)
+
+
+def test_same_name_from_a_different_source_is_converted_again(tmp_path, sources):
+    export(tmp_path / "out", [{"path": sources[0], "title": "Song", "artist": "A"}])
+    shutil.copy(sources[0], sources[1])  # 크기/내용까지 같은 다른 파일
+    _, calls, _ = export(tmp_path / "out", [{"path": sources[1], "title": "Song", "artist": "A"}])
+    assert calls == ["A - Song.mp3"]
+
+
+def test_duplicate_names_are_numbered():
+    exporter = LibraryExporter(None, "out", "opus")
+    names = [name for _, name in exporter._output_names(
+        [{"path": "/a/x.mp3", "title": "T", "artist": "A"}, {"path": "/b/x.mp3", "title": "t", "artist": "a"},
+         {"path": "/c/untitled.mp3"}])]
+    assert names == ["A - T.opus", "a - t (2).opus", "untitled.opus"]
+
+
+def test_cancelled_jobs_still_reach_the_total(tmp_path, sources):
+    progress = []
+    exporter = LibraryExporter(None, str(tmp_path / "out"), "mp3", max_workers=1,
+                               on_progress=lambda done, total, stats: progress.append((done, total)))
+    fake_convert(exporter)
+    exporter.cancel()
+    stats = exporter.run([{"path": path, "title": f"Song {i}"} for i, path in enumerate(sources)])
+    assert progress[-1] == (3, 3)
+    assert stats["cancelled"] == 3
@@ -0,0 +1,54 @@
+import time
+from history import PlayHistory
+
+
+def play(history, path, kind="finish", listened=180.0):
+    history.record("start", path)
+    history.record(kind, path, listened=listened)
+
+
+def test_aggregates(tmp_path):
+    history = PlayHistory(str(tmp_path))
+    for _ in range(3):
+        play(history, "a.mp3")
+    play(history, "b.mp3", "skip", listened=5)
+    play(history, "b.mp3", "skip", listened=7)
+    play(history, "b.mp3")
+    history.record("seek", "b.mp3", position=30)
+    play(history, "c.mp3")
+
+    assert history.most_played(2) == [(3, "a.mp3"), (1, "c.mp3")]
+    assert history.play_counts() == {"a.mp3": 3, "b.mp3": 1, "c.mp3": 1}
+    assert history.most_skipped(5) == [(2 / 3, "b.mp3")]
+    assert [path for _, path in history.recently_played(2)] == ["c.mp3", "b.mp3"]
+    stats = history.get("b.mp3")
+    assert (stats.starts, stats.finishes, stats.skips, stats.seeks) == (3, 1, 2, 1)
+    assert stats.listened == 192
+    today = time.strftime("%Y-%m-%d")
+    assert history.plays_between(today, today) == 7
+    history.close()
+
+
+def test_reload_applies_log_written_after_snapshot(tmp_path):
+    history = PlayHistory(str(tmp_path), snapshot_every=4)
+    play(history, "a.mp3")
+    play(history, "a.mp3")
+    history.flush()  # 집계 저장 (이벤트 4개)
+    play(history, "b.mp3", "skip", listened=3)
+    history.flush()  # 로그에만 추가
+    history.closing.set()
+
+    reloaded = PlayHistory(str(tmp_path))
+    assert reloaded.get("a.mp3").finishes == 2
+    assert reloaded.get("b.mp3").skips == 1
+    assert reloaded.get("b.mp3").listened == 3
+    reloaded.close()
+
+
+def test_close_does_not_wait_for_the_writer(tmp_path):
+    history = PlayHistory(str(tmp_path), flush_interval=5.0)
+    play(history, "a.mp3")
+    started = time.perf_counter()
+    history.close()
+    assert time.perf_counter() - started < 1.0
+    assert PlayHistory(str(tmp_path)).get("a.mp3").starts == 1
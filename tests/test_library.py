@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import pytest
+import library
+from library import LibraryLock, SongLibrary, QueryError, compile_query, is_query
+
+
+@pytest.fixture
+def lib(tmp_path):
+    lib = SongLibrary(str(tmp_path))
+    lib.add_track("/music/a.mp3", "Blueming", "IU", duration=217, bitrate=320, mtime=1)
+    lib.add_track("/music/b.mp3", "Palette", "IU", duration=180, bitrate=128, source="youtube", mtime=1)
+    lib.add_track("/music/c.mp3", "Dynamite", "BTS", duration=199, bitrate=320, mtime=1)
+    lib.add_track("/music/d.mp3", "Re:Zero Theme", "OST", duration=300, bitrate=256, mtime=1)
+    return lib
+
+
+def test_text_and_numeric_clauses_are_anded(lib):
+    assert lib.query("artist:iu bitrate:>=320") == ["/music/a.mp3"]
+    assert lib.query("duration:3:00..3:30") == ["/music/b.mp3", "/music/c.mp3"]
+
+
+def test_or_groups_and_negation(lib):
+    assert lib.query("artist:bts OR source:youtube") == ["/music/b.mp3", "/music/c.mp3"]
+    assert lib.query("-artist:iu bitrate:>200") == ["/music/c.mp3", "/music/d.mp3"]
+
+
+def test_exact_text_and_word_prefix(lib):
+    assert lib.query("artist:=iu") == ["/music/a.mp3", "/music/b.mp3"]
+    assert lib.query("title:dyn") == ["/music/c.mp3"]
+
+
+def test_index_lookup_agrees_with_track_matching(lib):
+    compiled = compile_query("artist:iu OR bitrate:<200 -title:blue")
+    ids = compiled.evaluate(lib)
+    assert ids == {i for i in lib.tracks if compiled.matches(lib.tracks[i])}
+
+
+def test_invalid_queries_raise_query_error():
+    for text in ("bitrate:fast", "color:red", 'title:"unclosed', "title:"):
+        with pytest.raises(QueryError):
+            compile_query(text)
+
+
+def test_is_query_needs_a_known_field():
+    assert is_query("artist:iu")
+    assert is_query("blue -source:youtube")
+    assert not is_query("re:zero")
+    assert not is_query("part 2: finale")
+    assert not is_query("12:30")
+
+
+def test_request_save_coalesces_into_one_write(lib, monkeypatch):
+    monkeypatch.setattr(library, "SAVE_DELAY", 0.05)
+    writes = []
+    save = lib.save
+    monkeypatch.setattr(lib, "save", lambda: (writes.append(1), save()))
+    for _ in range(5):
+        lib.request_save()
+    deadline = time.monotonic() + 2
+    while (lib.saving or not writes) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writes == [1]
+    reloaded = SongLibrary(lib.data_dir)
+    reloaded.load()
+    assert reloaded.query("artist:iu") == ["/music/a.mp3", "/music/b.mp3"]
+
+
+def test_library_lock_is_exclusive(tmp_path):
+    first, second = LibraryLock(str(tmp_path)), LibraryLock(str(tmp_path))
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_read_only_library_does_not_save(lib):
+    lib.read_only = True
+    lib.save()
+    assert not os.path.exists(lib.library_file)
+
+
+def test_indexed_query_on_100k_tracks(tmp_path, monkeypatch):
+    big = SongLibrary(str(tmp_path))
+    for i in range(100000):
+        big.add_track(f"/music/{i // 1000}/{i}.mp3", f"Title {i}", f"Artist {i % 2000}",
+                      duration=120 + i % 300, bitrate=(128, 192, 320)[i % 3], mtime=1)
+    compiled = compile_query("artist:=\"artist 7\" bitrate:>=320 duration:3:00..4:00")
+    reads = []
+    original = library.TrackView.__getitem__
+    monkeypatch.setattr(library.TrackView, "__getitem__", lambda view, column: (reads.append(1), original(view, column))[1])
+    started = time.perf_counter()
+    ids = compiled.evaluate(big)
+    elapsed = time.perf_counter() - started
+    assert len(reads) <= 50  # 색인 후보(아티스트 일치 50곡)만 확인하고 전체 곡을 훑지 않음
+    assert elapsed < 0.1
+    assert ids == {i for i in big.tracks if compiled.matches(big.tracks[i])}
+
+
+def test_corrupt_library_is_moved_aside_not_overwritten(lib):
+    lib.save()
+    with open(lib.library_file, encoding="utf-8") as f:
+        data = json.load(f)
+    data["columns"]["title"].pop()  # 마지막 행에서야 실패하므로 앞의 곡은 이미 들어간 상태
+    truncated = json.dumps(data)
+    with open(lib.library_file, "w", encoding="utf-8") as f:
+        f.write(truncated)
+    broken = SongLibrary(lib.data_dir)
+    broken.load()
+    assert broken.load_error and len(broken.tracks) == 0 and not broken.path_ids
+    backups = [name for name in os.listdir(lib.data_dir) if name.endswith(".bad")]
+    assert len(backups) == 1
+    with open(os.path.join(lib.data_dir, backups[0]), encoding="utf-8") as f:
+        assert f.read() == truncated
+    broken.save()  # 빈 라이브러리를 저장해도 원본은 보존됨
+    assert os.path.exists(os.path.join(lib.data_dir, backups[0]))
+
+
+def test_find_video_survives_reload_and_updates(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"")
+    lib = SongLibrary(str(tmp_path))
+    lib.add_track(str(path), "Song", "Artist", source="youtube", video_id="aaaaaaaaaaa")
+    lib.add_track(str(path), "Song (Live)", "Artist", source="youtube")  # 다시 추가해도 영상 ID 유지
+    lib.save()
+    reloaded = SongLibrary(str(tmp_path))
+    reloaded.load()
+    assert reloaded.find_video("aaaaaaaaaaa") == str(path)
+    path.unlink()
+    assert reloaded.find_video("aaaaaaaaaaa") is None
+    assert reloaded.find_video("bbbbbbbbbbb") is None
+
+
+@pytest.mark.slow
+def test_song_store_memory_target():
+    # 목표(곡당 200 바이트 미만, 50만 곡)는 색인을 뺀 SongStore 기준
+    assert library.measure_memory_overhead(500000) < 200
+
+
+def test_play_counts_follow_history(lib):
+    lib.record_play("/music/a.mp3")
+    lib.record_play("/music/c.mp3")
+    assert lib.set_play_counts({"/music/a.mp3": 3, "/music/b.mp3": 1, "/music/gone.mp3": 9}) == 3
+    assert [lib.get(p)["play_count"] for p in ("/music/a.mp3", "/music/b.mp3", "/music/c.mp3")] == [3, 1, 0]
+    assert lib.query("plays:>=1") == ["/music/a.mp3", "/music/b.mp3"]
+    assert lib.set_play_counts({"/music/a.mp3": 3, "/music/b.mp3": 1}) == 0
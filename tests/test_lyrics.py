@@ -0,0 +1,39 @@
+from lyrics import LyricsCache, load_lyrics, parse_lrc
+
+LRC = """[ti:Blueming]
+[offset:+500]
+[00:12.50]첫 줄
+[00:20.00][01:05.00]후렴
+[00:15.00]둘째 줄
+가사 태그 없는 줄
+"""
+
+
+def test_parse_lrc_sorts_repeats_and_applies_offset():
+    lyrics = parse_lrc(LRC)
+    assert lyrics.synced
+    assert lyrics.times == [12.0, 14.5, 19.5, 64.5]
+    assert lyrics.lines == ["첫 줄", "둘째 줄", "후렴", "후렴"]
+
+
+def test_line_index_follows_position():
+    lyrics = parse_lrc(LRC)
+    assert lyrics.line_index(0) == -1
+    assert lyrics.line_index(12.0) == 0
+    assert lyrics.line_index(19.0) == 1
+    assert lyrics.line_index(300) == 3
+
+
+def test_unsynced_text_has_no_times():
+    assert not parse_lrc("그냥 가사\n두 번째 줄").synced
+
+
+def test_sidecar_lrc_is_loaded_and_cached(tmp_path):
+    (tmp_path / "song.lrc").write_text("[00:01.00]안녕", encoding="cp949")
+    path = str(tmp_path / "song.mp3")
+    assert load_lyrics(path).lines == ["안녕"]
+    cache = LyricsCache()
+    results = []
+    cache._load_thread(path, lambda p, lyrics: results.append((p, lyrics.lines)))
+    assert results == [(path, ["안녕"])]
+    assert cache.get(path)[0]
@@ -0,0 +1,33 @@
+from play_queue import PlayQueue
+
+
+def test_add_and_play_next_order():
+    queue = PlayQueue()
+    queue.add(1)
+    queue.add(2)
+    queue.play_next(3)
+    assert list(queue) == [3, 1, 2]
+    assert [queue.pop(), queue.pop(), queue.pop(), queue.pop()] == [3, 1, 2, None]
+
+
+def test_pop_and_peek_skip_removed_tracks():
+    queue = PlayQueue([5, 6, 7])
+    valid = {6, 7}.__contains__
+    assert queue.peek(valid) == 6
+    assert len(queue) == 2  # 무효 항목은 peek 에서도 버림
+    assert queue.pop(valid) == 6
+    assert queue.peek() == 7
+    assert len(queue) == 1
+
+
+def test_remove_at_and_clear():
+    queue = PlayQueue([1, 2, 3, 4])
+    queue.remove_at([0, 2])
+    assert list(queue) == [2, 4]
+    queue.clear()
+    assert queue.pop() is None
+
+
+def test_restored_from_saved_ids():
+    saved = list(PlayQueue([9, 8, 7]))
+    assert list(PlayQueue(saved)) == [9, 8, 7]
@@ -0,0 +1,43 @@
+import time
+import threading
+from readahead import ReadAheadCache
+
+
+def test_get_without_timeout_does_not_wait_for_a_pending_read(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"x" * 100)
+    release = threading.Event()
+
+    def slow_read(p):
+        release.wait(5)
+        return open(p, "rb").read()
+
+    cache = ReadAheadCache(read_file=slow_read)
+    cache.prefetch([str(path)])
+    time.sleep(0.05)
+    started = time.perf_counter()
+    assert cache.get(str(path), timeout=0) is None
+    assert time.perf_counter() - started < 0.5
+    release.set()
+    assert cache.get(str(path), timeout=5) == b"x" * 100
+
+
+def wait_cached(cache, path):
+    deadline = time.monotonic() + 5
+    while path not in cache.entries and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_get_misses_when_the_file_changed_after_reading(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"old" * 100)
+    cache = ReadAheadCache()
+    cache.prefetch([str(path)])
+    wait_cached(cache, str(path))
+    assert cache.get(str(path), timeout=0) == b"old" * 100
+    path.write_bytes(b"tagged" * 100)  # tag_downloaded_file 처럼 같은 경로에 다시 씀
+    assert cache.get(str(path), timeout=0) is None
+    assert cache.used_bytes == 0
+    cache.prefetch([str(path)])
+    wait_cached(cache, str(path))
+    assert cache.get(str(path), timeout=0) == b"tagged" * 100
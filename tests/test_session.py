@@ -0,0 +1,52 @@
+import json
+import time
+from session import SESSION_VERSION, SessionStore
+
+STATE = {
+    "current_song": "/music/a.mp3",
+    "position": 83.25,
+    "playing": True,
+    "volume": 40,
+    "repeat_mode": "off",
+    "previous_repeat_mode": "all",
+    "shuffle": True,
+    "equalizer": [0.0] * 10,
+    "playlist": ["/music/a.mp3", "/music/b.mp3"],
+    "queue": [3, 1],
+}
+
+
+def wait_written(store):
+    deadline = time.monotonic() + 2
+    while store.writing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = SessionStore(str(tmp_path))
+    store.save(STATE)
+    wait_written(store)
+    assert SessionStore(str(tmp_path)).load() == dict(STATE, version=SESSION_VERSION)
+
+
+def test_last_saved_state_wins(tmp_path):
+    store = SessionStore(str(tmp_path))
+    for volume in range(50):
+        store.save(dict(STATE, volume=volume))
+    wait_written(store)
+    assert store.load()["volume"] == 49
+
+
+def test_flush_writes_synchronously(tmp_path):
+    store = SessionStore(str(tmp_path))
+    store.save(dict(STATE, shuffle=False))
+    store.flush(dict(STATE, shuffle=True))
+    assert store.load()["shuffle"] is True
+
+
+def test_unusable_files_are_ignored(tmp_path):
+    store = SessionStore(str(tmp_path))
+    (tmp_path / "session.json").write_text("{not json", encoding="utf-8")
+    assert store.load() == {}
+    (tmp_path / "session.json").write_text(json.dumps(dict(STATE, version=SESSION_VERSION + 1)), encoding="utf-8")
+    assert store.load() == {}
@@ -0,0 +1,75 @@
+import random
+from shuffle import ShuffleEngine
+
+
+def make_engine(count=10, **kwargs):
+    engine = ShuffleEngine(**kwargs)
+    engine.reset([f"song{i}" for i in range(count)], [f"artist{i % 3}" for i in range(count)])
+    return engine
+
+
+def test_round_plays_every_song_once():
+    random.seed(1)
+    engine = make_engine()
+    played = [engine.next() for _ in range(10)]
+    assert sorted(played) == sorted(engine.pool)
+
+
+def test_new_round_does_not_repeat_last_song():
+    random.seed(2)
+    engine = make_engine(5)
+    for _ in range(5):
+        last = engine.next()
+    assert engine.next() != last
+
+
+def test_prev_and_next_follow_history():
+    random.seed(3)
+    engine = make_engine()
+    first, second = engine.next(), engine.next()
+    assert engine.prev() == first
+    assert engine.next() == second
+
+
+def test_peek_is_what_next_returns():
+    random.seed(4)
+    engine = make_engine()
+    engine.next()
+    peeked = engine.peek()
+    assert engine.peek() == peeked
+    assert engine.next() == peeked
+    assert engine.peeked is None
+
+
+def test_unconsumed_peek_returns_to_pool():
+    random.seed(5)
+    engine = make_engine()
+    current = engine.next()
+    peeked = engine.peek()
+    other = next(key for key in engine.pool[engine.drawn:] if key != peeked)
+    engine.start_from(other)
+    assert engine.current() == other
+    rest = [engine.next() for _ in range(len(engine) - 2)]
+    assert peeked in rest
+    assert sorted(rest + [current, other]) == sorted(engine.pool)
+
+
+def test_start_from_peeked_song_keeps_it_drawn():
+    random.seed(6)
+    engine = make_engine()
+    engine.next()
+    peeked = engine.peek()
+    engine.start_from(peeked)
+    assert engine.current() == peeked
+    assert engine.history.count(peeked) == 1
+
+
+def test_remove_keeps_positions_consistent():
+    random.seed(7)
+    engine = make_engine()
+    for _ in range(4):
+        engine.next()
+    engine.remove(engine.current())
+    engine.remove("song9")
+    assert len(engine) == 8
+    assert all(engine.pool[pos] == key for key, pos in engine.positions.items())
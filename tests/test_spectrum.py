@@ -0,0 +1,36 @@
+import numpy as np
+from spectrum import SpectrumAnalyzer, SpectrumTap
+
+
+def tone(frequency, seconds, rate):
+    t = np.arange(int(seconds * rate)) / rate
+    return (0.5 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def test_tap_maps_player_blocks_onto_media_time():
+    analyzer = SpectrumAnalyzer()
+    tap = SpectrumTap(analyzer)
+    block = tone(440, 8192 / 44100, 44100)
+    for i in range(4):
+        tap(block, 10.0 + i * 8192 / 44100, 8192 / 44100)
+    assert analyzer.start == int(round(10.0 * analyzer.sample_rate))
+    assert analyzer.end == int(round((10.0 + 4 * 8192 / 44100) * analyzer.sample_rate))
+    levels = analyzer.levels(10.5)
+    assert levels is not None
+    assert levels.argmax() == np.searchsorted(analyzer.edges, 440 * analyzer.fft_size / analyzer.sample_rate) - 1
+
+
+def test_tempo_changed_block_is_stretched_to_media_length():
+    analyzer = SpectrumAnalyzer()
+    tap = SpectrumTap(analyzer)
+    # 2배속: 원본 1초가 0.5초 분량의 출력 블록으로 들어옴
+    tap(tone(440, 0.5, 44100), 3.0, 1.0)
+    assert analyzer.end - analyzer.start == analyzer.sample_rate
+
+
+def test_feed_restarts_after_a_jump():
+    analyzer = SpectrumAnalyzer()
+    analyzer.feed(np.zeros(2048, dtype=np.float32), 1.0)
+    analyzer.feed(np.zeros(2048, dtype=np.float32), 30.0)
+    assert analyzer.levels(1.05) is None
+    assert analyzer.levels(30.05) is not None
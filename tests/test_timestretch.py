@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from timestretch import TimeStretch
+
+RATE = 44100
+
+
+def signal(seconds):
+    t = np.arange(int(seconds * RATE)) / RATE
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.2 * np.sin(2 * np.pi * 330 * t)
+    return np.stack([tone, tone], axis=1).astype(np.float32)
+
+
+def stretch(rate, samples, block_frames=8192):
+    stage = TimeStretch(RATE, 2)
+    stage.set_rate(rate)
+    return np.concatenate([stage.process(samples[i:i + block_frames]) for i in range(0, len(samples), block_frames)])
+
+
+@pytest.mark.parametrize("rate", [0.5, 0.75, 1.25, 2.0])
+def test_output_length_follows_rate(rate):
+    out = stretch(rate, signal(5))
+    # 끝부분의 입력은 다음 블록을 기다리며 버퍼에 남아 있으므로 그만큼(프레임 + 탐색 범위)만 짧을 수 있음
+    stage = TimeStretch(RATE, 2)
+    latency = (stage.frame + stage.tolerance) / RATE / rate
+    assert 0 <= 5 / rate - len(out) / RATE <= latency
+
+
+def test_pitch_is_preserved():
+    out = stretch(2.0, signal(4))[RATE // 2:RATE // 2 + 32768, 0]
+    spectrum = np.abs(np.fft.rfft(out * np.hanning(len(out))))
+    peak = np.argmax(spectrum) * RATE / len(out)
+    assert abs(peak - 220) < 5
+
+
+def test_normal_speed_passes_through():
+    samples = signal(0.5)
+    stage = TimeStretch(RATE, 2)
+    assert stage.process(samples) is samples
+
+
+def test_rate_is_clamped():
+    stage = TimeStretch(RATE, 2)
+    stage.set_rate(4)
+    assert stage.rate == 2.0
+    stage.set_rate(0.1)
+    assert stage.rate == 0.5
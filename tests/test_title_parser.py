@@ -0,0 +1,36 @@
+import re
+import unicodedata
+import pytest
+from title_parser import SAMPLE_CORPUS, UNKNOWN_ARTIST, TitleParser, clean_title, normalize_artist
+
+
+@pytest.mark.parametrize("title, known, expected", SAMPLE_CORPUS)
+def test_sample_corpus(title, known, expected):
+    assert TitleParser(known).parse(title) == expected
+
+
+@pytest.mark.parametrize("title", ["Spider-Man Theme", "K-pop Mix 2024", "Jay-Z"])
+def test_hyphen_inside_words_is_not_a_separator(title):
+    assert TitleParser().parse(title) == (title, UNKNOWN_ARTIST)
+
+
+@pytest.mark.parametrize("suffix", ["(Remix)", "(feat. Zion.T)", "(Acoustic Ver.)", "(Live)", "(Sped Up)"])
+def test_parenthetical_tags_are_not_artists(suffix):
+    assert TitleParser().parse(f"Blueming {suffix}") == (f"Blueming {suffix}", UNKNOWN_ARTIST)
+
+
+def test_known_artist_spelling_is_reused():
+    parser = TitleParser(["NewJeans"])
+    assert parser.parse("NEW JEANS - Ditto") == ("Ditto", "NewJeans")
+    assert parser.parse("Ditto - newjeans") == ("Ditto", "NewJeans")
+
+
+def test_clean_title_strips_noise_and_spaces():
+    assert clean_title("  IU  -  Blueming  [MV]  ") == "IU - Blueming"
+    assert clean_title("IU - Blueming Official MV") == "IU - Blueming"
+
+
+@pytest.mark.parametrize("name", ["AC/DC", "Guns N' Roses", "t.A.T.u.", "BTS (방탄소년단)", "ＮｅｗＪｅａｎｓ", "Beyoncé"])
+def test_normalize_matches_regex_definition(name):
+    expected = re.sub(r"[\W_]+", "", unicodedata.normalize("NFKC", name).casefold())
+    assert normalize_artist(name) == expected
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from youtube_api import QuotaExceeded, YouTubeClient, _serve_fake_api, parse_duration, video_details
+
+VIDEOS = {f"vid{i:08d}": {"title": f"Artist {i} - Song {i}", "channel": f"Artist {i} - Topic" if i % 2 else "Label",
+                          "duration": f"PT{i % 5 + 2}M{i % 60}S", "views": 1000 * i} for i in range(60)}
+
+
+@pytest.fixture
+def api():
+    server, endpoint, requests = _serve_fake_api(VIDEOS)
+    yield endpoint, requests
+    server.shutdown()
+
+
+@pytest.mark.parametrize("value, seconds", [("PT4M13S", 253), ("PT1H2M", 3720), ("P1DT1S", 86401),
+                                            ("PT45S", 45), ("", 0), (None, 0), ("4:13", 0)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+def test_video_details():
+    item = {"snippet": {"channelTitle": "IU - Topic"}, "contentDetails": {"duration": "PT3M37S"},
+            "statistics": {"viewCount": "1200"}}
+    assert video_details(item) == {"duration": 217, "views": 1200, "audio_only": True, "channel": "IU - Topic"}
+    assert video_details({"snippet": {"description": "Provided to YouTube by Kakao"}})["audio_only"]
+    assert video_details({}) == {"duration": 0, "views": 0, "audio_only": False, "channel": ""}
+
+
+def test_concurrent_searches_are_coalesced_and_cached(api, tmp_path):
+    endpoint, requests = api
+    client = YouTubeClient("fake-key", str(tmp_path), api_endpoint=endpoint)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: client.search("artist"), range(4)))
+    assert all(result == results[0] for result in results)
+    client.search("artist")
+    assert [path for path, _ in requests].count("/youtube/v3/search") == 1
+    assert client.stats["requests"] == 1
+    assert client.stats["coalesced"] + client.stats["cache_hits"] == 4
+    assert client.quota_used() == 100
+
+
+def test_videos_are_batched_and_cached_per_id(api, tmp_path):
+    endpoint, requests = api
+    client = YouTubeClient("fake-key", str(tmp_path), api_endpoint=endpoint)
+    details = client.videos(list(VIDEOS))
+    assert details["vid00000003"] == {"duration": 303, "views": 3000, "audio_only": True, "channel": "Artist 3 - Topic"}
+    client.videos(list(VIDEOS))
+    assert len(requests) == 2  # 50개 + 10개, 두 번째 호출은 모두 캐시
+    assert client.quota_used() == 2
+
+
+def test_quota_limit(api, tmp_path):
+    endpoint, requests = api
+    client = YouTubeClient("fake-key", str(tmp_path), api_endpoint=endpoint, daily_quota=150)
+    client.search("first")
+    with pytest.raises(QuotaExceeded):
+        client.search("second")
+    assert len(requests) == 1
+    assert YouTubeClient("fake-key", str(tmp_path), api_endpoint=endpoint).quota_used() == 100
@@ -0,0 +1,107 @@
+import time
+import numpy as np
+
+SPEEDS = (0.5, 0.75, 1.0, 1.25, 1.5, 1.75, 2.0)
+
+
+class TimeStretch:
+    """WSOLA 방식의 음정 유지 속도 조절 (0.5x ~ 2.0x)
+
+    입력에서 rate 배 간격으로 프레임을 골라 일정 간격으로 겹쳐 더한다. 각 프레임은
+    허용 범위 안에서 직전 프레임의 자연스러운 연속과 정규화 상호상관이 가장 큰 위치로
+    옮겨 위상이 어긋나지 않게 한다. 상관은 FFT 로 한 번에 계산한다.
+    PcmPlayer 의 DSP 단계로 쓰이며 출력 길이가 입력과 달라질 수 있다.
+    """
+
+    def __init__(self, sample_rate=44100, channels=2, frame_seconds=0.046, tolerance_seconds=0.012):
+        self.channels = channels
+        self.frame = int(sample_rate * frame_seconds) & ~1
+        self.hop = self.frame // 2
+        self.tolerance = int(sample_rate * tolerance_seconds)
+        # 50% 겹침에서 합이 정확히 1 이 되는 주기형 Hann 창
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.frame) / self.frame)).astype(np.float32)
+        search = 2 * self.tolerance + 2 * self.frame
+        self.fft_size = 1 << (search - 1).bit_length()
+        self.rate = 1.0
+        self.reset()
+
+    def set_rate(self, rate):
+        self.rate = max(0.5, min(2.0, float(rate)))
+
+    def reset(self):
+        """탐색/곡 변경 시 쌓인 입력과 겹침 꼬리를 버림"""
+        self.buffer = np.zeros((self.tolerance, self.channels), dtype=np.float32)
+        self.position = float(self.tolerance)  # 다음 프레임의 이상적인 입력 위치
+        self.previous = None  # 직전에 고른 프레임 시작 위치
+        self.tail = np.zeros((self.frame - self.hop, self.channels), dtype=np.float32)
+
+    def _best_offset(self, mono, ideal, natural):
+        """ideal ± tolerance 에서 natural 구간과 가장 닮은 프레임 시작 위치"""
+        frame, tolerance = self.frame, self.tolerance
+        region = mono[ideal - tolerance:ideal + tolerance + frame]
+        target = mono[natural:natural + frame]
+        n = self.fft_size
+        corr = np.fft.irfft(np.fft.rfft(region, n) * np.conj(np.fft.rfft(target, n)), n)[:2 * tolerance + 1]
+        energy = np.concatenate(([0.0], np.cumsum(region.astype(np.float64) ** 2)))
+        energy = energy[frame:frame + 2 * tolerance + 1] - energy[:2 * tolerance + 1]
+        return ideal - tolerance + int(np.argmax(corr / np.sqrt(energy + 1e-9)))
+
+    def process(self, block):
+        rate = self.rate
+        if rate == 1.0 and self.previous is None:
+            return block
+        buffer = np.concatenate((self.buffer, block))
+        mono = buffer.mean(axis=1)
+        frame, hop, tolerance = self.frame, self.hop, self.tolerance
+        analysis_hop = hop * rate
+        outputs = []
+        position, previous, tail = self.position, self.previous, self.tail
+        while True:
+            ideal = int(round(position))
+            natural = previous + hop if previous is not None else ideal
+            if max(ideal + tolerance, natural) + frame > len(buffer):
+                break
+            if previous is None:
+                start = ideal
+            elif rate == 1.0:
+                # 1배속: 자연 연속 그대로 이어 붙이면 입력이 그대로 복원됨
+                start = natural
+            else:
+                start = self._best_offset(mono, ideal, natural)
+            segment = buffer[start:start + frame] * self.window[:, None]
+            segment[:frame - hop] += tail
+            outputs.append(segment[:hop])
+            tail = segment[hop:]
+            previous = start
+            # 1배속에서는 이상 위치를 실제 위치에 맞춰 다시 늘리기 시작할 때 튀지 않게 함
+            position = float(start + hop) if rate == 1.0 else position + analysis_hop
+        # 다음 블록에 필요한 입력만 남김
+        cut = max(0, min(int(position) - tolerance, previous + hop if previous is not None else int(position)))
+        self.buffer = buffer[cut:]
+        self.position = position - cut
+        self.previous = previous - cut if previous is not None else None
+        self.tail = tail
+        if not outputs:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        return np.concatenate(outputs)
+
+
+def _run_benchmark(seconds=30, sample_rate=44100, block_frames=8192):
+    t = np.arange(seconds * sample_rate) / sample_rate
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.2 * np.sin(2 * np.pi * 330 * t * (1 + 0.01 * np.sin(t)))
+    signal = np.stack([tone, tone], axis=1).astype(np.float32)
+    for rate in (0.5, 1.25, 2.0):
+        stretch = TimeStretch(sample_rate, 2)
+        stretch.set_rate(rate)
+        produced = 0
+        start = time.perf_counter()
+        for offset in range(0, len(signal), block_frames):
+            produced += len(stretch.process(signal[offset:offset + block_frames]))
+        elapsed = time.perf_counter() - start
+        output_seconds = produced / sample_rate
+        print(f"{rate}x: {seconds}s in -> {output_seconds:.2f}s out (expected {seconds / rate:.2f}s), "
+              f"{output_seconds / elapsed:.0f}x real time ({elapsed / output_seconds * 100:.2f}% of one core)")
+
+
+if __name__ == '__main__':
+    _run_benchmark()
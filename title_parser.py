@@ -0,0 +1,189 @@
+import re
+import time
+import unicodedata
+
+UNKNOWN_ARTIST = "Unknown Artist"
+NORMALIZED_CACHE_SIZE = 10000
+
+# 제목 앞뒤에 붙는 부가 표기: [MV], (Official Video), (Lyrics), 【가사】 등
+_NOISE_RE = re.compile(
+    r"[\(\[【]\s*(?:official|lyrics?|lyric video|mv|m/v|audio|hd|hq|4k|visualizer|music video|"
+    r"가사|뮤직비디오|뮤비)[^\)\]】]*[\)\]】]",
+    re.IGNORECASE,
+)
+_TRAILING_NOISE_RE = re.compile(r"\s+(?:official\s+)?(?:m/?v|music video|lyric video|audio)$", re.IGNORECASE)
+_NORMALIZE_RE = re.compile(r"[\W_]+")
+_ASCII_SYMBOLS = bytes(c for c in range(128) if not chr(c).isalnum())  # ASCII 에서 _NORMALIZE_RE 가 지우는 문자
+_NOISE_OPENERS = ("(", "[", "【")
+_TRAILING_NOISE_ENDS = ("v", "o")  # _TRAILING_NOISE_RE 가 맞을 수 있는 마지막 글자 (소문자)
+
+# "곡명 (feat. X)", "곡명 (Remix)" 처럼 괄호 안이 아티스트가 아닌 부가 정보인 경우
+_PAREN_TAG_RE = re.compile(
+    r"^(?:feat|ft|featuring|prod|with|from)\b|"
+    r"\b(?:remix|mix|edit|ver|version|live|acoustic|instrumental|inst|cover|remaster(?:ed)?|"
+    r"sped up|slowed|reverb|demo|extended|original|english|japanese|korean|op|ed|ost|theme)\b",
+    re.IGNORECASE,
+)
+
+# (검사할 문자열, 정규식, 첫 그룹이 아티스트인지 여부) — 위에서부터 순서대로 시도.
+# 검사할 문자열이 제목(소문자)에 하나도 없으면 정규식을 돌리지 않음.
+# '-' 는 "Spider-Man", "K-pop" 처럼 단어 안에도 쓰이므로 앞뒤에 공백이 있어야 구분자로 봄
+_RULES = [
+    (("-", "–", "—"), re.compile(r"^(.+?)\s+[-–—]\s+(.+)$"), True),  # "아티스트 - 곡명"
+    (("–", "—"), re.compile(r"^(.+?)\s*[–—]\s*(.+)$"), True),  # "아티스트—곡명" (긴 대시는 공백 없이도)
+    ((" _ ",), re.compile(r"^(.+?)\s+_\s+(.+)$"), True),  # "아티스트 _ 곡명"
+    (("|", "｜"), re.compile(r"^(.+?)\s*[\|｜]\s*(.+)$"), True),  # "아티스트 | 곡명"
+    (("'", "’", '"', "”", "」", "』"), re.compile(r"^(.+?)\s*['‘\"“「『](.+?)['’\"”」』]$"), True),  # "아티스트 '곡명'"
+    ((" by ",), re.compile(r"^(.+?)\s+by\s+(.+)$", re.IGNORECASE), False),  # "곡명 by 아티스트"
+    ((")",), re.compile(r"^(.+?)\s*\(([^()]+)\)$"), False),  # "곡명 (아티스트)"
+]
+
+
+def normalize_artist(name):
+    """아티스트 비교용 정규화: 호환 문자 통일, 대소문자/공백/기호 무시"""
+    if name.isascii():
+        # 대부분의 제목: 정규식 없이 바이트 단위로 기호 제거
+        return name.encode().translate(None, _ASCII_SYMBOLS).lower().decode()
+    return _NORMALIZE_RE.sub("", unicodedata.normalize("NFKC", name).casefold())
+
+
+def clean_title(title):
+    for opener in _NOISE_OPENERS:
+        if opener in title:
+            title = _NOISE_RE.sub(" ", title)
+            break
+    title = " ".join(title.split())
+    if title[-1:].lower() in _TRAILING_NOISE_ENDS:
+        title = _TRAILING_NOISE_RE.sub("", title)
+    return title
+
+
+class TitleParser:
+    """유튜브 제목을 (곡명, 아티스트) 로 분리하는 규칙 엔진
+
+    규칙 정규식은 미리 컴파일되어 있고 구분 문자가 제목에 있을 때만 돌린다. 라이브러리에 있는 아티스트 색인으로
+    "A - B" 와 "B - A" 처럼 애매한 분리를 판별하고 아티스트 표기를 통일한다.
+    """
+
+    def __init__(self, known_artists=()):
+        self.artists = {}  # 정규화된 이름 -> 라이브러리 표기
+        self.normalized = {}  # 분리된 이름 -> 정규화된 이름 (같은 아티스트가 반복되므로 캐시)
+        for artist in known_artists:
+            self.add_artist(artist)
+
+    def add_artist(self, artist):
+        if not artist or artist == UNKNOWN_ARTIST:
+            return
+        key = normalize_artist(artist)
+        if key:
+            self.artists.setdefault(key, artist)
+
+    def _known(self, name):
+        if not self.artists:
+            return None
+        key = self.normalized.get(name)
+        if key is None:
+            if len(self.normalized) >= NORMALIZED_CACHE_SIZE:
+                self.normalized.clear()
+            key = self.normalized[name] = normalize_artist(name)
+        return self.artists.get(key)
+
+    def parse(self, title):
+        cleaned = clean_title(title) or title.strip()
+        lowered = cleaned.lower()
+        for separators, pattern, artist_first in _RULES:
+            for separator in separators:
+                if separator in lowered:
+                    break
+            else:
+                continue
+            match = pattern.match(cleaned)
+            if not match:
+                continue
+            first, second = match.group(1).strip(), match.group(2).strip()
+            if not first or not second:
+                continue
+            artist, song = (first, second) if artist_first else (second, first)
+            if not artist_first and _PAREN_TAG_RE.search(artist):
+                continue  # "곡명 (Remix)", "곡명 (feat. X)" 의 괄호는 아티스트가 아님
+            known_artist = self._known(artist)
+            if known_artist is None:
+                known_song = self._known(song)
+                if known_song is not None:
+                    # 곡명 쪽이 알려진 아티스트면 순서가 뒤바뀐 제목
+                    artist, song, known_artist = song, artist, known_song
+            return song, known_artist or artist
+        return cleaned, UNKNOWN_ARTIST
+
+
+# 정확도 확인용 예시: (제목, 알려진 아티스트, 기대하는 (곡명, 아티스트))
+SAMPLE_CORPUS = [
+    ("IU - Blueming", (), ("Blueming", "IU")),
+    ("IU - Blueming (Official Video)", (), ("Blueming", "IU")),
+    ("[MV] IU(아이유) _ Blueming(블루밍)", (), ("Blueming(블루밍)", "IU(아이유)")),
+    ("Blueming - IU", ("IU",), ("Blueming", "IU")),
+    ("Hype Boy by NewJeans", (), ("Hype Boy", "NewJeans")),
+    ("Hype Boy (NewJeans)", (), ("Hype Boy", "NewJeans")),
+    ("NewJeans | Ditto", (), ("Ditto", "NewJeans")),
+    ("newjeans - OMG [Lyrics]", ("NewJeans",), ("OMG", "NewJeans")),
+    ("BTS (방탄소년단) 'Dynamite' Official MV", (), ("Dynamite", "BTS (방탄소년단)")),
+    ("Abby Road Medley", (), ("Abby Road Medley", UNKNOWN_ARTIST)),
+    ("Queen – Bohemian Rhapsody (Official Video Remastered)", (), ("Bohemian Rhapsody", "Queen")),
+    ("Bohemian Rhapsody - Queen", ("Queen",), ("Bohemian Rhapsody", "Queen")),
+    ("AC/DC - Back In Black (Official 4K Video)", (), ("Back In Black", "AC/DC")),
+    ("Lofi hip hop radio", (), ("Lofi hip hop radio", UNKNOWN_ARTIST)),
+    ("Spider-Man Theme", (), ("Spider-Man Theme", UNKNOWN_ARTIST)),
+    ("K-pop Mix 2024", (), ("K-pop Mix 2024", UNKNOWN_ARTIST)),
+    ("Blueming (Remix)", (), ("Blueming (Remix)", UNKNOWN_ARTIST)),
+    ("Hype Boy (feat. NewJeans)", (), ("Hype Boy (feat. NewJeans)", UNKNOWN_ARTIST)),
+    ("Queen—Bohemian Rhapsody", (), ("Bohemian Rhapsody", "Queen")),
+]
+
+
+def _baseline_parse(title):
+    """비교용: 규칙 엔진 이전의 player2.MP3Player._parse_title"""
+    patterns = [
+        r'^(.*?)\s*-\s*(.*?)$',
+        r'^(.*?)\s*by\s*(.*?)$',
+        r'^(.*?)\s*\((.*?)\)$',
+        r'^(.*?)\s*[\|]\s*(.*?)$',
+    ]
+    for pattern in patterns:
+        match = re.match(pattern, title.strip(), re.IGNORECASE)
+        if match:
+            artist, song = match.group(1).strip(), match.group(2).strip()
+            if pattern in (patterns[1], patterns[2]):
+                artist, song = song, artist
+            if artist and song:
+                return song, artist
+    return title.strip(), UNKNOWN_ARTIST
+
+
+def _run_benchmark(count=100000, library_artists=2000):
+    """SAMPLE_CORPUS 정확도와, 라이브러리 아티스트 색인이 있을 때 기존 _parse_title 대비 처리 속도"""
+    correct = baseline_correct = 0
+    for title, known, expected in SAMPLE_CORPUS:
+        result = TitleParser(known).parse(title)
+        correct += result == expected
+        baseline_correct += _baseline_parse(title) == expected
+        if result != expected:
+            print(f"MISS {title!r}: {result} != {expected}")
+    print(f"accuracy: {correct}/{len(SAMPLE_CORPUS)} (baseline {baseline_correct}/{len(SAMPLE_CORPUS)})")
+
+    known = [artist for _, artists, _ in SAMPLE_CORPUS for artist in artists]
+    parser = TitleParser(known + [f"Artist {i}" for i in range(library_artists)])
+    # 아티스트는 반복되고 곡명은 모두 다른 제목 목록
+    titles = [title.replace(song, f"{song} {i}", 1)
+              for i in range(count // len(SAMPLE_CORPUS) + 1) for title, _, (song, _) in SAMPLE_CORPUS][:count]
+    timings = {}
+    for name, parse in (("baseline _parse_title", _baseline_parse), ("TitleParser.parse", parser.parse)):
+        start = time.perf_counter()
+        for title in titles:
+            parse(title)
+        timings[name] = time.perf_counter() - start
+        print(f"{name}: {count} titles in {timings[name]:.3f}s ({count / timings[name]:,.0f} titles/s)")
+    print(f"speedup: {timings['baseline _parse_title'] / timings['TitleParser.parse']:.2f}x")
+
+
+if __name__ == '__main__':
+    _run_benchmark()
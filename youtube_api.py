@@ -0,0 +1,262 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import httplib2
+from googleapiclient.discovery import build
+
+# YouTube Data API v3 호출당 할당량 비용 (https://developers.google.com/youtube/v3/determine_quota_cost)
+QUOTA_COSTS = {
+    ("search", "list"): 100,
+    ("videos", "list"): 1,
+    ("playlistItems", "list"): 1,
+    ("channels", "list"): 1,
+}
+DEFAULT_DAILY_QUOTA = 10000
+# 응답 캐시 유지 시간(초): 검색 결과는 자주 바뀌고 영상 정보는 거의 바뀌지 않음
+CACHE_TTL = {"search": 6 * 3600, "videos": 7 * 24 * 3600}
+MAX_IDS_PER_REQUEST = 50
+
+_DURATION_RE = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?")
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+def parse_duration(value):
+    """ISO 8601 길이("PT4M13S")를 초로 변환"""
+    match = _DURATION_RE.fullmatch(value or "")
+    if not match:
+        return 0
+    days, hours, minutes, seconds = (int(g) if g else 0 for g in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def video_details(item):
+    """videos().list 항목에서 목록 표시에 필요한 값만 추림"""
+    snippet = item.get("snippet", {})
+    details = item.get("contentDetails", {})
+    statistics = item.get("statistics", {})
+    # 자동 생성된 "아티스트 - Topic" 채널의 음원은 정지 이미지에 소리만 있는 영상
+    audio_only = (snippet.get("channelTitle", "").endswith(" - Topic")
+                  or snippet.get("description", "").startswith("Provided to YouTube by"))
+    return {
+        "duration": parse_duration(details.get("duration")),
+        "views": int(statistics.get("viewCount", 0)),
+        "audio_only": audio_only,
+        "channel": snippet.get("channelTitle", ""),
+    }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class YouTubeClient:
+    """YouTube Data API 접근을 한곳에 모은 클라이언트
+
+    - 호출마다 할당량 비용을 더해 태평양 시간 기준 하루 사용량을 기록 (한도를 넘으면 QuotaExceeded)
+    - 같은 요청이 동시에 들어오면 한 번만 보내고 결과를 나눠 가짐
+    - 응답은 디스크에 캐시하고, 영상 정보는 영상 ID 별로 캐시해 다음 검색에서 다시 받지 않음
+    api_endpoint 를 바꾸면 로컬 가짜 서버로도 시험할 수 있다.
+    """
+
+    def __init__(self, api_key, cache_dir, api_endpoint=None, daily_quota=DEFAULT_DAILY_QUOTA):
+        client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+        self.service = build('youtube', 'v3', developerKey=api_key, client_options=client_options,
+                             static_discovery=True, cache_discovery=False)
+        self.cache_dir = cache_dir
+        self.daily_quota = daily_quota
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.local = threading.local()  # httplib2.Http 는 스레드 간 공유 불가
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        self.quota_path = os.path.join(cache_dir, "quota.json")
+        self.quota = {"day": None, "used": 0}
+        try:
+            with open(self.quota_path, encoding="utf-8") as f:
+                self.quota.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _today():
+        # 할당량은 태평양 시간 자정에 초기화됨
+        return datetime.now(ZoneInfo("America/Los_Angeles")).strftime("%Y-%m-%d")
+
+    def quota_used(self):
+        with self.lock:
+            return self.quota["used"] if self.quota["day"] == self._today() else 0
+
+    def _charge(self, cost):
+        with self.lock:
+            today = self._today()
+            if self.quota["day"] != today:
+                self.quota = {"day": today, "used": 0}
+            if self.quota["used"] + cost > self.daily_quota:
+                raise QuotaExceeded(f"YouTube API quota exhausted ({self.quota['used']}/{self.daily_quota} units used today)")
+            self.quota["used"] += cost
+            tmp_path = f"{self.quota_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.quota, f)
+            os.replace(tmp_path, self.quota_path)
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _cache_get(self, key, ttl):
+        try:
+            with open(self._cache_path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("time", 0) > ttl:
+            return None
+        return entry.get("data")
+
+    def _cache_put(self, key, data):
+        path = self._cache_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"time": time.time(), "data": data}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def call(self, resource, method, use_cache=True, **params):
+        """resource.method(**params).execute() 를 캐시/중복 제거/할당량 기록과 함께 실행"""
+        key = json.dumps([resource, method, params], sort_keys=True)
+        ttl = CACHE_TTL.get(resource, 3600)
+        if use_cache:
+            cached = self._cache_get(key, ttl)
+            if cached is not None:
+                with self.lock:
+                    self.stats["cache_hits"] += 1
+                return cached
+        with self.lock:
+            pending = self.in_flight.get(key)
+            if pending is None:
+                pending = self.in_flight[key] = _Call()
+                owner = True
+            else:
+                self.stats["coalesced"] += 1
+                owner = False
+        if not owner:
+            pending.done.wait()
+            if pending.error:
+                raise pending.error
+            return pending.result
+        try:
+            self._charge(QUOTA_COSTS.get((resource, method), 1))
+            with self.lock:
+                self.stats["requests"] += 1
+            request = getattr(getattr(self.service, resource)(), method)(**params)
+            if not hasattr(self.local, "http"):
+                self.local.http = httplib2.Http(timeout=15)
+            pending.result = request.execute(http=self.local.http)
+            if use_cache:
+                self._cache_put(key, pending.result)
+            return pending.result
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            pending.done.set()
+
+    def search(self, query, max_results=10):
+        return self.call("search", "list", q=query, part="snippet", maxResults=max_results, type="video")
+
+    def videos(self, video_ids):
+        """영상 ID 목록의 상세 정보 {id: video_details}. 캐시에 없는 ID 만 50개씩 묶어 요청"""
+        ttl = CACHE_TTL["videos"]
+        result = {}
+        missing = []
+        for video_id in dict.fromkeys(video_ids):
+            cached = self._cache_get(f"video:{video_id}", ttl)
+            if cached is not None:
+                result[video_id] = cached
+            else:
+                missing.append(video_id)
+        with self.lock:
+            self.stats["cache_hits"] += len(result)
+        for start in range(0, len(missing), MAX_IDS_PER_REQUEST):
+            chunk = missing[start:start + MAX_IDS_PER_REQUEST]
+            response = self.call("videos", "list", use_cache=False, part="snippet,contentDetails,statistics",
+                                 id=",".join(chunk), maxResults=MAX_IDS_PER_REQUEST)
+            for item in response.get("items", []):
+                details = video_details(item)
+                result[item["id"]] = details
+                self._cache_put(f"video:{item['id']}", details)
+        return result
+
+
+def _serve_fake_api(videos):
+    """검색/영상 조회만 흉내 내는 로컬 가짜 Data API 서버. (서버, 주소, 요청 기록) 반환"""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    from urllib.parse import urlparse, parse_qs
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            requests.append((url.path, query))
+            if url.path.endswith("/search"):
+                items = [{"id": {"kind": "youtube#video", "videoId": video_id},
+                          "snippet": {"title": video["title"],
+                                      "thumbnails": {"default": {"url": f"https://i.ytimg.com/vi/{video_id}/default.jpg"}}}}
+                         for video_id, video in videos.items()]
+            else:
+                ids = query.get("id", [""])[0].split(",")
+                items = [{"id": video_id,
+                          "snippet": {"channelTitle": videos[video_id]["channel"], "description": ""},
+                          "contentDetails": {"duration": videos[video_id]["duration"]},
+                          "statistics": {"viewCount": str(videos[video_id]["views"])}}
+                         for video_id in ids if video_id in videos]
+            body = json.dumps({"items": items}).encode("utf-8")
+            time.sleep(0.05)  # 동시 요청이 겹치도록 약간의 지연
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/", requests
+
+
+def _run_fake_server_check():
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    videos = {f"vid{i:08d}": {"title": f"Artist {i} - Song {i}", "channel": f"Artist {i} - Topic" if i % 2 else "Label",
+                              "duration": f"PT{i % 5 + 2}M{i % 60}S", "views": 1000 * i} for i in range(60)}
+    server, endpoint, requests = _serve_fake_api(videos)
+    try:
+        client = YouTubeClient("fake-key", tempfile.mkdtemp(), api_endpoint=endpoint)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda _: client.search("artist"), range(4)))
+        details = client.videos(list(videos))
+        client.videos(list(videos))
+        print(f"http requests: {len(requests)} (search x1, videos x2 for 60 ids), stats: {client.stats}")
+        print(f"quota used: {client.quota_used()} units")
+        sample = details["vid00000003"]
+        print(f"vid00000003 -> {sample}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    _run_fake_server_check()